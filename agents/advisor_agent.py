@@ -1,4 +1,5 @@
 import os
+import hashlib
 import operator
 from typing import List, Dict, Annotated, Any
 from datetime import datetime
@@ -6,16 +7,21 @@ from dotenv import load_dotenv
 
 # LangChain / LangGraph Imports
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool
 from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
 from langchain.agents import create_agent
 from langchain_qdrant import QdrantVectorStore
 from qdrant_client import QdrantClient, models
+from agents.graph_registry import register, get_graph
+from agents.vector_search import async_client
+from agents.advisor_context import build_context, abuild_context, count_tokens, truncate_tokens, ADVISOR_MODEL
 
 load_dotenv()
 QDRANT_URL = os.getenv("QDRANT_ENDPOINT")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# review_user_cv output cap per CV; the tool result stays in the agent's prompt for the rest of the turn
+ADVISOR_CV_TOKENS = int(os.getenv("ADVISOR_CV_TOKENS", "3000"))
 
 
 embeddings = OpenAIEmbeddings(model="text-embedding-3-small", api_key=OPENAI_API_KEY)
@@ -37,97 +43,167 @@ client.create_payload_index(
     wait=True
 )
 
-# Tool to retrieve user data
-@tool
-def review_user_cv(session_id: str) -> str:
-    """
-    Retrieves the user's CV(s) from the database using their session_id.
-    Returns the CV summaries and contents.
-    """
+def session_filter(session_id: str) -> models.Filter:
+    return models.Filter(
+        must=[
+            models.FieldCondition(
+                key="metadata.session_id",
+                match=models.MatchValue(value=session_id)
+            )
+        ]
+    )
+
+
+def format_cv_points(points) -> str:
+    if not points:
+        print("No CVs found for this session ID.")
+        return "No CVs found for this session ID."
+
+    # Sort by creation time (descending) -> Newest first
+    sorted_points = sorted(
+        points, 
+        key=lambda x: x.payload.get("metadata", {}).get("created", 0), 
+        reverse=True
+    )
 
+    results = []
+    seen = set()
+    for i, point in enumerate(sorted_points):
+        payload = point.payload
+        metadata = payload.get("metadata", {})
+        created_ts = metadata.get("created", 0)
+        date_str = datetime.fromtimestamp(created_ts).strftime('%Y-%m-%d %H:%M:%S')
+        
+        summary = payload.get("page_content", "No summary available.")
+        full_contents = metadata.get("cv_contents", "No detailed contents available.")
+
+        # The same CV uploaded again is only listed once (the most recent upload)
+        content_hash = hashlib.sha1(full_contents.encode("utf-8")).hexdigest()
+        if content_hash in seen:
+            continue
+        seen.add(content_hash)
+        full_contents = truncate_tokens(full_contents, ADVISOR_CV_TOKENS)
+
+        label = "MOST RECENT CV" if i == 0 else f"OLDER CV (Uploaded: {date_str})"
+        
+        entry = (
+            f"=== {label} ===\n"
+            f"Date Uploaded: {date_str}\n"
+            f"Summary: {summary}\n"
+            f"Full Content Snippet: {full_contents}...\n"
+            f"=======================\n"
+        )
+        results.append(entry)
+        print(entry)
+
+    return "\n".join(results)
+
+
+def _review_user_cv(session_id: str) -> str:
     print("---- retrieving user CV for advisor chatbot")
 
     try:
         points, _ = client.scroll(
             collection_name="uploaded_cvs",
-            scroll_filter=models.Filter(
-                must=[
-                    models.FieldCondition(
-                        key="metadata.session_id",
-                        match=models.MatchValue(value=session_id)
-                    )
-                ]
-            ),
+            scroll_filter=session_filter(session_id),
             limit=10,  # Assumption: User won't have more than 10 CVs uploaded in one session
             with_payload=True
         )
+        return format_cv_points(points)
 
-        if not points:
-            print("No CVs found for this session ID.")
-            return "No CVs found for this session ID."
+    except Exception as e:
+        print(f"Error retrieving CV: {str(e)}")
+        return f"Error retrieving CV: {str(e)}"
 
-        # Sort by creation time (descending) -> Newest first
-        sorted_points = sorted(
-            points, 
-            key=lambda x: x.payload.get("metadata", {}).get("created", 0), 
-            reverse=True
-        )
 
-        results = []
-        for i, point in enumerate(sorted_points):
-            payload = point.payload
-            metadata = payload.get("metadata", {})
-            created_ts = metadata.get("created", 0)
-            date_str = datetime.fromtimestamp(created_ts).strftime('%Y-%m-%d %H:%M:%S')
-            
-            summary = payload.get("page_content", "No summary available.")
-            full_contents = metadata.get("cv_contents", "No detailed contents available.")
-
-            label = "MOST RECENT CV" if i == 0 else f"OLDER CV (Uploaded: {date_str})"
-            
-            entry = (
-                f"=== {label} ===\n"
-                f"Date Uploaded: {date_str}\n"
-                f"Summary: {summary}\n"
-                f"Full Content Snippet: {full_contents}...\n"
-                f"=======================\n"
-            )
-            results.append(entry)
-            print(entry)
+async def _areview_user_cv(session_id: str) -> str:
+    print("---- retrieving user CV for advisor chatbot")
 
-        return "\n".join(results)
+    try:
+        points, _ = await async_client.scroll(
+            collection_name="uploaded_cvs",
+            scroll_filter=session_filter(session_id),
+            limit=10,  # Assumption: User won't have more than 10 CVs uploaded in one session
+            with_payload=True
+        )
+        return format_cv_points(points)
 
     except Exception as e:
         print(f"Error retrieving CV: {str(e)}")
         return f"Error retrieving CV: {str(e)}"
 
 
+# Tool to retrieve user data (sync for invoke, coroutine for ainvoke)
+review_user_cv = StructuredTool.from_function(
+    func=_review_user_cv,
+    coroutine=_areview_user_cv,
+    name="review_user_cv",
+    description=(
+        "Retrieves the user's CV(s) from the database using their session_id. "
+        "Returns the CV summaries and contents."
+    ),
+)
+
+
 
 # ======================================= Agent =======================================
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.3, api_key=OPENAI_API_KEY)
+llm = ChatOpenAI(model=ADVISOR_MODEL, temperature=0.3, api_key=OPENAI_API_KEY)
 
-advisor_agent = create_agent(
-    model=llm,
-    tools=[review_user_cv],
-    system_prompt=
-    """You are a helpful Career Advisor. STRATEGY FOR CV DATA:
+ADVISOR_SYSTEM_PROMPT = """You are a helpful Career Advisor. STRATEGY FOR CV DATA:
         1. You have a 'user_summary' in your context. Use this for general questions (e.g., "What is my experience level?", "Suggest a career path").
         2. However, if the user asks for a CRITIQUE, REWRITE, specific FEEDBACK, or formatting advice, the summary is NOT enough. 
         3. In those cases, you MUST call the 'review_user_cv' tool to fetch the raw, full text of the CV to ensure you don't miss details."""
-)
+
+@register("advisor")
+def build_advisor_graph():
+    return create_agent(
+        model=llm,
+        tools=[review_user_cv],
+        system_prompt=ADVISOR_SYSTEM_PROMPT
+    )
 
 # Endpoint Function revealed to fastAPI app
-def invoke_advisor(messages: List[Dict[str, str]], session_id: str) -> Dict[str, Any]:
-    
-    system_instruction = SystemMessage(
+def session_instruction(session_id: str) -> SystemMessage:
+    return SystemMessage(
         content=f"SYSTEM CONTEXT: The current session_id is '{session_id}'. When calling tools, you MUST use this specific session_id."
     )
-    
-    formatted_inputs = {"messages": [system_instruction] + messages}
 
-    # Invoke the agent
-    result = advisor_agent.invoke(formatted_inputs)
-    
+def advisor_prompt_tokens() -> int:
+    # The agent adds its own system prompt in front of the inputs
+    return count_tokens(ADVISOR_SYSTEM_PROMPT) + 4
+
+
+def invoke_advisor(messages: List[Dict[str, str]], session_id: str) -> Dict[str, Any]:
+    # Bounded window + rolling summary instead of the whole chat (agents/advisor_context.py)
+    inputs, usage = build_context(llm, messages, session_id, session_instruction(session_id), advisor_prompt_tokens())
+
+    # Invoke the precompiled agent
+    advisor_agent = get_graph("advisor")
+    result = advisor_agent.invoke({"messages": inputs})
+    return advisor_result(result, usage)
+
+
+async def ainvoke_advisor(messages: List[Dict[str, str]], session_id: str) -> Dict[str, Any]:
+    inputs, usage = await abuild_context(llm, messages, session_id, session_instruction(session_id), advisor_prompt_tokens())
+
+    advisor_agent = get_graph("advisor")
+    result = await advisor_agent.ainvoke({"messages": inputs})
+    return advisor_result(result, usage)
+
+
+def model_usage(messages: list) -> Dict[str, int]:
+    "Tokens the agent's model calls reported for this turn (every call, tool rounds included)."
+    totals = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0, "calls": 0}
+    for message in messages:
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            totals["calls"] += 1
+            for key in ("input_tokens", "output_tokens", "total_tokens"):
+                totals[key] += usage.get(key, 0)
+    return totals
+
+
+def advisor_result(result: Dict[str, Any], usage: Dict[str, Any]) -> Dict[str, Any]:
     # Extract the last message (the AI's response)
     last_message = result["messages"][-1]
     full_messages = result["messages"]
@@ -141,5 +217,6 @@ def invoke_advisor(messages: List[Dict[str, str]], session_id: str) -> Dict[str,
 
     return {
         "response": last_message.content,
-        "full_messages": full_messages # Return full history
+        "full_messages": full_messages, # Return full history
+        "usage": {**usage, "model": model_usage(full_messages)},
     }
\ No newline at end of file
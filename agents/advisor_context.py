@@ -0,0 +1,226 @@
+import os
+import math
+import hashlib
+import threading
+from functools import lru_cache
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, AIMessage, trim_messages
+
+load_dotenv()
+
+# Bounded prompt for the advisor agent. The consultant page sends the whole chat every turn (with the
+# job description context as a system message); build_context sends the model
+#   session instruction + the context (deduplicated, capped) + a rolling summary of older turns
+#   + older messages not summarized yet + the latest messages, trimmed to ADVISOR_TOKEN_BUDGET
+# so the prompt stays flat however long the chat gets. Messages leaving the window are summarized in
+# chunks: they are sent verbatim until they add up to ADVISOR_SUMMARY_CHUNK_TOKENS, then folded into the
+# summary with one call, so most turns make no summary call in front of the advisor call.
+ADVISOR_MODEL = "gpt-4o-mini"
+ADVISOR_TOKEN_BUDGET = int(os.getenv("ADVISOR_TOKEN_BUDGET", "6000"))         # input tokens per turn
+ADVISOR_WINDOW_MESSAGES = int(os.getenv("ADVISOR_WINDOW_MESSAGES", "8"))      # latest chat messages kept verbatim
+ADVISOR_CONTEXT_TOKENS = int(os.getenv("ADVISOR_CONTEXT_TOKENS", "2500"))     # cap for the job / CV context
+ADVISOR_SUMMARY_TOKENS = int(os.getenv("ADVISOR_SUMMARY_TOKENS", "300"))
+ADVISOR_SUMMARY_CHUNK_TOKENS = int(os.getenv("ADVISOR_SUMMARY_CHUNK_TOKENS", "1000"))   # unsummarized messages sent verbatim
+ADVISOR_SUMMARY_SESSIONS = int(os.getenv("ADVISOR_SUMMARY_SESSIONS", "1000"))
+REPEATED_CONTENT_TOKENS = 200   # a message this long seen before in the chat is sent once
+
+MESSAGE_TYPES = {"system": SystemMessage, "user": HumanMessage, "human": HumanMessage, "assistant": AIMessage, "ai": AIMessage}
+
+
+# ============================================ Tokens ============================================
+
+@lru_cache(maxsize=1)
+def get_encoding():
+    "The model's tiktoken encoding, loaded on first use; None when it can't be loaded (e.g. offline)."
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model(ADVISOR_MODEL)
+    except Exception as e:
+        print(f"---- tiktoken encoding unavailable ({e!r}); estimating 4 characters per token")
+        return None
+
+def tokenizer_name() -> str:
+    encoding = get_encoding()
+    return encoding.name if encoding is not None else "estimate"
+
+def count_tokens(text: str) -> int:
+    encoding = get_encoding()
+    if encoding is None:
+        return math.ceil(len(text) / 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+def message_tokens(messages: list[BaseMessage]) -> int:
+    # ~4 tokens of chat formatting per message on top of the content
+    return sum(4 + count_tokens(str(message.content)) for message in messages)
+
+def truncate_tokens(text: str, limit: int) -> str:
+    if count_tokens(text) <= limit:
+        return text
+    encoding = get_encoding()
+    if encoding is None:
+        return text[:limit * 4] + " ...[truncated]"
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:limit]) + " ...[truncated]"
+
+
+# ============================================ Messages ============================================
+
+def to_messages(messages: list[dict]) -> list[BaseMessage]:
+    "The page's {role, content, steps} dicts as LangChain messages (steps are UI-only)."
+    return [MESSAGE_TYPES.get(message.get("role"), HumanMessage)(content=str(message.get("content", ""))) for message in messages]
+
+def content_key(message: BaseMessage) -> str:
+    return hashlib.sha1(f"{message.type}\x00{message.content}".encode("utf-8")).hexdigest()
+
+def split_context(messages: list[BaseMessage]) -> tuple[list[SystemMessage], list[BaseMessage], int]:
+    """
+    (distinct system context messages capped to ADVISOR_CONTEXT_TOKENS, chat messages, duplicates removed).
+    The job / CV context resent every turn is kept once; a long chat message repeated later is replaced by a note.
+    """
+    context, chat, seen = [], [], set()
+    duplicates = 0
+    for message in messages:
+        key = content_key(message)
+        if isinstance(message, SystemMessage):
+            if key in seen:
+                duplicates += 1
+                continue
+            seen.add(key)
+            context.append(SystemMessage(content=truncate_tokens(message.content, ADVISOR_CONTEXT_TOKENS)))
+        elif key in seen and count_tokens(message.content) > REPEATED_CONTENT_TOKENS:
+            duplicates += 1
+            chat.append(type(message)(content="(same content as an earlier message, omitted)"))
+        else:
+            seen.add(key)
+            chat.append(message)
+    return context, chat, duplicates
+
+def fit_window(chat: list[BaseMessage], budget: int) -> tuple[list[BaseMessage], list[BaseMessage]]:
+    "(older messages to summarize, latest messages that fit the budget). The last message is always sent."
+    recent = chat[-ADVISOR_WINDOW_MESSAGES:] if ADVISOR_WINDOW_MESSAGES > 0 else chat[-1:]
+    window = trim_messages(recent, max_tokens=max(budget, 0), token_counter=message_tokens, strategy="last")
+    if not window and chat:
+        window = [type(chat[-1])(content=truncate_tokens(chat[-1].content, max(budget, 1)))]
+        return chat[:-1], window
+    return chat[:len(chat) - len(window)], window
+
+
+# ============================================ Rolling Summary ============================================
+
+SUMMARY_PROMPT = """You keep a running summary of a career consultation between a user and an AI career advisor.
+Update the summary with the new messages. Keep what matters for the rest of the conversation: the user's goals,
+background and skills, the advice already given and any open questions. At most {words} words, plain text.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}
+"""
+
+class SummaryCache:
+    """
+    Per-session rolling summary of the messages that left the window. The client resends the whole chat,
+    so the summary is extended with only the newly evicted messages when the evicted prefix matches what
+    was summarized before, and rebuilt otherwise (edited history, another worker, evicted from this cache).
+    """
+    def __init__(self, max_sessions: int = ADVISOR_SUMMARY_SESSIONS):
+        self.max_sessions = max_sessions
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[str, dict] = OrderedDict()
+
+    def lookup(self, session_id: str, evicted: list[BaseMessage]) -> tuple[str, list[BaseMessage]]:
+        "(summary so far, evicted messages it doesn't cover yet)."
+        with self.lock:
+            entry = self.entries.get(session_id)
+            if entry is not None:
+                self.entries.move_to_end(session_id)
+        if entry is None or entry["count"] > len(evicted) or prefix_digest(evicted, entry["count"]) != entry["digest"]:
+            return "", evicted
+        return entry["summary"], evicted[entry["count"]:]
+
+    def store(self, session_id: str, evicted: list[BaseMessage], summary: str):
+        with self.lock:
+            self.entries[session_id] = {"count": len(evicted), "digest": prefix_digest(evicted, len(evicted)), "summary": summary}
+            self.entries.move_to_end(session_id)
+            while len(self.entries) > self.max_sessions:
+                self.entries.popitem(last=False)
+
+def prefix_digest(messages: list[BaseMessage], count: int) -> str:
+    hasher = hashlib.sha1()
+    for message in messages[:count]:
+        hasher.update(content_key(message).encode("ascii"))
+    return hasher.hexdigest()
+
+summary_cache = SummaryCache()
+
+def summary_prompt(summary: str, messages: list[BaseMessage]) -> HumanMessage:
+    lines = "\n".join(f"{message.type}: {message.content}" for message in messages)
+    return HumanMessage(content=SUMMARY_PROMPT.format(
+        words=int(ADVISOR_SUMMARY_TOKENS * 0.75), summary=summary or "(none)", messages=lines,
+    ))
+
+def summary_message(summary: str) -> list[SystemMessage]:
+    return [SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")] if summary else []
+
+
+# ============================================ Context ============================================
+
+def plan_context(messages: list[dict], session_instruction: SystemMessage, fixed_tokens: int) -> dict:
+    "Everything but the summary call: context, window and evicted messages, and the token counts so far."
+    incoming = to_messages(messages)
+    context, chat, duplicates = split_context(incoming)
+    head = [session_instruction] + context
+    # Room for the window: the budget minus the fixed prompts, the context, the summary and the unsummarized chunk
+    budget = ADVISOR_TOKEN_BUDGET - fixed_tokens - message_tokens(head) - ADVISOR_SUMMARY_TOKENS - ADVISOR_SUMMARY_CHUNK_TOKENS
+    evicted, window = fit_window(chat, budget)
+    return {
+        "head": head,
+        "window": window,
+        "evicted": evicted,
+        "usage": {
+            "tokenizer": tokenizer_name(),
+            "history_tokens": message_tokens(incoming),
+            "deduplicated_messages": duplicates,
+            "window_messages": len(window),
+            "summarized_messages": len(evicted),
+        },
+    }
+
+def finish_context(plan: dict, summary: str, pending: list[BaseMessage], fixed_tokens: int, summary_usage: dict | None) -> tuple[list[BaseMessage], dict]:
+    inputs = plan["head"] + summary_message(summary) + pending + plan["window"]
+    usage = {
+        **plan["usage"],
+        "unsummarized_messages": len(pending),
+        "prompt_tokens": fixed_tokens + message_tokens(inputs),
+        "summary_call": summary_usage,
+    }
+    return inputs, usage
+
+def summary_due(pending: list[BaseMessage]) -> bool:
+    "Evicted messages are summarized once they no longer fit the verbatim chunk."
+    return bool(pending) and message_tokens(pending) > ADVISOR_SUMMARY_CHUNK_TOKENS
+
+def build_context(model, messages: list[dict], session_id: str, session_instruction: SystemMessage, fixed_tokens: int = 0):
+    "(agent input messages, usage) for one turn; at most one summary call, only when a chunk is due."
+    plan = plan_context(messages, session_instruction, fixed_tokens)
+    summary, pending = summary_cache.lookup(session_id, plan["evicted"])
+    summary_usage = None
+    if summary_due(pending):
+        response = model.invoke([summary_prompt(summary, pending)])
+        summary, summary_usage = truncate_tokens(response.content, ADVISOR_SUMMARY_TOKENS), response.usage_metadata
+        summary_cache.store(session_id, plan["evicted"], summary)
+        pending = []
+    return finish_context(plan, summary, pending, fixed_tokens, summary_usage)
+
+async def abuild_context(model, messages: list[dict], session_id: str, session_instruction: SystemMessage, fixed_tokens: int = 0):
+    plan = plan_context(messages, session_instruction, fixed_tokens)
+    summary, pending = summary_cache.lookup(session_id, plan["evicted"])
+    summary_usage = None
+    if summary_due(pending):
+        response = await model.ainvoke([summary_prompt(summary, pending)])
+        summary, summary_usage = truncate_tokens(response.content, ADVISOR_SUMMARY_TOKENS), response.usage_metadata
+        summary_cache.store(session_id, plan["evicted"], summary)
+        pending = []
+    return finish_context(plan, summary, pending, fixed_tokens, summary_usage)
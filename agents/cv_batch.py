@@ -0,0 +1,246 @@
+"""
+Bulk CV screening: the analysis graph's steps (read_doc -> embed -> store -> find_jobs -> assess_user)
+run over many uploaded PDFs, stage by stage in chunks of CV_BATCH_CHUNK_SIZE CVs:
+
+- extraction runs in parallel threads (long PDFs also use the pdf_extract process pool)
+- read_doc and assess_user LLM calls share one limiter of CV_BATCH_LLM_CONCURRENCY calls
+- the chunk's summaries are embedded with one embed_documents call, upserted into uploaded_cvs
+  with one bulk upsert and searched with one query_batch_points round-trip
+
+Jobs are kept in memory (this process only); results are pollable by job id or streamed as they finish.
+"""
+import os
+import time
+import uuid
+import asyncio
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+from agents.document_agent import (
+    model, embedding_model, read_doc_prompt, read_doc_update, assess_prompt, cv_document, cv_point,
+)
+from agents.vector_search import async_client, asearch_jobs_batch
+from agents.pdf_extract import extract_text, PDF_POOL_WORKERS
+from agents.cv_cache import cv_cache, CACHED_FIELDS, RESULT_FIELDS
+
+load_dotenv()
+
+CV_BATCH_MAX_FILES = int(os.getenv("CV_BATCH_MAX_FILES", "1000"))
+CV_BATCH_MAX_BYTES = int(os.getenv("CV_BATCH_MAX_BYTES", str(200 * 1024 * 1024)))   # whole multipart body
+CV_BATCH_CHUNK_SIZE = int(os.getenv("CV_BATCH_CHUNK_SIZE", "32"))          # CVs per embed / upsert / search call
+CV_BATCH_PARALLEL_CHUNKS = 2                                                 # next chunk's LLM calls overlap this chunk's I/O
+CV_BATCH_LLM_CONCURRENCY = int(os.getenv("CV_BATCH_LLM_CONCURRENCY", "8"))
+CV_BATCH_EXTRACT_CONCURRENCY = max(2, PDF_POOL_WORKERS)
+CV_BATCH_KEEP_JOBS = int(os.getenv("CV_BATCH_KEEP_JOBS", "20"))             # finished jobs kept for polling
+
+batch_jobs: OrderedDict[str, "BatchJob"] = OrderedDict()
+llm_limiter = asyncio.Semaphore(CV_BATCH_LLM_CONCURRENCY)
+extract_limiter = asyncio.Semaphore(CV_BATCH_EXTRACT_CONCURRENCY)
+
+
+# ============================================ Jobs ============================================
+
+class BatchJob:
+    def __init__(self, files: list[dict]):
+        # files: [{"filename", "path", "digest"}] in upload order
+        self.id = uuid.uuid4().hex
+        self.files = files
+        self.results: list[dict] = []   # in completion order; each carries its upload "index"
+        self.failed = 0
+        self.cache_hits = 0
+        self.status = "queued"
+        self.started = None
+        self.finished = None
+        self.changed = asyncio.Condition()
+        self.task = None
+
+    async def add(self, result: dict):
+        async with self.changed:
+            self.results.append(result)
+            if "error" in result:
+                self.failed += 1
+            elif result.get("cv_cache") == "hit":
+                self.cache_hits += 1
+            self.changed.notify_all()
+
+    async def finish(self, status: str):
+        async with self.changed:
+            self.status = status
+            self.finished = time.time()
+            self.changed.notify_all()
+
+    def progress(self) -> dict:
+        elapsed = ((self.finished or time.time()) - self.started) if self.started else 0.0
+        done = len(self.results)
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total": len(self.files),
+            "done": done,
+            "failed": self.failed,
+            "cache_hits": self.cache_hits,
+            "elapsed_s": round(elapsed, 2),
+            "cvs_per_minute": round(done / elapsed * 60, 2) if elapsed > 0 else 0.0,
+        }
+
+
+def start_batch(files: list[dict]) -> BatchJob:
+    job = BatchJob(files)
+    batch_jobs[job.id] = job
+
+    # Forget the oldest finished jobs
+    finished = [job_id for job_id, old in batch_jobs.items() if old.finished]
+    for job_id in finished[:max(0, len(finished) - CV_BATCH_KEEP_JOBS)]:
+        del batch_jobs[job_id]
+
+    job.task = asyncio.create_task(run_batch(job))
+    return job
+
+
+def get_batch(job_id: str) -> BatchJob | None:
+    return batch_jobs.get(job_id)
+
+
+async def stream_results(job: BatchJob):
+    "Yields each result as it is added, then the final progress."
+    sent = 0
+    while True:
+        async with job.changed:
+            await job.changed.wait_for(lambda: len(job.results) > sent or job.finished)
+            pending = job.results[sent:]
+            finished = job.finished is not None
+        for result in pending:
+            yield "result", result
+        sent += len(pending)
+        if finished and sent == len(job.results):
+            yield "done", job.progress()
+            return
+
+
+# ============================================ Pipeline ============================================
+
+async def limited_llm(prompt) -> str:
+    async with llm_limiter:
+        return (await model.ainvoke([prompt])).content
+
+
+async def extract(item: dict) -> dict:
+    async with extract_limiter:
+        return await asyncio.to_thread(extract_text, item["path"])
+
+
+async def summarize(item: dict, state: dict):
+    extraction = await extract(item)
+    response = await limited_llm(read_doc_prompt(extraction["text"]))
+    state.update(read_doc_update(response, extraction))
+
+
+async def assess(state: dict):
+    state["assessment"] = (await limited_llm(assess_prompt(state))).strip('"')
+
+
+async def settle_upsert(job: BatchJob, upsert: asyncio.Task):
+    "Side effect only; a failed upsert does not fail the screening."
+    try:
+        await upsert
+    except Exception as e:
+        print(f"Batch {job.id}: bulk upsert into uploaded_cvs failed: {e!r}")
+
+
+async def run_chunk(job: BatchJob, chunk: list[tuple[int, dict]]):
+    states = {}
+    hits = []
+    for index, item in chunk:
+        # The cache is SQLite; keep its queries off the event loop
+        cached = await asyncio.to_thread(cv_cache.get, item["digest"]) if cv_cache else None
+        if cached is not None:
+            hits.append({**cached, "session_id": f"{job.id}-{index}"})
+            await job.add({"index": index, "filename": item["filename"], "session_id": f"{job.id}-{index}",
+                           **{field: cached.get(field) for field in RESULT_FIELDS}, "cv_cache": "hit"})
+            os.unlink(item["path"])
+        else:
+            states[index] = {"session_id": f"{job.id}-{index}"}
+
+    if hits:
+        # Cached CVs are still stored under their batch session_id, from the cached vector
+        try:
+            await async_client.upsert(collection_name="uploaded_cvs", points=[cv_point(cv_document(state), state["summary_vector"]) for state in hits])
+        except Exception as e:
+            print(f"Batch {job.id}: upsert of cached CVs into uploaded_cvs failed: {e!r}")
+    if not states:
+        return
+
+    items = dict(chunk)
+    try:
+        outcomes = await asyncio.gather(*(summarize(items[index], state) for index, state in states.items()), return_exceptions=True)
+    finally:
+        for index in states:
+            os.unlink(items[index]["path"])
+
+    for (index, state), outcome in zip(list(states.items()), outcomes):
+        if isinstance(outcome, Exception):
+            del states[index]
+            await job.add({"index": index, "filename": items[index]["filename"], "error": f"read_doc failed: {outcome!r}"})
+    if not states:
+        return
+
+    indices = list(states)
+    upsert = None
+    try:
+        try:
+            vectors = await embedding_model.aembed_documents([states[index]["summary"] for index in indices])
+            for index, vector in zip(indices, vectors):
+                states[index]["summary_vector"] = vector
+
+            # Runs while the jobs are searched and the CVs assessed; settled in the finally below
+            points = [cv_point(cv_document(states[index]), states[index]["summary_vector"]) for index in indices]
+            upsert = asyncio.create_task(async_client.upsert(collection_name="uploaded_cvs", points=points))
+
+            for index, jobs in zip(indices, await asearch_jobs_batch(vectors, k=10)):
+                states[index]["best_jobs"] = jobs
+        except Exception as e:
+            for index in indices:
+                await job.add({"index": index, "filename": items[index]["filename"], "error": f"job matching failed: {e!r}"})
+            return
+
+        outcomes = await asyncio.gather(*(assess(states[index]) for index in indices), return_exceptions=True)
+        for index, outcome in zip(indices, outcomes):
+            if isinstance(outcome, Exception):
+                await job.add({"index": index, "filename": items[index]["filename"], "error": f"assess_user failed: {outcome!r}"})
+                continue
+            if cv_cache:
+                await asyncio.to_thread(cv_cache.set, items[index]["digest"], {field: states[index].get(field) for field in CACHED_FIELDS})
+            result = {field: states[index].get(field) for field in RESULT_FIELDS}
+            await job.add({"index": index, "filename": items[index]["filename"], "session_id": states[index]["session_id"], **result, "cv_cache": "miss"})
+    finally:
+        if upsert is not None:
+            await settle_upsert(job, upsert)
+
+
+async def run_batch(job: BatchJob):
+    job.status = "running"
+    job.started = time.time()
+    numbered = list(enumerate(job.files))
+    chunks = [numbered[i:i + CV_BATCH_CHUNK_SIZE] for i in range(0, len(numbered), CV_BATCH_CHUNK_SIZE)]
+    chunk_limiter = asyncio.Semaphore(CV_BATCH_PARALLEL_CHUNKS)
+
+    async def limited_chunk(chunk):
+        async with chunk_limiter:
+            await run_chunk(job, chunk)
+
+    try:
+        await asyncio.gather(*(limited_chunk(chunk) for chunk in chunks))
+    except Exception as e:
+        print(f"Batch {job.id} failed: {e!r}")
+        await job.finish("failed")
+    else:
+        await job.finish("completed")
+    finally:
+        for item in job.files:
+            if os.path.exists(item["path"]):
+                os.unlink(item["path"])
+
+    progress = job.progress()
+    print(f"---- CV batch {job.id}: {progress['done']}/{progress['total']} in {progress['elapsed_s']} s "
+          f"({progress['cvs_per_minute']} CVs/min, {progress['failed']} failed, {progress['cache_hits']} cached)")
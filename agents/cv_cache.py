@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# /analyze-cv results keyed by the SHA-256 of the uploaded PDF bytes.
+# An identical re-upload skips the whole analysis graph (read_doc LLM call, embedding, job search, assess_user).
+# Entries expire after CV_CACHE_TTL; past CV_CACHE_MAX_ENTRIES / CV_CACHE_MAX_BYTES the least recently used go first.
+CV_CACHE_ENABLED = os.getenv("CV_CACHE_ENABLED", "true").lower() == "true"
+CV_CACHE_PATH = os.getenv("CV_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'cv_cache.db'))
+CV_CACHE_TTL = int(os.getenv("CV_CACHE_TTL", str(7 * 24 * 60 * 60)))
+CV_CACHE_MAX_ENTRIES = int(os.getenv("CV_CACHE_MAX_ENTRIES", "2000"))
+CV_CACHE_MAX_BYTES = int(os.getenv("CV_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Bump when the prompts / models change so old analyses are not served
+CV_CACHE_VERSION = os.getenv("CV_CACHE_VERSION", "2")
+
+# The user-facing fields of the analysis; session_id and the raw upload are never stored
+RESULT_FIELDS = ("summary", "user_name", "cv_contents", "best_jobs", "assessment", "extraction")
+# + the summary embedding, so a hit can still store the CV point under the new session_id without re-embedding
+CACHED_FIELDS = RESULT_FIELDS + ("summary_vector",)
+
+
+def new_hasher():
+    return hashlib.sha256(f"cv-v{CV_CACHE_VERSION}\x00".encode("utf-8"))
+
+
+def file_digest(data: bytes) -> str:
+    hasher = new_hasher()
+    hasher.update(data)
+    return hasher.hexdigest()
+
+
+class CVResultCache:
+    def __init__(self, path: str = CV_CACHE_PATH, ttl: int = CV_CACHE_TTL,
+                 max_entries: int = CV_CACHE_MAX_ENTRIES, max_bytes: int = CV_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS cv_results (
+                digest TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_cv_results_last_used ON cv_results (last_used)")
+        self.conn.commit()
+
+    def get(self, digest: str) -> dict | None:
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT value, created FROM cv_results WHERE digest = ?", (digest,)).fetchone()
+            if row is not None and now - row[1] > self.ttl:
+                self.conn.execute("DELETE FROM cv_results WHERE digest = ?", (digest,))
+                self.conn.commit()
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.conn.execute("UPDATE cv_results SET last_used = ? WHERE digest = ?", (now, digest))
+            self.conn.commit()
+        return json.loads(row[0])
+
+    def set(self, digest: str, result: dict):
+        value = json.dumps({field: result.get(field) for field in CACHED_FIELDS}, ensure_ascii=False)
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cv_results VALUES (?, ?, ?, ?, ?)",
+                (digest, value, len(value.encode("utf-8")), now, now),
+            )
+            self.evict(now)
+            self.conn.commit()
+
+    def evict(self, now: float):
+        # Expired first, then least recently used beyond the entry count, then beyond the byte budget
+        self.conn.execute("DELETE FROM cv_results WHERE created < ?", (now - self.ttl,))
+        self.conn.execute(
+            """DELETE FROM cv_results WHERE rowid IN (
+                SELECT rowid FROM cv_results ORDER BY last_used DESC LIMIT -1 OFFSET ?
+            )""",
+            (self.max_entries,),
+        )
+        self.conn.execute(
+            """DELETE FROM cv_results WHERE rowid IN (
+                SELECT rowid FROM (
+                    SELECT rowid, SUM(size) OVER (ORDER BY last_used DESC) AS running FROM cv_results
+                ) WHERE running > ?
+            )""",
+            (self.max_bytes,),
+        )
+
+    def stats(self) -> dict:
+        with self.lock:
+            entries, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cv_results").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": entries,
+                "bytes": size,
+            }
+
+
+cv_cache = CVResultCache() if CV_CACHE_ENABLED else None
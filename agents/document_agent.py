@@ -1,6 +1,7 @@
-import pymupdf
 import os
 import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import time
 import base64
 from hashlib import md5
@@ -8,11 +9,14 @@ from typing_extensions import TypedDict
 from langgraph.graph import StateGraph
 from langchain_core.messages import SystemMessage
 from langchain_core.documents import Document
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_qdrant import QdrantVectorStore
+from langchain_core.runnables import RunnableLambda
+from langchain_openai import ChatOpenAI
 from qdrant_client import QdrantClient
 from qdrant_client.http import models as qm
 from dotenv import load_dotenv
+from agents.graph_registry import register, get_graph
+from agents.vector_search import async_client, search_jobs, asearch_jobs, cached_embedding_model
+from agents.pdf_extract import extract_text
 
 # TypedDict definition of State
 class State(TypedDict):
@@ -21,8 +25,11 @@ class State(TypedDict):
     cv_contents: str
     best_jobs: list[dict]
     file_bytes: bytes
+    file_path: str
     session_id: str
     assessment: str
+    summary_vector: list[float]
+    extraction: dict
 
 
 load_dotenv()
@@ -31,7 +38,8 @@ qdrant_key = os.getenv("QDRANT_API_KEY")
 
 model = ChatOpenAI(model="gpt-4o-mini", temperature=0.3, api_key=os.getenv("OPENAI_API_KEY"))
 client = QdrantClient(url=qdrant_url, api_key=qdrant_key)
-embedding_model = OpenAIEmbeddings(model="text-embedding-3-small")
+# Shared content-hash cached embeddings (see agents/vector_search.py)
+embedding_model = cached_embedding_model
 
 # Create collection if it doesn't exist
 if not client.collection_exists("uploaded_cvs"):
@@ -42,57 +50,64 @@ if not client.collection_exists("uploaded_cvs"):
         vectors_config=qm.VectorParams(size=1536, distance=qm.Distance.COSINE)
     )
 
-CV_VectorStore = QdrantVectorStore(
-    client=client,
-    collection_name="uploaded_cvs",
-    embedding=embedding_model,
-)
-
-Jobs_VectorStore = QdrantVectorStore(
-    client=client,
-    collection_name="Jobs_Documents",
-    embedding=embedding_model,
-)
-
 # ================================= Functions =================================
 def convert_bytes(file: bytes) -> str:
-    doc = pymupdf.open(stream=file, filetype="pdf")
-    text = ""
-    for page in doc:
-        text = text + page.get_text()
-    return text
+    return extract_text(file)["text"]
 
 
-def analysis_compile(intial_state: State):
-    # compiles main graph, passes State, and starts the program
+def cv_extract(State: State) -> dict:
+    # Multipart / raw PDF uploads arrive as a temp file that MuPDF opens itself;
+    # the JSON form still sends base64 file_bytes. See agents/pdf_extract.py
+    if State.get("file_path"):
+        return extract_text(State["file_path"])
+    return extract_text(base64.b64decode(State["file_bytes"]))
+
+
+@register("analysis")
+def build_analysis_graph():
+    # compiles main graph once; analysis_compile reuses it for every request
     document_agent = StateGraph(State)
 
     # Define graph
-    document_agent.add_node("read_doc", read_doc)
-    document_agent.add_node("construct_vector", construct_vector)
-    document_agent.add_node("find_jobs", find_jobs)
-    document_agent.add_node("assess_user", assess_user)
+    # Each node has a sync (invoke) and async (ainvoke) implementation
+    document_agent.add_node("read_doc", RunnableLambda(read_doc, afunc=aread_doc))
+    document_agent.add_node("construct_vector", RunnableLambda(construct_vector, afunc=aconstruct_vector))
+    document_agent.add_node("store_cv", RunnableLambda(store_cv, afunc=astore_cv))
+    document_agent.add_node("find_jobs", RunnableLambda(find_jobs, afunc=afind_jobs))
+    document_agent.add_node("assess_user", RunnableLambda(assess_user, afunc=aassess_user))
 
     document_agent.set_entry_point("read_doc")
 
+    # read_doc -> construct_vector -> (store_cv | find_jobs) -> assess_user
+    # store_cv only schedules the uploaded_cvs upsert, so the fan-in doesn't wait on Qdrant
     document_agent.add_edge("read_doc", "construct_vector")
+    document_agent.add_edge("construct_vector", "store_cv")
     document_agent.add_edge("construct_vector", "find_jobs")
-    document_agent.add_edge("find_jobs", "assess_user")
+    document_agent.add_edge(["store_cv", "find_jobs"], "assess_user")
 
     document_agent.set_finish_point("assess_user")
 
-    app = document_agent.compile()
+    return document_agent.compile()
+
+
+def analysis_compile(intial_state: State):
+    # passes State to the precompiled graph and starts the program
+    app = get_graph("analysis")
     response = app.invoke(intial_state)
 
     return response
 
 
-def read_doc(State: State):
-    byte_file = base64.b64decode(State["file_bytes"])
+async def aanalysis_compile(intial_state: State):
+    # async version used by the FastAPI endpoint
+    app = get_graph("analysis")
+    response = await app.ainvoke(intial_state)
+
+    return response
 
-    cv_contents = convert_bytes(byte_file)
 
-    system_prompt = SystemMessage(
+def read_doc_prompt(cv_contents: str) -> SystemMessage:
+    return SystemMessage(
         f"""You are a CV analyzer. Your role is to extract the user's fullname and provide a summary analysis of the CV that adequately encapsulates 
         the prospect's persona.
 
@@ -119,9 +134,8 @@ def read_doc(State: State):
         {cv_contents}
         """ 
         )
-    
-    response = model.invoke([system_prompt]).content
 
+def read_doc_update(response: str, extraction: dict):
     try:
         clean_json = response.replace("```json", "").replace("```", "")
         data = json.loads(clean_json)
@@ -131,10 +145,25 @@ def read_doc(State: State):
         user_name = "Candidate"
         summary = response
 
-    return {"summary": response, "user_name": user_name, "cv_contents": cv_contents}
+    # cv_contents is the cleaned, budgeted text; extraction keeps the page count and stage timings
+    stats = {key: value for key, value in extraction.items() if key != "text"}
+    return {"summary": response, "user_name": user_name, "cv_contents": extraction["text"], "extraction": stats}
 
+def read_doc(State: State):
+    extraction = cv_extract(State)
 
-def construct_vector(State: State):
+    response = model.invoke([read_doc_prompt(extraction["text"])]).content
+    return read_doc_update(response, extraction)
+
+async def aread_doc(State: State):
+    # PDF parsing is CPU work; keep it off the event loop
+    extraction = await asyncio.to_thread(cv_extract, State)
+
+    response = (await model.ainvoke([read_doc_prompt(extraction["text"])])).content
+    return read_doc_update(response, extraction)
+
+
+def cv_document(State: State) -> Document:
     # Store CV summary + CV contents as metadata. Embed CV summary for vector points
     _metadata = {
         "cv_contents": State["cv_contents"],
@@ -145,57 +174,79 @@ def construct_vector(State: State):
     unique_identifier = State["summary"].lower().encode('utf-8')
     unique_id = md5(unique_identifier).hexdigest()
 
-    doc = Document(
+    return Document(
         page_content=State["summary"],
         metadata=_metadata,
         id=unique_id,
     )
 
-    qdrant = CV_VectorStore.add_documents([doc])
+def cv_point(doc: Document, vector: list[float]) -> qm.PointStruct:
+    # Same payload layout QdrantVectorStore.add_documents writes
+    return qm.PointStruct(
+        id=doc.id,
+        vector=vector,
+        payload={"page_content": doc.page_content, "metadata": doc.metadata},
+    )
+
+def construct_vector(State: State):
+    # Embed the summary once; store_cv and find_jobs both reuse the vector
+    vector = embedding_model.embed_query(State["summary"])
+    return {"summary_vector": vector}
+
+async def aconstruct_vector(State: State):
+    vector = await embedding_model.aembed_query(State["summary"])
+    return {"summary_vector": vector}
+
+
+# ===== Background CV upserts =====
+# The upsert into uploaded_cvs is a side effect nobody in the response waits for.
+# Sync graphs hand it to a small thread pool, async graphs to an event-loop task.
+
+cv_store_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cv_store")
+pending_cv_stores: set = set()
+
+def log_cv_store(task):
+    pending_cv_stores.discard(task)
+    error = task.exception()
+    if error is not None:
+        print(f"Background upsert into uploaded_cvs failed: {error!r}")
 
-    # print(qdrant)
+def store_cv(State: State):
+    point = cv_point(cv_document(State), State["summary_vector"])
+    future = cv_store_executor.submit(client.upsert, collection_name="uploaded_cvs", points=[point])
+    pending_cv_stores.add(future)
+    future.add_done_callback(log_cv_store)
+    return {}
 
+async def astore_cv(State: State):
+    point = cv_point(cv_document(State), State["summary_vector"])
+    task = asyncio.create_task(async_client.upsert(collection_name="uploaded_cvs", points=[point]))
+    pending_cv_stores.add(task)
+    task.add_done_callback(log_cv_store)
     return {}
 
+async def drain_cv_stores(timeout: float = 10.0):
+    "Waits for the background upserts still running (API shutdown)."
+    tasks = [task for task in pending_cv_stores if isinstance(task, asyncio.Task)]
+    if tasks:
+        await asyncio.wait(tasks, timeout=timeout)
+    cv_store_executor.shutdown(wait=True)
+
 
 def find_jobs(State: State):
+    vector = State.get("summary_vector") or embedding_model.embed_query(State["summary"])
+    list_of_jobs = search_jobs(vector, k=10)
 
-    qdrant = Jobs_VectorStore.similarity_search_with_score(
-        query=State["summary"],
-        k=10,
-    )
+    return {"best_jobs": list_of_jobs}
 
-    list_of_jobs = []
-
-    for points in qdrant:
-        # print(point[0].payload["metadata"])
-        Document = points[0]
-        metadata = Document.metadata
-        page_content = Document.page_content
-
-        if "Job Description:" in page_content:
-            job_desc = page_content.split("Job Description: ", 1)[1].strip()
-        else:
-            job_desc = page_content
-
-        Job = {
-            'job_title': metadata["job_title"],
-            'company_name': metadata["company_name"],
-            'work_type': metadata["work_type"],
-            'work_style': metadata["work_style"],
-            'location': metadata["location"],
-            'salary': metadata["salary"],
-            'company_name': metadata["company_name"],
-            'job_title': metadata["job_title"],
-            'job_description': job_desc
-        }
-
-        list_of_jobs.append(Job)
+async def afind_jobs(State: State):
+    vector = State.get("summary_vector") or await embedding_model.aembed_query(State["summary"])
+    list_of_jobs = await asearch_jobs(vector, k=10)
 
     return {"best_jobs": list_of_jobs}
 
 
-def assess_user(State: State):
+def assess_prompt(State: State) -> SystemMessage:
     recommended_jobs = ""
     for job in State["best_jobs"]:
         company = job["company_name"]
@@ -204,7 +255,7 @@ def assess_user(State: State):
         recommended_jobs += f"{job_title} at {company}\n"
 
 
-    system_prompt = SystemMessage(
+    return SystemMessage(
         f"""
         You are MBTI assessment program. You will be given a user's CV summary and their recommended jobs, and from that I want you to write an
         assessment on their MBTI persona as well as a paragraph analysis of their work tendencies among other assessments.
@@ -222,5 +273,10 @@ def assess_user(State: State):
         """
     )
 
-    response = model.invoke([system_prompt]).content.strip('"')
+def assess_user(State: State):
+    response = model.invoke([assess_prompt(State)]).content.strip('"')
+    return {"assessment": response}
+
+async def aassess_user(State: State):
+    response = (await model.ainvoke([assess_prompt(State)])).content.strip('"')
     return {"assessment": response}
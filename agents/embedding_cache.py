@@ -0,0 +1,137 @@
+import os
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Content-hash keyed cache around an Embeddings model (OpenAIEmbeddings).
+# Memory tier is an LRU bounded by entry count; the optional disk tier is a SQLite file.
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "10000"))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "")   # empty = memory only
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embeddings: Embeddings, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES, path: str = EMBEDDING_CACHE_PATH):
+        self.embeddings = embeddings
+        self.model_name = getattr(embeddings, "model", type(embeddings).__name__)
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        self.conn = None
+        if path:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self.conn.commit()
+
+    # ============================================ Storage ============================================
+
+    def key(self, text: str) -> str:
+        # The model name is part of the key so switching models never returns foreign vectors
+        return hashlib.sha256(f"{self.model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _get(self, key: str) -> np.ndarray | None:
+        with self.lock:
+            vector = self.memory.get(key)
+            if vector is not None:
+                self.memory.move_to_end(key)
+                return vector
+
+            if self.conn is None:
+                return None
+            row = self.conn.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+
+        if row is None:
+            return None
+        vector = np.frombuffer(row[0], dtype=np.float32)
+        self._remember(key, vector)
+        return vector
+
+    def _remember(self, key: str, vector: np.ndarray):
+        with self.lock:
+            self.memory[key] = vector
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.max_entries:
+                self.memory.popitem(last=False)
+
+    def _put_many(self, items: dict[str, np.ndarray]):
+        for key, vector in items.items():
+            self._remember(key, vector)
+
+        if self.conn is not None and items:
+            with self.lock:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings VALUES (?, ?)",
+                    [(key, vector.tobytes()) for key, vector in items.items()],
+                )
+                self.conn.commit()
+
+    def _lookup(self, texts: list[str]) -> tuple[list[str], dict[str, np.ndarray], list[str]]:
+        "Returns (keys in order, cached vectors by key, unique texts still to embed)."
+        keys = [self.key(text) for text in texts]
+        found: dict[str, np.ndarray] = {}
+        missing: dict[str, str] = {}
+
+        for text, key in zip(texts, keys):
+            if key in found or key in missing:
+                continue
+            vector = self._get(key)
+            if vector is None:
+                missing[key] = text
+            else:
+                found[key] = vector
+
+        with self.lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+
+        return keys, found, list(missing.values())
+
+    def _merge(self, keys: list[str], found: dict[str, np.ndarray], texts: list[str], vectors: list[list[float]]) -> list[list[float]]:
+        fresh = {self.key(text): np.asarray(vector, dtype=np.float32) for text, vector in zip(texts, vectors)}
+        self._put_many(fresh)
+        found.update(fresh)
+        return [found[key].tolist() for key in keys]
+
+    # ============================================ Embeddings API ============================================
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        # One underlying call for all the cache misses in the batch
+        keys, found, missing = self._lookup(texts)
+        vectors = self.embeddings.embed_documents(missing) if missing else []
+        return self._merge(keys, found, missing, vectors)
+
+    def embed_query(self, text: str) -> list[float]:
+        keys, found, missing = self._lookup([text])
+        vectors = [self.embeddings.embed_query(missing[0])] if missing else []
+        return self._merge(keys, found, missing, vectors)[0]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys, found, missing = self._lookup(texts)
+        vectors = await self.embeddings.aembed_documents(missing) if missing else []
+        return self._merge(keys, found, missing, vectors)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        keys, found, missing = self._lookup([text])
+        vectors = [await self.embeddings.aembed_query(missing[0])] if missing else []
+        return self._merge(keys, found, missing, vectors)[0]
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self.memory),
+                "disk": self.conn is not None,
+            }
@@ -0,0 +1,61 @@
+import time
+from typing import Any, Callable
+
+# Registry of compiled LangGraph graphs.
+# Each agent module registers a builder; the API compiles every graph once at startup
+# and endpoints only look the compiled graph up, so no StateGraph is rebuilt per request.
+
+_builders: dict[str, Callable[[], Any]] = {}
+_graphs: dict[str, Any] = {}
+_stats: dict[str, dict] = {}
+
+
+def register(name: str):
+    "Decorator that registers a zero-argument graph builder under `name`."
+    def decorator(builder: Callable[[], Any]):
+        _builders[name] = builder
+        _stats[name] = {"compile_seconds": None, "compiles": 0, "lookups": 0}
+        return builder
+    return decorator
+
+
+def _compile(name: str):
+    started = time.perf_counter()
+    graph = _builders[name]()
+    elapsed = time.perf_counter() - started
+
+    _graphs[name] = graph
+    _stats[name]["compile_seconds"] = round(elapsed, 6)
+    _stats[name]["compiles"] += 1
+    print(f"---- compiled graph '{name}' in {elapsed * 1000:.2f} ms")
+    return graph
+
+
+def compile_all() -> dict:
+    "Compiles every registered graph that has not been compiled yet and returns the report."
+    started = time.perf_counter()
+    for name in _builders:
+        if name not in _graphs:
+            _compile(name)
+
+    report = compile_report()
+    report["startup_seconds"] = round(time.perf_counter() - started, 6)
+    return report
+
+
+def get_graph(name: str):
+    "Returns the compiled graph, compiling it on first use if startup did not."
+    if name not in _builders:
+        raise KeyError(f"No graph registered under '{name}'")
+
+    graph = _graphs.get(name)
+    if graph is None:
+        graph = _compile(name)
+
+    _stats[name]["lookups"] += 1
+    return graph
+
+
+def compile_report() -> dict:
+    "Compile time, compile count and lookup count per graph. `compiles` should stay at 1."
+    return {"graphs": {name: dict(stats) for name, stats in _stats.items()}}
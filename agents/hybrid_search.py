@@ -0,0 +1,166 @@
+"""
+Hybrid lexical + vector retrieval over the jobs corpus, used by the "hybrid" search planner.
+
+- Lexical: BM25 from the jobs_fts FTS5 index, bm25(jobs_fts) with job_title boosted over job_description
+- Vector: Jobs_Documents search (Qdrant or the local index, see agents/vector_search.py)
+- The two rankings are merged on doc_id with reciprocal-rank fusion: rrf = sum(1 / (HYBRID_RRF_K + rank))
+
+The structured filters are applied in SQL (B-tree indexes for work_style / work_type / salary, jobs_fts for
+location / company), on the lexical query and on the vector hits, so both sources agree on them. Everything
+is read from the live table, so re-running the ingestion needs no restart.
+"""
+import os
+import re
+import json
+import asyncio
+import sqlite3
+
+from dotenv import load_dotenv
+
+from agents.vector_search import search_jobs_scored, asearch_jobs_scored
+from agents import jobs_db
+from agents.jobs_db import row_to_job, fts_phrase
+
+load_dotenv()
+
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))   # per source, before fusion
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+TITLE_WEIGHT = 3   # a title match counts three times a description match
+
+# bm25() column weights, in jobs_fts column order: job_title, company_name, location, job_description
+BM25_WEIGHTS = (TITLE_WEIGHT, 0, 0, 1)
+
+# Vector-side filters Qdrant can apply itself (metadata MatchText); salary / company only exist in the table
+VECTOR_FILTER_KEYS = ("work_style", "work_type", "location")
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+# ============================================ Helper Functions ============================================
+
+def tokenize(text) -> list[str]:
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+
+def text_match(text: str) -> str | None:
+    "FTS5 query for any of the text's words in the title or the description."
+    tokens = list(dict.fromkeys(tokenize(text)))
+    if not tokens:
+        return None
+    return "{job_title job_description} : (" + " OR ".join(f'"{token}"' for token in tokens) + ")"
+
+
+def filter_sql(filters: dict) -> tuple[list[str], list[str], dict]:
+    "(conditions on jobs, jobs_fts MATCH clauses, params) for a PlanFormat-style dict; None values are ignored."
+    conditions, matches, params = [], [], {}
+
+    for key in ("work_style", "work_type"):
+        if filters.get(key):
+            conditions.append(f"jobs.{key} = :{key}")
+            params[key] = filters[key]
+
+    if filters.get("salary"):
+        conditions.append("jobs.max_salary >= :salary")
+        params["salary"] = filters["salary"]
+
+    for key in ("location", "company_name"):
+        phrase = fts_phrase(filters[key]) if filters.get(key) else None
+        if phrase:
+            matches.append(f"{key} : {phrase}")
+
+    return conditions, matches, params
+
+
+# ============================================ Sources ============================================
+
+def lexical_search(text: str, filters: dict, n: int) -> list[tuple[sqlite3.Row, float]]:
+    "Top n (row, bm25 score) among the rows passing the filters; higher is better."
+    match = text_match(text)
+    if match is None:
+        return []
+
+    conditions, matches, params = filter_sql(filters)
+    where = " AND ".join(["jobs_fts MATCH :match"] + conditions)
+    weights = ", ".join(map(str, BM25_WEIGHTS))
+    rows = jobs_db.fetch_all(
+        f"""SELECT jobs.*, -bm25(jobs_fts, {weights}) AS score
+        FROM jobs_fts JOIN jobs ON jobs.job_id = jobs_fts.rowid
+        WHERE {where}
+        ORDER BY score DESC LIMIT :n""",
+        {**params, "match": " AND ".join([match] + matches), "n": n},
+    )
+    return [(row, row["score"]) for row in rows]
+
+
+def allowed_rows(doc_ids: list[str], filters: dict) -> dict[str, sqlite3.Row]:
+    "doc_id -> row for the vector hits that are in the table and pass every filter."
+    if not doc_ids:
+        return {}
+
+    conditions, matches, params = filter_sql(filters)
+    conditions = ["jobs.doc_id IN (SELECT value FROM json_each(:ids))"] + conditions
+    if matches:
+        conditions.append("jobs.job_id IN (SELECT rowid FROM jobs_fts WHERE jobs_fts MATCH :filter_match)")
+        params["filter_match"] = " AND ".join(matches)
+
+    rows = jobs_db.fetch_all(f"SELECT jobs.* FROM jobs WHERE {' AND '.join(conditions)}", {**params, "ids": json.dumps(doc_ids)})
+    return {row["doc_id"]: row for row in rows}
+
+
+# ============================================ Fusion ============================================
+
+def vector_filters(filters: dict) -> dict:
+    return {key: filters.get(key) for key in VECTOR_FILTER_KEYS}
+
+
+def fuse(lexical: list[tuple[sqlite3.Row, float]], vector: list[tuple[dict, float]], allowed: dict[str, sqlite3.Row], k: int) -> list[dict]:
+    """
+    Reciprocal-rank fusion of the two rankings on doc_id. Each returned job carries its per-source
+    scores: {"lexical": bm25 or None, "vector": cosine or None, "rrf": fused score}.
+    """
+    rows: dict[str, sqlite3.Row] = {}
+    fused: dict[str, dict] = {}
+
+    for rank, (row, score) in enumerate(lexical, start=1):
+        rows[row["doc_id"]] = row
+        fused[row["doc_id"]] = {"lexical": round(score, 4), "vector": None, "rrf": 1 / (HYBRID_RRF_K + rank)}
+
+    rank = 0
+    for job, score in vector:
+        row = allowed.get(job["doc_id"])
+        if row is None:
+            # Filtered out by the table-only filters (salary, company) or not in the table
+            continue
+        rows[row["doc_id"]] = row
+        entry = fused.setdefault(row["doc_id"], {"lexical": None, "vector": None, "rrf": 0.0})
+        if entry["vector"] is None:
+            rank += 1
+            entry["vector"] = round(float(score), 4)
+            entry["rrf"] += 1 / (HYBRID_RRF_K + rank)
+
+    ranked = sorted(fused.items(), key=lambda item: item[1]["rrf"], reverse=True)[:k]
+    return [
+        {**row_to_job(rows[doc_id]), "scores": {**scores, "rrf": round(scores["rrf"], 6)}}
+        for doc_id, scores in ranked
+    ]
+
+
+def hybrid_query(query_text: str, vector: list[float], filters: dict, k: int = 5) -> list[dict]:
+    """
+    query_text feeds BM25 (user query + extracted job title keywords),
+    vector is the embedded user query, filters is a PlanFormat-style dict.
+    """
+    lexical = lexical_search(query_text, filters, HYBRID_CANDIDATES)
+    vector_hits = search_jobs_scored(vector, HYBRID_CANDIDATES, vector_filters(filters))
+    allowed = allowed_rows([job["doc_id"] for job, _ in vector_hits], filters)
+    return fuse(lexical, vector_hits, allowed, k)
+
+
+async def ahybrid_query(query_text: str, vector: list[float], filters: dict, k: int = 5) -> list[dict]:
+    # The FTS query runs in a worker thread (its own read-only connection) while the vector search is awaited
+    lexical, vector_hits = await asyncio.gather(
+        asyncio.to_thread(lexical_search, query_text, filters, HYBRID_CANDIDATES),
+        asearch_jobs_scored(vector, HYBRID_CANDIDATES, vector_filters(filters)),
+    )
+    allowed = await asyncio.to_thread(allowed_rows, [job["doc_id"] for job, _ in vector_hits], filters)
+    return fuse(lexical, vector_hits, allowed, k)
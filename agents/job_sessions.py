@@ -0,0 +1,66 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Server-side job-search sessions: per session_id, the CV summary and the current job list as doc ids.
+# /analyze-cv starts the session, every /job-search turn reads and replaces the list, so clients only
+# send the session_id and the query. A SQLite file so every API worker process sees the same sessions.
+JOB_SESSIONS_PATH = os.getenv("JOB_SESSIONS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'job_sessions.db'))
+JOB_SESSION_TTL = int(os.getenv("JOB_SESSION_TTL", str(7 * 24 * 60 * 60)))
+
+
+class JobSessionStore:
+    def __init__(self, path: str = JOB_SESSIONS_PATH, ttl: int = JOB_SESSION_TTL):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS job_sessions (
+                session_id TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                job_ids TEXT NOT NULL,
+                updated REAL NOT NULL
+            )"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_job_sessions_updated ON job_sessions (updated)")
+        self.conn.commit()
+
+    def get(self, session_id: str) -> dict | None:
+        'The live session as {"summary", "job_ids"}, or None.'
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT summary, job_ids, updated FROM job_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        if row is None or time.time() - row[2] > self.ttl:
+            return None
+        return {"summary": row[0], "job_ids": json.loads(row[1])}
+
+    def save(self, session_id: str, summary: str, job_ids: list[str]):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO job_sessions VALUES (?, ?, ?, ?)",
+                (session_id, summary, json.dumps(job_ids), now),
+            )
+            self.conn.execute("DELETE FROM job_sessions WHERE updated < ?", (now - self.ttl,))
+            self.conn.commit()
+
+    def set_jobs(self, session_id: str, job_ids: list[str]) -> bool:
+        "Replaces the job list of an existing session. False when there is no such session."
+        with self.lock:
+            updated = self.conn.execute(
+                "UPDATE job_sessions SET job_ids = ?, updated = ? WHERE session_id = ?",
+                (json.dumps(job_ids), time.time(), session_id),
+            ).rowcount
+            self.conn.commit()
+        return updated > 0
+
+
+job_sessions = JobSessionStore()
@@ -0,0 +1,173 @@
+"""
+Read-only access to the SQLite jobs database (data/jobs_database.db).
+
+Every thread gets its own connection, opened once and reused:
+- WAL journal, so readers never wait on the ingestion writer
+- mmap'd reads (JOBS_DB_MMAP_SIZE bytes)
+- query_only, so nothing using this module can modify the table
+- the sqlite3 statement cache keeps the parameterized queries prepared per connection
+"""
+import os
+import re
+import json
+import sqlite3
+import hashlib
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'jobs_database.db')
+JOBS_DB_PATH = os.path.abspath(os.getenv("JOBS_DB_PATH", DEFAULT_DB_PATH))
+JOBS_DB_MMAP_SIZE = int(os.getenv("JOBS_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+JOBS_DB_STATEMENT_CACHE = 256
+
+JOB_FIELDS = (
+    "job_id", "job_title", "company_name", "location", "work_style", "work_type",
+    "min_salary", "max_salary", "job_description",
+)
+
+# What list responses carry per job; the description is fetched on demand (GET /jobs)
+COMPACT_JOB_FIELDS = (
+    "doc_id", "job_title", "company_name", "location", "work_style", "work_type",
+    "salary", "min_salary", "max_salary",
+)
+
+local = threading.local()
+connections: list[sqlite3.Connection] = []
+connections_lock = threading.Lock()
+generation = 0   # bumped by close_all so threads drop their closed connection
+
+
+def connect(path: str = JOBS_DB_PATH) -> sqlite3.Connection:
+    # check_same_thread=False only so close_all can close it; each connection is used by one thread
+    conn = sqlite3.connect(path, check_same_thread=False, cached_statements=JOBS_DB_STATEMENT_CACHE)
+    conn.row_factory = sqlite3.Row
+
+    try:
+        # Persistent in the file; fails harmlessly when the file or directory is read-only
+        conn.execute("PRAGMA journal_mode=WAL")
+    except sqlite3.OperationalError as e:
+        print(f"jobs db: could not switch to WAL ({e})")
+    conn.execute(f"PRAGMA mmap_size={JOBS_DB_MMAP_SIZE}")
+    conn.execute("PRAGMA query_only=ON")
+    return conn
+
+
+def get_connection() -> sqlite3.Connection:
+    "The calling thread's connection, opened on first use."
+    conn = getattr(local, "conn", None)
+    if conn is None or local.generation != generation:
+        conn = connect()
+        with connections_lock:
+            connections.append(conn)
+            local.conn = conn
+            local.generation = generation
+    return conn
+
+
+def fetch_all(query: str, params: dict | tuple = ()) -> list[sqlite3.Row]:
+    return get_connection().execute(query, params).fetchall()
+
+
+def fetch_one(query: str, params: dict | tuple = ()) -> sqlite3.Row | None:
+    return get_connection().execute(query, params).fetchone()
+
+
+def close_all():
+    "Closes every thread's connection (API shutdown). Threads reconnect on their next query."
+    global generation
+    with connections_lock:
+        generation += 1
+        for conn in connections:
+            conn.close()
+        connections.clear()
+
+
+# ============================================ Jobs ============================================
+
+def doc_id(job_title, company_name, location) -> str:
+    "Stable job id: the Jobs_Documents point id, md5 of title_company_location (raw location, newlines as spaces)."
+    location = str(location).replace('\n', ' ')
+    unique_identifier = f"{job_title}_{company_name}_{location}".lower().encode('utf-8')
+    return hashlib.md5(unique_identifier).hexdigest()
+
+
+def row_to_job(row: sqlite3.Row) -> dict:
+    "The job dict used across the app, from a jobs table row."
+    return {
+        'doc_id': row["doc_id"],
+        'job_title': row["job_title"],
+        'company_name': row["company_name"],
+        'work_type': row["work_type"],
+        'work_style': row["work_style"],
+        'location': row["location"],
+        'salary': f"""{row["min_salary"]} - {row["max_salary"]}""",
+        'min_salary': row["min_salary"],
+        'max_salary': row["max_salary"],
+        'job_description': row["job_description"],
+    }
+
+
+def compact_job(job: dict) -> dict:
+    return {field: job.get(field) for field in COMPACT_JOB_FIELDS}
+
+
+def get_jobs(doc_ids: list[str]) -> list[dict]:
+    "Full job dicts for the given doc ids, in the given order; unknown ids are skipped."
+    if not doc_ids:
+        return []
+    rows = fetch_all("SELECT * FROM jobs WHERE doc_id IN (SELECT value FROM json_each(?))", (json.dumps(doc_ids),))
+    by_id = {row["doc_id"]: row for row in rows}
+    return [row_to_job(by_id[value]) for value in doc_ids if value in by_id]
+
+
+# ============================================ Queries ============================================
+
+def fts_phrase(value: str) -> str | None:
+    # "Data Analyst" -> "data analyst" *  (phrase with a prefix match on the last word, like LIKE '%data analyst%')
+    tokens = re.findall(r"\w+", str(value).lower())
+    if not tokens:
+        return None
+    return f'"{" ".join(tokens)}" *'
+
+
+def list_jobs(after: int = 0, limit: int = 100, fields: list[str] = JOB_FIELDS, filters: dict | None = None) -> list[sqlite3.Row]:
+    """
+    Keyset page of the jobs table: rows with job_id > after, in job_id order.
+    filters: work_style / work_type (exact), location (words, through jobs_fts), min_salary.
+    `fields` must come from JOB_FIELDS; job_id is always selected for the next cursor.
+    """
+    filters = {key: value for key, value in (filters or {}).items() if value is not None}
+    columns = ", ".join(["job_id"] + [field for field in fields if field != "job_id"])
+
+    conditions = ["job_id > :after"]
+    params = {"after": after, "limit": limit}
+
+    for key in ("work_style", "work_type"):
+        if key in filters:
+            conditions.append(f"{key} = :{key}")
+            params[key] = filters[key]
+
+    if filters.get("location") and fts_phrase(filters["location"]):
+        conditions.append("job_id IN (SELECT rowid FROM jobs_fts WHERE jobs_fts MATCH :match)")
+        params["match"] = f"location : {fts_phrase(filters['location'])}"
+
+    if filters.get("min_salary"):
+        conditions.append("max_salary >= :min_salary")
+        params["min_salary"] = filters["min_salary"]
+
+    where = " AND ".join(conditions)
+    return fetch_all(f"SELECT {columns} FROM jobs WHERE {where} ORDER BY job_id LIMIT :limit", params)
+
+
+def db_version() -> str:
+    "Changes whenever the database file (or its WAL) is written; used for HTTP ETags."
+    parts = []
+    for path in (JOBS_DB_PATH, f"{JOBS_DB_PATH}-wal"):
+        try:
+            stat = os.stat(path)
+            parts.append(f"{stat.st_mtime_ns}-{stat.st_size}")
+        except FileNotFoundError:
+            parts.append("0")
+    return ":".join(parts)
@@ -0,0 +1,365 @@
+import os
+import re
+import json
+import asyncio
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Cache in front of model.with_structured_output(...) calls.
+# Tier 1: exact match on the normalized query text. Tier 2: embedding similarity against cached queries.
+# Entries live in one namespace per schema and expire by TTL; the oldest-used entries are evicted first.
+# The cached values are extracted parameters, so a similarity hit must not change them: with a guard, each
+# namespace is split into buckets by the query's signature (e.g. its numbers and place names) and tier 2
+# only compares queries of the same bucket ("minimal 20 juta" never matches "minimal 30 juta").
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory")   # memory | sqlite | off
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'llm_cache.db'))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(24 * 60 * 60)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_SEMANTIC = os.getenv("LLM_CACHE_SEMANTIC", "true").lower() == "true"
+LLM_CACHE_SIMILARITY = float(os.getenv("LLM_CACHE_SIMILARITY", "0.95"))
+# Tier 2 compares against at most this many of the bucket's most recently used entries
+LLM_CACHE_SEMANTIC_CANDIDATES = int(os.getenv("LLM_CACHE_SEMANTIC_CANDIDATES", "500"))
+
+
+# ============================================ Helper Functions ============================================
+
+def normalize_query(text: str) -> str:
+    "Lowercase, drop punctuation and collapse whitespace so trivial variations share a key."
+    text = re.sub(r"[^\w\s/-]", " ", text.lower())
+    return " ".join(text.split())
+
+
+def query_key(text: str) -> str:
+    return hashlib.sha256(normalize_query(text).encode("utf-8")).hexdigest()
+
+
+def schema_namespace(schema) -> str:
+    # Schema name + hash of its JSON schema, so changing a schema never serves stale entries
+    digest = hashlib.md5(json.dumps(schema.model_json_schema(), sort_keys=True).encode("utf-8")).hexdigest()[:8]
+    return f"{schema.__name__}:{digest}"
+
+
+# ============================================ Backends ============================================
+
+class MemoryCacheBackend:
+    "In-process LRU + TTL store."
+
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES, ttl: int = LLM_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[tuple[str, str], dict] = OrderedDict()
+        # namespace -> its keys in use order, so a similarity scan only walks its own namespace
+        self.namespaces: dict[str, OrderedDict[str, None]] = {}
+
+    def _drop(self, namespace: str, key: str):
+        self.entries.pop((namespace, key), None)
+        keys = self.namespaces.get(namespace)
+        if keys is not None:
+            keys.pop(key, None)
+            if not keys:
+                del self.namespaces[namespace]
+
+    def _touch(self, namespace: str, key: str):
+        self.entries.move_to_end((namespace, key))
+        keys = self.namespaces.setdefault(namespace, OrderedDict())
+        keys[key] = None
+        keys.move_to_end(key)
+
+    def get(self, namespace: str, key: str) -> Any | None:
+        with self.lock:
+            entry = self.entries.get((namespace, key))
+            if entry is None:
+                return None
+            if time.time() - entry["created"] > self.ttl:
+                self._drop(namespace, key)
+                return None
+            self._touch(namespace, key)
+            return entry["value"]
+
+    def set(self, namespace: str, key: str, value: Any, embedding: list[float] | None = None):
+        with self.lock:
+            self.entries[(namespace, key)] = {"value": value, "embedding": embedding, "created": time.time()}
+            self._touch(namespace, key)
+            while len(self.entries) > self.max_entries:
+                oldest_namespace, oldest_key = next(iter(self.entries))
+                self._drop(oldest_namespace, oldest_key)
+
+    def embeddings(self, namespace: str, limit: int = LLM_CACHE_SEMANTIC_CANDIDATES) -> list[tuple[str, list[float]]]:
+        "The namespace's most recently used entries that have an embedding (at most limit)."
+        now = time.time()
+        candidates = []
+        with self.lock:
+            for key in reversed(self.namespaces.get(namespace, {})):
+                entry = self.entries[(namespace, key)]
+                if entry["embedding"] is not None and now - entry["created"] <= self.ttl:
+                    candidates.append((key, entry["embedding"]))
+                    if len(candidates) >= limit:
+                        break
+        return candidates
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class SQLiteCacheBackend:
+    "File-backed store shared across processes and restarts. Same LRU + TTL rules as the memory backend."
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_entries: int = LLM_CACHE_MAX_ENTRIES, ttl: int = LLM_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS llm_cache (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                embedding BLOB,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_namespace_used ON llm_cache (namespace, last_used)")
+        self.conn.commit()
+
+    def get(self, namespace: str, key: str) -> Any | None:
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value, created FROM llm_cache WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self.conn.execute("DELETE FROM llm_cache WHERE namespace = ? AND key = ?", (namespace, key))
+                self.conn.commit()
+                return None
+            self.conn.execute(
+                "UPDATE llm_cache SET last_used = ? WHERE namespace = ? AND key = ?", (now, namespace, key)
+            )
+            self.conn.commit()
+            return json.loads(row[0])
+
+    def set(self, namespace: str, key: str, value: Any, embedding: list[float] | None = None):
+        now = time.time()
+        blob = np.asarray(embedding, dtype=np.float32).tobytes() if embedding is not None else None
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), blob, now, now),
+            )
+            self.conn.execute("DELETE FROM llm_cache WHERE created < ?", (now - self.ttl,))
+            self.conn.execute(
+                """DELETE FROM llm_cache WHERE rowid IN (
+                    SELECT rowid FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entries,),
+            )
+            self.conn.commit()
+
+    def embeddings(self, namespace: str, limit: int = LLM_CACHE_SEMANTIC_CANDIDATES) -> list[tuple[str, list[float]]]:
+        with self.lock:
+            rows = self.conn.execute(
+                """SELECT key, embedding FROM llm_cache
+                WHERE namespace = ? AND embedding IS NOT NULL AND created >= ?
+                ORDER BY last_used DESC LIMIT ?""",
+                (namespace, time.time() - self.ttl, limit),
+            ).fetchall()
+        return [(key, np.frombuffer(blob, dtype=np.float32)) for key, blob in rows]
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+# ============================================ Semantic Cache ============================================
+
+class CacheStats:
+    "Hit/miss counters per namespace plus a histogram of best similarity scores to tune the threshold."
+
+    BUCKETS = (0.80, 0.85, 0.90, 0.93, 0.95, 0.97, 0.99)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: dict[str, dict[str, int]] = {}
+        self.similarity_histogram = {f">={bucket}": 0 for bucket in self.BUCKETS}
+        self.similarity_histogram["<0.80"] = 0
+
+    def record(self, namespace: str, outcome: str):
+        with self.lock:
+            counters = self.counters.setdefault(namespace, {"exact_hits": 0, "semantic_hits": 0, "misses": 0})
+            counters[outcome] += 1
+
+    def record_similarity(self, score: float):
+        label = "<0.80"
+        for bucket in self.BUCKETS:
+            if score >= bucket:
+                label = f">={bucket}"
+        with self.lock:
+            self.similarity_histogram[label] += 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            totals = {"exact_hits": 0, "semantic_hits": 0, "misses": 0}
+            for counters in self.counters.values():
+                for name, value in counters.items():
+                    totals[name] += value
+            lookups = sum(totals.values())
+            return {
+                **totals,
+                "hit_rate": round((totals["exact_hits"] + totals["semantic_hits"]) / lookups, 4) if lookups else 0.0,
+                "namespaces": {name: dict(counters) for name, counters in self.counters.items()},
+                "best_similarity_histogram": dict(self.similarity_histogram),
+            }
+
+
+class SemanticCache:
+    def __init__(self, backend, embeddings=None, threshold: float = LLM_CACHE_SIMILARITY, guard=None):
+        self.backend = backend
+        self.embeddings = embeddings
+        self.threshold = threshold
+        # guard(text) -> str: queries only share a similarity bucket when their guard strings are equal
+        self.guard = guard
+        self.stats = CacheStats()
+
+    def bucket(self, namespace: str, text: str) -> str:
+        signature = self.guard(normalize_query(text)) if self.guard is not None else ""
+        if not signature:
+            return namespace
+        return f"{namespace}#{hashlib.sha1(signature.encode('utf-8')).hexdigest()[:12]}"
+
+    def best_match(self, namespace: str, vector: list[float]) -> tuple[str | None, float]:
+        candidates = self.backend.embeddings(namespace)
+        if not candidates:
+            return None, 0.0
+
+        keys = [key for key, _ in candidates]
+        matrix = np.asarray([embedding for _, embedding in candidates], dtype=np.float32)
+        query = np.asarray(vector, dtype=np.float32)
+
+        scores = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query) + 1e-12)
+        best = int(np.argmax(scores))
+        return keys[best], float(scores[best])
+
+    def _exact_lookup(self, namespace: str, text: str) -> tuple[str, Any | None]:
+        "(the text's bucket, exact-tier value or None)."
+        bucket = self.bucket(namespace, text)
+        return bucket, self.backend.get(bucket, query_key(text))
+
+    def _semantic_lookup(self, namespace: str, vector: list[float]) -> Any | None:
+        key, score = self.best_match(namespace, vector)
+        if key is None:
+            return None
+
+        self.stats.record_similarity(score)
+        if score < self.threshold:
+            return None
+        return self.backend.get(namespace, key)
+
+    def lookup(self, namespace: str, text: str, semantic: bool = True) -> tuple[Any | None, list[float] | None]:
+        """
+        Returns (cached value or None, query embedding to reuse when storing a miss).
+        semantic=False only tries the exact tier (and stores the miss without an embedding).
+        """
+        bucket, value = self._exact_lookup(namespace, text)
+        if value is not None:
+            self.stats.record(namespace, "exact_hits")
+            return value, None
+
+        vector = None
+        if self.embeddings is not None and semantic:
+            vector = self.embeddings.embed_query(normalize_query(text))
+            value = self._semantic_lookup(bucket, vector)
+            if value is not None:
+                self.stats.record(namespace, "semantic_hits")
+                return value, vector
+
+        self.stats.record(namespace, "misses")
+        return None, vector
+
+    async def alookup(self, namespace: str, text: str, semantic: bool = True) -> tuple[Any | None, list[float] | None]:
+        # The backend queries and the similarity scan run in a worker thread, off the event loop
+        bucket, value = await asyncio.to_thread(self._exact_lookup, namespace, text)
+        if value is not None:
+            self.stats.record(namespace, "exact_hits")
+            return value, None
+
+        vector = None
+        if self.embeddings is not None and semantic:
+            vector = await self.embeddings.aembed_query(normalize_query(text))
+            value = await asyncio.to_thread(self._semantic_lookup, bucket, vector)
+            if value is not None:
+                self.stats.record(namespace, "semantic_hits")
+                return value, vector
+
+        self.stats.record(namespace, "misses")
+        return None, vector
+
+    def store(self, namespace: str, text: str, value: Any, vector: list[float] | None = None):
+        if vector is not None and not isinstance(vector, list):
+            vector = np.asarray(vector, dtype=np.float32).tolist()
+        self.backend.set(self.bucket(namespace, text), query_key(text), value, vector)
+
+    async def astore(self, namespace: str, text: str, value: Any, vector: list[float] | None = None):
+        await asyncio.to_thread(self.store, namespace, text, value, vector)
+
+    def wrap(self, structured_model, schema) -> "CachedStructuredOutput":
+        return CachedStructuredOutput(self, structured_model, schema)
+
+    @classmethod
+    def from_env(cls, embeddings=None, guard=None) -> "SemanticCache | None":
+        if LLM_CACHE_BACKEND == "off":
+            return None
+        backend = SQLiteCacheBackend() if LLM_CACHE_BACKEND == "sqlite" else MemoryCacheBackend()
+        return cls(backend, embeddings if LLM_CACHE_SEMANTIC else None, guard=guard)
+
+
+class CachedStructuredOutput:
+    """
+    Wraps model.with_structured_output(schema). invoke/ainvoke take the messages plus the
+    user query the prompt was built from; the query is the cache key. semantic=False skips the
+    similarity tier for prompts whose answer depends on more than the key's wording.
+    """
+
+    def __init__(self, cache: SemanticCache | None, structured_model, schema):
+        self.cache = cache
+        self.structured_model = structured_model
+        self.schema = schema
+        self.namespace = schema_namespace(schema)
+
+    def invoke(self, messages: list, cache_key: str, semantic: bool = True):
+        if self.cache is None:
+            return self.structured_model.invoke(messages)
+
+        value, vector = self.cache.lookup(self.namespace, cache_key, semantic)
+        if value is not None:
+            return self.schema.model_validate(value)
+
+        response = self.structured_model.invoke(messages)
+        self.cache.store(self.namespace, cache_key, response.model_dump(), vector)
+        return response
+
+    async def ainvoke(self, messages: list, cache_key: str, semantic: bool = True):
+        if self.cache is None:
+            return await self.structured_model.ainvoke(messages)
+
+        value, vector = await self.cache.alookup(self.namespace, cache_key, semantic)
+        if value is not None:
+            return self.schema.model_validate(value)
+
+        response = await self.structured_model.ainvoke(messages)
+        await self.cache.astore(self.namespace, cache_key, response.model_dump(), vector)
+        return response
@@ -0,0 +1,162 @@
+"""
+Local in-process vector index for the Jobs_Documents corpus.
+
+Holds the text-embedding-3-small vectors as a normalized float32 matrix (memory-mapped .npy)
+plus the Qdrant payloads (.json), so RAG searches don't need a network round-trip.
+
+Build it from the existing collection (vectors are copied, nothing is re-embedded):
+    python -m agents.local_index build
+"""
+import os
+import re
+import sys
+import json
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+load_dotenv()
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+JOBS_LOCAL_INDEX_PATH = os.getenv("JOBS_LOCAL_INDEX_PATH", os.path.join(DATA_DIR, "jobs_index"))
+JOBS_LOCAL_INDEX_HNSW = os.getenv("JOBS_LOCAL_INDEX_HNSW", "false").lower() == "true"
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text) -> frozenset[str]:
+    return frozenset(TOKEN_PATTERN.findall(str(text).lower()))
+
+
+class LocalJobIndex:
+    def __init__(self, vectors: np.ndarray, payloads: list[dict], ids: list[str], use_hnsw: bool = False):
+        self.vectors = vectors
+        self.payloads = payloads
+        self.ids = ids
+
+        # Pre-tokenized metadata fields for the MatchText-style filters
+        self.tokens: dict[str, list[frozenset[str]]] = {}
+        for field in ("work_style", "work_type", "location", "job_title", "company_name"):
+            self.tokens[field] = [tokenize(payload.get("metadata", {}).get(field, "")) for payload in payloads]
+
+        self.hnsw = None
+        if use_hnsw:
+            if hnswlib is None:
+                print("hnswlib is not installed, falling back to brute-force search")
+            else:
+                self.hnsw = hnswlib.Index(space="ip", dim=vectors.shape[1])
+                self.hnsw.init_index(max_elements=len(ids), ef_construction=200, M=16)
+                self.hnsw.add_items(np.asarray(vectors), np.arange(len(ids)))
+                self.hnsw.set_ef(64)
+
+    def __len__(self):
+        return len(self.ids)
+
+    # ============================================ Persistence ============================================
+
+    @classmethod
+    def load(cls, path: str = JOBS_LOCAL_INDEX_PATH, use_hnsw: bool = JOBS_LOCAL_INDEX_HNSW) -> "LocalJobIndex":
+        started = time.perf_counter()
+        vectors = np.load(f"{path}.npy", mmap_mode="r")
+        with open(f"{path}.json", encoding="utf-8") as f:
+            data = json.load(f)
+
+        index = cls(vectors, data["payloads"], data["ids"], use_hnsw=use_hnsw)
+        print(f"---- loaded local job index ({len(index)} vectors) in {(time.perf_counter() - started) * 1000:.1f} ms")
+        return index
+
+    @staticmethod
+    def save(path: str, vectors: np.ndarray, payloads: list[dict], ids: list[str]):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.save(f"{path}.npy", vectors / np.maximum(norms, 1e-12))
+
+        with open(f"{path}.json", "w", encoding="utf-8") as f:
+            json.dump({"ids": ids, "payloads": payloads}, f, ensure_ascii=False)
+
+    # ============================================ Search ============================================
+
+    def filter_mask(self, parameters: dict | None) -> np.ndarray | None:
+        """
+        Equivalent of the metadata.<key> MatchText conditions: every token of the filter value
+        must appear in the field (case-insensitive). None values are ignored.
+        """
+        parameters = {key: value for key, value in (parameters or {}).items() if value is not None}
+        if not parameters:
+            return None
+
+        mask = np.ones(len(self.ids), dtype=bool)
+        for key, value in parameters.items():
+            wanted = tokenize(value)
+            field_tokens = self.tokens.get(key)
+            if field_tokens is None:
+                field_tokens = [tokenize(payload.get("metadata", {}).get(key, "")) for payload in self.payloads]
+                self.tokens[key] = field_tokens
+            mask &= np.fromiter((wanted <= tokens for tokens in field_tokens), dtype=bool, count=len(self.ids))
+        return mask
+
+    def search(self, vector: list[float], k: int, parameters: dict | None = None) -> list[tuple[dict, float]]:
+        "Cosine top-k with optional payload filtering. Returns (payload, score) pairs, best first."
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        mask = self.filter_mask(parameters)
+
+        if self.hnsw is not None:
+            allowed = None if mask is None else (lambda label: bool(mask[label]))
+            limit = min(k, len(self) if mask is None else int(mask.sum()))
+            if limit == 0:
+                return []
+            labels, distances = self.hnsw.knn_query(query, k=limit, filter=allowed)
+            return [(self.payloads[label], 1.0 - float(distance)) for label, distance in zip(labels[0], distances[0])]
+
+        candidates = np.arange(len(self)) if mask is None else np.flatnonzero(mask)
+        if len(candidates) == 0:
+            return []
+
+        scores = self.vectors[candidates] @ query
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.payloads[candidates[i]], float(scores[i])) for i in top]
+
+
+# ============================================ Build ============================================
+
+def build_from_qdrant(path: str = JOBS_LOCAL_INDEX_PATH, batch_size: int = 256):
+    "Copies every Jobs_Documents vector + payload from Qdrant into the local index files."
+    from qdrant_client import QdrantClient
+
+    client = QdrantClient(url=os.getenv("QDRANT_ENDPOINT"), api_key=os.getenv("QDRANT_API_KEY"))
+
+    ids, payloads, vectors = [], [], []
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name="Jobs_Documents",
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        for point in points:
+            ids.append(str(point.id))
+            payloads.append(point.payload)
+            vectors.append(point.vector)
+        if offset is None:
+            break
+
+    LocalJobIndex.save(path, vectors, payloads, ids)
+    print(f"Saved {len(ids)} vectors to {path}.npy / {path}.json")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "build":
+        build_from_qdrant()
+    else:
+        print("Usage: python -m agents.local_index build")
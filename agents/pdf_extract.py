@@ -0,0 +1,189 @@
+"""
+CV text extraction for the analysis graph.
+
+open -> extract (in page order, over a process pool for long documents, stopping once the
+token budget is covered) -> drop repeated headers/footers -> cut to the budget. Every stage is timed.
+
+This module is also what the pool's worker processes import, so it only depends on pymupdf.
+"""
+import os
+import re
+import time
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import pymupdf
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PDF_POOL_WORKERS = int(os.getenv("PDF_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_POOL_MIN_PAGES = int(os.getenv("PDF_POOL_MIN_PAGES", "8"))        # shorter documents are read in-process
+CV_TOKEN_BUDGET = int(os.getenv("CV_TOKEN_BUDGET", "6000"))           # CV text sent to the read_doc prompt
+CHARS_PER_TOKEN = 4                                                   # rough estimate for English/Indonesian text
+PAGES_PER_TASK = 4
+# Pages are read in order until this multiple of the budget is collected (headroom for the dedupe step);
+# a 60-page portfolio stops after the pages that can actually reach the prompt
+EXTRACT_MARGIN = 1.5
+
+# A line counts as header/footer when it is in the first/last EDGE_LINES lines of most pages
+EDGE_LINES = 3
+REPEATED_SHARE = 0.6
+# "3", "Page 3", "3 / 5", "Halaman 3 dari 5"; only removed from the edge lines (a "2019" mid-page stays)
+PAGE_NUMBER_PATTERN = re.compile(r"^\s*((page|halaman)\s*)?\d{1,3}(\s*(/|of|dari)\s*\d{1,3})?\s*$", re.IGNORECASE)
+
+pool = None
+
+
+# ============================================ Worker Pool ============================================
+
+def get_pool() -> ProcessPoolExecutor:
+    global pool
+    if pool is None:
+        # spawn: forking the API process (threads, open clients) is not safe
+        pool = ProcessPoolExecutor(max_workers=PDF_POOL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return pool
+
+
+def shutdown_pool():
+    global pool
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+        pool = None
+
+
+def open_document(source: str | bytes) -> pymupdf.Document:
+    if isinstance(source, (bytes, bytearray)):
+        return pymupdf.open(stream=source, filetype="pdf")
+    return pymupdf.open(source, filetype="pdf")
+
+
+def extract_pages(source: str | bytes, start: int, stop: int) -> list[str]:
+    "Runs in a worker: text of pages [start, stop)."
+    with open_document(source) as doc:
+        return [doc[i].get_text() for i in range(start, stop)]
+
+
+def read_pages(doc: pymupdf.Document, source: str | bytes, budget_chars: int) -> list[str]:
+    """
+    Text of the leading pages, in order, until EXTRACT_MARGIN * budget_chars is collected.
+    Long documents are read in waves of PDF_POOL_WORKERS tasks of PAGES_PER_TASK pages each.
+    """
+    use_pool = doc.page_count >= PDF_POOL_MIN_PAGES and PDF_POOL_WORKERS > 1
+    wave = PDF_POOL_WORKERS * PAGES_PER_TASK if use_pool else 1
+
+    pages = []
+    used = 0
+    start = 0
+    while start < doc.page_count and used < budget_chars * EXTRACT_MARGIN:
+        stop = min(start + wave, doc.page_count)
+        if use_pool:
+            futures = [
+                get_pool().submit(extract_pages, source, task_start, min(task_start + PAGES_PER_TASK, stop))
+                for task_start in range(start, stop, PAGES_PER_TASK)
+            ]
+            batch = [text for future in futures for text in future.result()]
+        else:
+            batch = [doc[start].get_text()]
+
+        pages.extend(batch)
+        used += sum(len(text) for text in batch)
+        start = stop
+    return pages
+
+
+# ============================================ Clean-up ============================================
+
+def strip_repeated_lines(pages: list[str]) -> tuple[list[str], int]:
+    "Removes headers/footers repeated across pages and bare page numbers. Returns (pages, lines removed)."
+    page_lines = [page.splitlines() for page in pages]
+
+    repeated = set()
+    if len(pages) >= 3:
+        edges = Counter()
+        for lines in page_lines:
+            edge = {line.strip() for line in lines[:EDGE_LINES] + lines[-EDGE_LINES:] if line.strip()}
+            edges.update(edge)
+        repeated = {line for line, count in edges.items() if count >= REPEATED_SHARE * len(pages)}
+
+    def is_edge_noise(lines: list[str], i: int) -> bool:
+        edge = i < EDGE_LINES or i >= len(lines) - EDGE_LINES
+        return edge and (lines[i].strip() in repeated or bool(PAGE_NUMBER_PATTERN.match(lines[i])))
+
+    removed = 0
+    cleaned = []
+    for lines in page_lines:
+        kept = [line for i, line in enumerate(lines) if not is_edge_noise(lines, i)]
+        removed += len(lines) - len(kept)
+        cleaned.append("\n".join(kept))
+    return cleaned, removed
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def apply_budget(pages: list[str], page_count: int, token_budget: int) -> tuple[str, bool]:
+    "Joins pages until the budget is used; the last page is cut at a line boundary."
+    budget_chars = token_budget * CHARS_PER_TOKEN
+    parts = []
+    used = 0
+
+    for i, page in enumerate(pages):
+        if used + len(page) <= budget_chars:
+            parts.append(page)
+            used += len(page) + 1
+            continue
+
+        remaining = budget_chars - used
+        cut = page.rfind("\n", 0, remaining) if remaining > 0 else -1
+        if cut > 0:
+            parts.append(page[:cut])
+        parts.append(f"[... CV truncated: {page_count - i} more page(s) over the {token_budget}-token budget ...]")
+        return "\n".join(parts), True
+
+    if len(pages) < page_count:
+        # read_pages stopped early, but every page read fit after the dedupe
+        parts.append(f"[... CV truncated: {page_count - len(pages)} more page(s) over the {token_budget}-token budget ...]")
+        return "\n".join(parts), True
+    return "\n".join(parts), False
+
+
+# ============================================ Extraction ============================================
+
+def extract_text(source: str | bytes, token_budget: int = CV_TOKEN_BUDGET) -> dict:
+    """
+    source is a file path (multipart / raw uploads) or the PDF bytes (JSON uploads).
+    Returns {"text", "pages", "tokens", "truncated", "removed_lines", "timings_ms": {...}}.
+    """
+    timings = {}
+
+    started = time.perf_counter()
+    with open_document(source) as doc:
+        page_count = doc.page_count
+        timings["open"] = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        pages = read_pages(doc, source, token_budget * CHARS_PER_TOKEN)
+    timings["extract"] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    pages, removed = strip_repeated_lines(pages)
+    timings["dedupe"] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    text, truncated = apply_budget(pages, page_count, token_budget)
+    timings["budget"] = (time.perf_counter() - started) * 1000
+
+    result = {
+        "text": text,
+        "pages": page_count,
+        "pages_read": len(pages),
+        "tokens": estimate_tokens(text),
+        "truncated": truncated,
+        "removed_lines": removed,
+        "timings_ms": {stage: round(ms, 2) for stage, ms in timings.items()},
+    }
+    print(f"---- CV extraction: {page_count} pages, ~{result['tokens']} tokens, truncated={truncated}, {result['timings_ms']}")
+    return result
@@ -0,0 +1,73 @@
+"""
+Salary normalization shared by ingestion (data/preprocess_data.py, data/ingest_jobs.py) and the search agent.
+
+Raw scraped salaries ("Rp 10.000.000 – Rp 15.000.000 per month", "8-10 juta", "None",
+"World Class Benefits") become an integer (min_salary, max_salary) pair in Rupiah; (0, 0) means undisclosed.
+The pair is computed once at ingestion and stored in the jobs table and in the Jobs_Documents payload,
+so request-time filters only compare integers.
+
+    parse_salary("Rp 8 - 10 juta")            -> (8000000, 10000000)
+    parse_salary_column(df["salary"])         -> (min Series, max Series), same rules over a whole column
+    parse_salaries(np.array([...]))           -> (min array, max array)
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+# Numbers at or below this are not monthly salaries (years, dates, "2-3 tahun")
+SALARY_NUMBER_FLOOR = 500_000
+MILLION_PATTERN = re.compile(r"juta|jt")
+NUMBER_PATTERN = re.compile(r"\d+")
+SEPARATOR_PATTERN = re.compile(r"[.,]")
+
+
+# ============================================ Scalar ============================================
+
+def parse_salary(salary_text) -> tuple[int, int]:
+    "One raw salary string -> (min_salary, max_salary); (0, 0) when undisclosed or unparseable."
+    if salary_text is None or (isinstance(salary_text, float) and np.isnan(salary_text)):
+        return 0, 0
+
+    # "10.000.000" / "10,000,000" -> "10000000"
+    text = SEPARATOR_PATTERN.sub("", str(salary_text).lower())
+    multiplier = 1_000_000 if MILLION_PATTERN.search(text) else 1
+
+    values = [int(number) * multiplier for number in NUMBER_PATTERN.findall(text)]
+    values = [value for value in values if value > SALARY_NUMBER_FLOOR]
+    if not values:
+        return 0, 0
+    return min(values), max(values)
+
+
+def salary_range(job: dict) -> tuple[int, int]:
+    """
+    (min_salary, max_salary) of a job dict. Jobs from the table / Qdrant payload carry the integers;
+    only older dicts (e.g. best_jobs a client kept from before) fall back to parsing "salary".
+    """
+    if job.get("min_salary") is not None and job.get("max_salary") is not None:
+        return int(job["min_salary"]), int(job["max_salary"])
+    return parse_salary(job.get("salary"))
+
+
+# ============================================ Vectorized ============================================
+
+def parse_salary_column(salary: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """
+    parse_salary over a whole column. Returns int64 (min, max) Series on the same index.
+    Scraped salaries repeat a lot (96 distinct strings in 473 postings), so the column is factorized,
+    each distinct string is parsed once and the results are broadcast back with one take().
+    """
+    codes, uniques = pd.factorize(salary, use_na_sentinel=True)
+    bounds = np.zeros((len(uniques) + 1, 2), dtype=np.int64)   # last row: missing values -> (0, 0)
+    for i, value in enumerate(uniques):
+        bounds[i] = parse_salary(value)
+
+    picked = bounds.take(codes, axis=0)   # code -1 (missing) picks the last row
+    return pd.Series(picked[:, 0], index=salary.index), pd.Series(picked[:, 1], index=salary.index)
+
+
+def parse_salaries(values) -> tuple[np.ndarray, np.ndarray]:
+    "NumPy entry point: any sequence of raw salaries -> (min, max) int64 arrays."
+    min_salary, max_salary = parse_salary_column(pd.Series(np.asarray(values, dtype=object)))
+    return min_salary.to_numpy(), max_salary.to_numpy()
@@ -1,19 +1,35 @@
 import os
+import re
+import time
+import asyncio
+import threading
 import base64
 import json
 import sqlite3
+import logging
+import numpy as np
+import pandas as pd
+from operator import itemgetter
 from typing_extensions import TypedDict, Literal
 from pydantic import BaseModel
 from typing import Annotated, Any
+from contextlib import contextmanager
 from langgraph.graph import StateGraph, END
-from langchain_core.messages import SystemMessage, AIMessage
+from langchain_core.messages import SystemMessage, AIMessage, HumanMessage, RemoveMessage
 from langgraph.graph.message import add_messages
 from langchain_core.documents import Document
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_qdrant import QdrantVectorStore
+from langchain_core.runnables import RunnableLambda, RunnableConfig
+from langchain_openai import ChatOpenAI
 from qdrant_client import QdrantClient, models
 from qdrant_client.http import models as qm
 from dotenv import load_dotenv
+from agents.graph_registry import register, get_graph
+from agents.vector_search import search_jobs, asearch_jobs, cached_embedding_model
+from agents.llm_cache import SemanticCache, CachedStructuredOutput
+from agents.hybrid_search import hybrid_query, ahybrid_query
+from agents import jobs_db, search_memory
+from agents.jobs_db import fts_phrase
+from agents.salary import salary_range
 
 # TypedDict definition of State
 class State(TypedDict):
@@ -22,24 +38,119 @@ class State(TypedDict):
     best_jobs: list[dict]
     session_id: str
     messages: Annotated[list[Any], add_messages]
+    plan: dict | None
+    history: list[str]   # one line per turn pruned from messages (conversation memory)
 
 
 load_dotenv()
+logger = logging.getLogger(__name__)
 qdrant_url = os.getenv("QDRANT_ENDPOINT")
 qdrant_key = os.getenv("QDRANT_API_KEY")
 
 model = ChatOpenAI(model="gpt-4o-mini", temperature=0.3, api_key=os.getenv("OPENAI_API_KEY"))
 client = QdrantClient(url=qdrant_url, api_key=qdrant_key)
-embedding_model = OpenAIEmbeddings(model="text-embedding-3-small")
+# Shared content-hash cached embeddings (see agents/vector_search.py)
+embedding_model = cached_embedding_model
 
 embeddings = embedding_model
-
-vector_store = QdrantVectorStore.from_existing_collection(
-    collection_name="Jobs_Documents",
-    url=qdrant_url,
-    api_key=qdrant_key,
-    embedding=embedding_model,
+# Jobs_Documents searches go through agents/vector_search.search_jobs (Qdrant or the local index)
+
+# ============================================ Query Vocabulary ============================================
+
+# Filter phrases and known locations, shared by the fast-path router and the query cache signature
+
+WORK_STYLE_KEYWORDS = {
+    "work from home": "Remote", "jarak jauh": "Remote", "remote": "Remote", "wfh": "Remote",
+    "hybrid": "Hybrid", "hibrid": "Hybrid",
+    "on-site": "On-site", "on site": "On-site", "onsite": "On-site", "wfo": "On-site",
+}
+
+WORK_TYPE_KEYWORDS = {
+    "full time": "Full time", "full-time": "Full time", "fulltime": "Full time",
+    "part time": "Paruh waktu", "part-time": "Paruh waktu", "paruh waktu": "Paruh waktu",
+    "kasual": "Kasual", "casual": "Kasual",
+    "kontrak": "Kontrak/Temporer", "contract": "Kontrak/Temporer",
+    "temporer": "Kontrak/Temporer", "temporary": "Kontrak/Temporer",
+}
+
+# "20 juta", "7,5 jt", "20 million", "20m", "Rp 20.000.000", "20000000"
+SALARY_PATTERN = re.compile(
+    r"(?:rp\.?\s*)?(\d+(?:[.,]\d+)?)\s*(juta|jt|million|mil|m)\b"
+    r"|(?:rp\.?\s*)(\d{1,3}(?:[.,]\d{3})+|\d{6,})"
+    r"|\b(\d{1,3}(?:[.,]\d{3}){2,}|\d{7,})\b"
 )
+SALARY_WORDS = {"salary", "gaji", "above", "over", "minimum", "min", "least", "more", "than", "per", "month", "bulan", "idr", "rp"}
+
+NEW_WORDS = {"new", "baru", "other", "different", "more"}
+
+FILLER_WORDS = {
+    "i", "im", "i'm", "me", "my", "we", "you", "can", "could", "would", "please", "pls", "just", "only", "also",
+    "want", "wanna", "need", "like", "prefer", "show", "give", "get", "find", "search", "look", "looking", "see",
+    "jobs", "job", "ones", "one", "list", "position", "positions", "role", "roles", "vacancy", "vacancies",
+    "work", "working", "type", "style", "based", "that", "which", "are", "is", "be", "located", "available", "provided", "offered",
+    "the", "a", "an", "some", "any", "these", "those", "them", "it", "in", "at", "on", "near", "around",
+    "for", "with", "and", "or", "but", "to", "from", "of", "keep", "filter", "cv", "match", "matching", "fit",
+    "saya", "mau", "cari", "carikan", "hanya", "aja", "saja", "yang", "di", "lowongan", "kerja", "pekerjaan",
+}
+
+GENERIC_LOCATION_WORDS = {
+    "barat", "timur", "utara", "selatan", "tengah", "pusat", "raya", "kota", "kabupaten", "kepulauan",
+    "south", "west", "central", "district", "regency", "baru", "lama", "di", "pasar", "kebon", "kelapa", "kramat",
+}
+
+
+def load_known_locations() -> list[str]:
+    "Location names from the jobs table, longest first so 'Jakarta Selatan' wins over 'Jakarta'."
+    try:
+        rows = jobs_db.fetch_all("SELECT DISTINCT location FROM jobs")
+    except sqlite3.Error as e:
+        print(f"Fast router could not load locations: {e}")
+        return []
+
+    locations = set()
+    for (location,) in rows:
+        for part in str(location).split(","):
+            part = part.strip()
+            if not part:
+                continue
+            locations.add(part)
+            for word in part.split():
+                if word.lower() not in GENERIC_LOCATION_WORDS and len(word) > 2:
+                    locations.add(word)
+
+    return sorted(locations, key=len, reverse=True)
+
+
+KNOWN_LOCATIONS = [
+    (location, re.compile(rf"\b{re.escape(location.lower())}\b")) for location in load_known_locations()
+]
+
+
+def extract_keyword(text: str, keywords: dict) -> tuple[str | None, str]:
+    for phrase, value in keywords.items():
+        pattern = rf"(?<!\w){re.escape(phrase)}(?!\w)"
+        if re.search(pattern, text):
+            return value, re.sub(pattern, " ", text)
+    return None, text
+
+
+def cache_signature(normalized_query: str) -> str:
+    """
+    The parts of a query that decide its route and filters: numbers, known place names, work style / work type
+    and the new-jobs words. The cache only lets similar queries share a cached result when these are identical
+    ("remote in Jakarta" vs "on-site in Bandung", "data jobs" vs "new data jobs" stay apart).
+    """
+    text = f" {normalized_query} "
+    numbers = " ".join(sorted(re.findall(r"\d+", text)))
+    places = "|".join(sorted({known.lower() for known, pattern in KNOWN_LOCATIONS if pattern.search(text)}))
+    work_style, _ = extract_keyword(text, WORK_STYLE_KEYWORDS)
+    work_type, _ = extract_keyword(text, WORK_TYPE_KEYWORDS)
+    wants_new = "new" if any(word in NEW_WORDS for word in re.findall(r"[a-z0-9']+", text)) else ""
+    parts = [numbers, places, work_style or "", work_type or "", wants_new]
+    return "@".join(parts) if any(parts) else ""
+
+# Exact + semantic cache in front of the structured-output (routing / filter extraction) calls
+structured_cache = SemanticCache.from_env(embeddings=embedding_model, guard=cache_signature)
 
 
 # Temporary code to setup payload indexing
@@ -66,144 +177,87 @@ vector_store = QdrantVectorStore.from_existing_collection(
 
 # ============================================ Helper Functions ============================================
 
-import re
-
-def parse_min_salary(salary_str: str) -> int | None:
-    if not salary_str:
-        return None
-
-    # Case 1: undisclosed
-    if "Tidak Ditampilkan" in salary_str:
-        return None
-
-    # Normalize dash variants (–, —, -)
-    # Split on dash and keep the first part
-    first_part = re.split(r"[–—-]", salary_str)[0]
-
-    # Remove everything except digits
-    digits = re.sub(r"\D", "", first_part)
-
-    if not digits:
-        return None
-
-    return int(digits)
+def structured_output(schema) -> CachedStructuredOutput:
+    "model.with_structured_output(schema) behind the query cache; call invoke(messages, cache_key=query)."
+    return CachedStructuredOutput(structured_cache, model.with_structured_output(schema), schema)
 
 
 # ============================================ Query Functions ============================================
 
 def RAG_query(raw_parameters: dict, _query: str):
-    RAG_parameters = {key: value for key, value in raw_parameters.items() if value is not None}
     # {"work_style": "Hybrid", "work_type": "Full time", ...}
+    vector = embedding_model.embed_query(_query)
+    return search_jobs(vector, k=5, parameters=raw_parameters)
 
-    _must = [
-        models.FieldCondition(
-            key=f"metadata.{key}",
-            match=models.MatchText(text=value)
-        )
-        for key, value in RAG_parameters.items()
-    ]
-
-    metadata_filter = models.Filter(
-        must=_must
-    )
-
-    points = vector_store.similarity_search(
-        query=_query,
-        k=5,
-        filter=metadata_filter
-    )
-
-    list_of_jobs = []
-    for point in points:
-        metadata = point.metadata
-        page_content = point.page_content
 
-        if "Job Description:" in page_content:
-            job_desc = page_content.split("Job Description: ", 1)[1].strip()
-        else:
-            job_desc = page_content
-
-        Job = {
-            'job_title': metadata["job_title"],
-            'company_name': metadata["company_name"],
-            'work_type': metadata["work_type"],
-            'work_style': metadata["work_style"],
-            'location': metadata["location"],
-            'salary': metadata["salary"],
-            'job_description': job_desc,
-        }
-
-        list_of_jobs.append(Job)
-
-    return list_of_jobs
+async def aRAG_query(raw_parameters: dict, _query: str):
+    vector = await embedding_model.aembed_query(_query)
+    return await asearch_jobs(vector, k=5, parameters=raw_parameters)
 
 
+# SQL_search query: keyword columns go through the FTS5 index (jobs_fts, see data/preprocess_data.py),
+# enums through the NOCASE B-tree indexes and salary through idx_jobs_max_salary
+#
 # SELECT
 #     *
 # FROM jobs
-# WHERE job_title LIKE '%' || :job_title || '%'
-#   AND company_name LIKE '%' || :company_name || '%'
-#   AND clean_location LIKE '%' || :location || '%'
-#   AND LOWER(TRIM(work_style)) LIKE LOWER(TRIM(:work_style))
-#   AND LOWER(TRIM(work_type)) LIKE LOWER(TRIM(:work_type))
-#   AND :salary BETWEEN min_salary AND max_salary
+# WHERE job_id IN (SELECT rowid FROM jobs_fts WHERE jobs_fts MATCH 'job_title : "data" * AND location : "jakarta" *')
+#   AND work_style = :work_style
+#   AND work_type = :work_type
+#   AND max_salary >= :salary
 # ORDER BY max_salary DESC
 # LIMIT 5;
 
+FTS_COLUMNS = ("job_title", "company_name", "location")
 
-def SQL_query(raw_parameters: dict):
-    conn = sqlite3.connect("data/jobs_database.db")
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
 
+def build_sql_query(raw_parameters: dict) -> tuple[str, dict]:
     filter = {
         key: value for key, value in raw_parameters.items() if value is not None
     }
 
-    my_list  = [
-        f"{key} LIKE '%' || :{key} || '%'" for key, value in filter.items() if key != "salary"
+    conditions = []
+    params = {}
+
+    match = [
+        f"{key} : {fts_phrase(filter[key])}" for key in FTS_COLUMNS if key in filter and fts_phrase(filter[key])
     ]
+    if match:
+        conditions.append("job_id IN (SELECT rowid FROM jobs_fts WHERE jobs_fts MATCH :match)")
+        params["match"] = " AND ".join(match)
 
-    x = "\nAND ".join(my_list)
+    for key in ("work_style", "work_type"):
+        if key in filter:
+            conditions.append(f"{key} = :{key}")
+            params[key] = filter[key]
 
-    try:
-        if filter.get("salary"):
-            if not x:
-                x = "max_salary >= :salary"
-            else:    
-                x = x + "\nAND max_salary >= :salary"
-    except Exception:
-        pass
+    if filter.get("salary"):
+        conditions.append("max_salary >= :salary")
+        params["salary"] = filter["salary"]
+
+    x = "\n    AND ".join(conditions)
+    where = f"WHERE {x}" if x else ""
 
     query = f"""SELECT
     *
     FROM jobs
-    WHERE {x}
+    {where}
     ORDER BY max_salary DESC
     LIMIT 5;
     """
 
-    # print(query)
+    return query, params
 
-    results = cursor.execute(query, filter).fetchall()
-    # print(results)
 
-    jobs = []
-
-    for row in results:
-        job = {
-            'job_title': row["job_title"],
-            'company_name': row["company_name"],
-            'work_type': row["work_type"],
-            'work_style': row["work_style"],
-            'location': row["location"],
-            'salary': f"""{row["min_salary"]} - {row["max_salary"]}""",
-            'job_description': row["job_description"],
-        }
+def SQL_query(raw_parameters: dict):
+    query, filter = build_sql_query(raw_parameters)
 
-        jobs.append(job)
+    # print(query)
 
-    return jobs
+    results = jobs_db.fetch_all(query, filter)
+    # print(results)
+
+    return [jobs_db.row_to_job(row) for row in results]
 
     
 
@@ -222,53 +276,242 @@ def SQL_query(raw_parameters: dict):
 
 # ============================================ Langchain/Langgraph ============================================
 
-def search_compile(initial_state: State):
-    search_agent = StateGraph(State)
+# Planner flag: "single" routes and extracts filters in one structured-output call (plan node),
+# "two_step" keeps the original entry_point -> per-route extraction calls for A/B comparison,
+# "hybrid" replaces the RAG_search / SQL_search choice with one fused BM25 + vector search.
+SEARCH_PLANNER = os.getenv("SEARCH_PLANNER", "single")
 
-    search_agent.add_node("entry_point", entry_point)
-    search_agent.add_node("python_filter", python_filter)
-    search_agent.add_node("RAG_search", rag_search)
-    search_agent.add_node("SQL_search", sql_search)
-    search_agent.add_node("final_check", final_check)
+def build_search_graph(planner: str, checkpointer=None):
+    search_agent = StateGraph(State)
+    entry = "entry_point" if planner == "two_step" else "plan"
+    search_nodes = ["hybrid_search"] if planner == "hybrid" else ["RAG_search", "SQL_search"]
+
+    # Each node has a sync (invoke) and async (ainvoke) implementation
+    if planner == "hybrid":
+        search_agent.add_node("plan", RunnableLambda(hybrid_plan, afunc=ahybrid_plan))
+        search_agent.add_node("hybrid_search", RunnableLambda(hybrid_search, afunc=ahybrid_search))
+    elif entry == "plan":
+        search_agent.add_node("plan", RunnableLambda(plan, afunc=aplan))
+    else:
+        search_agent.add_node("entry_point", RunnableLambda(entry_point, afunc=aentry_point))
+    if planner != "hybrid":
+        search_agent.add_node("RAG_search", RunnableLambda(rag_search, afunc=arag_search))
+        search_agent.add_node("SQL_search", RunnableLambda(sql_search, afunc=asql_search))
+    search_agent.add_node("python_filter", RunnableLambda(python_filter, afunc=apython_filter))
+    search_agent.add_node("final_check", RunnableLambda(final_check, afunc=afinal_check))
+    search_agent.add_node("remember", RunnableLambda(remember, afunc=aremember))
 
-    search_agent.set_entry_point("entry_point")
+    search_agent.set_entry_point(entry)
 
     search_agent.add_conditional_edges(
-        "entry_point",
+        entry,
         choose_edge,
         {
             "python_filter": "python_filter",
-            "RAG_search": "RAG_search",
-            "SQL_search": "SQL_search",
+            **{node: node for node in search_nodes},
             "Null intent": "final_check"
         }
         
     )
 
     search_agent.add_edge("python_filter", "final_check")
-    search_agent.add_edge("RAG_search", "final_check")
-    search_agent.add_edge("SQL_search", "final_check")
+    for node in search_nodes:
+        search_agent.add_edge(node, "final_check")
+
+    search_agent.add_edge("final_check", "remember")
+    search_agent.set_finish_point("remember")
+
+    return search_agent.compile(checkpointer=checkpointer)
+
+
+@register("search_single")
+def build_single_call_search_graph():
+    return build_search_graph("single")
+
+
+@register("search_two_step")
+def build_two_step_search_graph():
+    return build_search_graph("two_step")
+
+
+@register("search_hybrid")
+def build_hybrid_search_graph():
+    return build_search_graph("hybrid")
+
+
+# Same graphs with the conversation checkpointer, for session_id searches. The API opens
+# search_memory before compile_all(), so these are compiled with the SQLite checkpointer.
+@register("search_single_memory")
+def build_single_call_search_memory_graph():
+    return build_search_graph("single", search_memory.checkpointer)
+
+
+@register("search_two_step_memory")
+def build_two_step_search_memory_graph():
+    return build_search_graph("two_step", search_memory.checkpointer)
 
-    search_agent.set_finish_point("final_check")
 
-    app = search_agent.compile()
-    response = app.invoke(initial_state)
+@register("search_hybrid_memory")
+def build_hybrid_search_memory_graph():
+    return build_search_graph("hybrid", search_memory.checkpointer)
+
+
+def search_graph(planner: str | None = None, memory: bool = False):
+    return get_graph(f"search_{planner or SEARCH_PLANNER}" + ("_memory" if memory else ""))
+
+
+def run_config(session_id: str | None) -> tuple[Any, dict]:
+    """
+    (graph, invoke kwargs) for a search: stateless, or the session's conversation thread.
+    durability="exit" writes one checkpoint per turn instead of one per node.
+    """
+    if session_id is None:
+        return search_graph(), {}
+    return search_graph(memory=True), {"config": search_memory.thread_config(session_id), "durability": "exit"}
+
+
+def search_compile(initial_state: State, session_id: str | None = None):
+    # Runs the precompiled graph from the registry (built once per process)
+    app, kwargs = run_config(session_id)
+    response = app.invoke(initial_state, **kwargs)
 
     return response
 
 
-class EntryFormat(BaseModel):
-    entry_point: Literal["python_filter", "RAG_search", "SQL_search", "Null intent"]
+async def asearch_compile(initial_state: State, session_id: str | None = None):
+    # Async version used by the FastAPI endpoints; model and Qdrant calls don't block a thread
+    app, kwargs = run_config(session_id)
+    response = await app.ainvoke(initial_state, **kwargs)
 
-def entry_point(state: State):
-    user_query = state["query"]
-    json_model = model.with_structured_output(EntryFormat)
-    
-    system_prompt = SystemMessage(
-        f"""
-        Select the appropriate route for the user query.
+    return response
+
+
+SEARCH_NODES = ("python_filter", "RAG_search", "SQL_search", "hybrid_search")
+
+async def astream_search(initial_state: State, session_id: str | None = None):
+    """
+    Streams the search graph as (event, data) pairs while it runs:
+    route -> filters -> one job per event -> notice (only when no jobs) -> done
+    """
+    app, kwargs = run_config(session_id)
+    count = 0
+
+    async for update in app.astream(initial_state, stream_mode="updates", **kwargs):
+        for node, output in update.items():
+            if not output:
+                continue
+
+            if node in ("entry_point", "plan"):
+                yield "route", {"route": output["messages"][-1].content}
+
+            elif node in SEARCH_NODES:
+                yield "filters", json.loads(output["messages"][-1].content)
+                for job in output["best_jobs"]:
+                    count += 1
+                    yield "job", job
+
+            elif node == "final_check":
+                yield "notice", {"message": output["messages"].content}
+
+    yield "done", {"count": count}
+
+
+# ============================================ Conversation ============================================
+
+# Every turn starts with the user's HumanMessage (added by the API), followed by the planner prompt,
+# the route, the search node's prompt + filters and final_check's notice.
+SEARCH_MEMORY_TURNS = max(1, int(os.getenv("SEARCH_MEMORY_TURNS", "3")))            # latest turns kept as messages
+SEARCH_MEMORY_HISTORY_LINES = int(os.getenv("SEARCH_MEMORY_HISTORY_LINES", "10"))   # older turns, one line each
+
+def split_turns(messages: list) -> list[list]:
+    "Messages grouped per turn; each turn starts at a HumanMessage."
+    turns = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+def read_turn(turn: list) -> dict:
+    "A turn's route, the search node's filters and final_check's notice (None when there were jobs)."
+    replies = [message.content for message in turn if isinstance(message, AIMessage)]
+    route = replies[0] if replies else "Null intent"
+
+    filters, notice = None, None
+    for content in replies[1:]:
+        try:
+            parsed = json.loads(content)
+        except (json.JSONDecodeError, TypeError):
+            parsed = None
+        if filters is None and isinstance(parsed, dict):
+            filters = parsed
+        else:
+            notice = content
+
+    return {"route": route, "filters": filters, "notice": notice}
+
+def turn_line(turn: list) -> str:
+    "One-line summary of a finished turn, e.g. 'remote data jobs' -> python_filter {\"work_style\": \"Remote\"}"
+    query = turn[0].content if isinstance(turn[0], HumanMessage) else ""
+    result = read_turn(turn)
+    used = {key: value for key, value in (result["filters"] or {}).items() if value is not None}
+    line = f"'{query}' -> {result['route']}"
+    if used:
+        line += f" {json.dumps(used, ensure_ascii=False)}"
+    if result["notice"]:
+        line += " (no jobs)"
+    return line
+
+def earlier_requests(state: State) -> list[str]:
+    return state.get("history", []) + [turn_line(turn) for turn in split_turns(state["messages"])[:-1]]
+
+def prompt_query(state: State) -> str:
+    "The query the prompts see: the user query, after the conversation's earlier requests."
+    earlier = earlier_requests(state)
+    if not earlier:
+        return state["query"]
+    requests = "\n".join(f"- {line}" for line in earlier)
+    return (
+        "Earlier requests in this conversation (oldest first); only use them to resolve references such as "
+        f"'the same but remote':\n{requests}\n\nCurrent request: {state['query']}"
+    )
+
+def cache_args(state: State) -> dict:
+    """
+    Structured-output cache arguments. The exact key is the whole prompt query, so a cached answer is only
+    reused for the same conversation context. Follow-up turns skip the similarity tier: two turns of one
+    conversation differ only in their last line and would match each other's route / filters.
+    """
+    return {"cache_key": prompt_query(state), "semantic": not earlier_requests(state)}
+
+def remember(state: State, config: RunnableConfig):
+    """
+    Bounds what a conversation thread stores: drops the system prompts (rebuilt every turn) and folds
+    turns older than SEARCH_MEMORY_TURNS into one history line each. Stateless runs keep everything.
+    """
+    if not config.get("configurable", {}).get("thread_id"):
+        return {}
+
+    removed = [RemoveMessage(id=message.id) for message in state["messages"] if isinstance(message, SystemMessage)]
+    turns = split_turns(state["messages"])
+    old_turns = turns[:-SEARCH_MEMORY_TURNS]
+    for turn in old_turns:
+        removed += [RemoveMessage(id=message.id) for message in turn if not isinstance(message, SystemMessage)]
+
+    history = (state.get("history", []) + [turn_line(turn) for turn in old_turns])[-SEARCH_MEMORY_HISTORY_LINES:]
+    return {"messages": removed, "history": history}
+
+async def aremember(state: State, config: RunnableConfig):
+    return remember(state, config)
+
+
+def search_result(response: State) -> dict:
+    "The parts of a finished search state a client needs, from the last turn's messages."
+    turns = split_turns(response["messages"])
+    return {**read_turn(turns[-1] if turns else []), "best_jobs": response["best_jobs"]}
 
-        [Build upon your current list] -> python_filter
+
+ROUTE_GUIDE = """[Build upon your current list] -> python_filter
 
         [Find new jobs based on CV] -> RAG_search
 
@@ -292,7 +535,17 @@ def entry_point(state: State):
         - "Find me new jobs fit for a computer science student thats in Jakarta and has a listed salary."
 
         tip: Unless the user asks for "new jobs", its most likely python_filter.
-        tip: SQL_search usually involves directly finding jobs jobs based on titles.
+        tip: SQL_search usually involves directly finding jobs jobs based on titles."""
+
+class EntryFormat(BaseModel):
+    entry_point: Literal["python_filter", "RAG_search", "SQL_search", "Null intent"]
+
+def entry_prompt(user_query: str) -> SystemMessage:
+    return SystemMessage(
+        f"""
+        Select the appropriate route for the user query.
+
+        {ROUTE_GUIDE}
 
         If the query has no matching intent, respond with None.
 
@@ -301,13 +554,34 @@ def entry_point(state: State):
         """
     )
 
-    response = json_model.invoke([system_prompt]).entry_point
-
-    print("---------------------")
-    print(response)
-    print("---------------------")
+def entry_update(system_prompt: SystemMessage, response: str):
+    logger.debug("route: %s", response)
     return {"messages": [system_prompt, AIMessage(response)]}
 
+def entry_point(state: State):
+    fast_plan = fast_route(state["query"])
+    if fast_plan is not None:
+        return fast_update(fast_plan)
+
+    system_prompt = entry_prompt(prompt_query(state))
+    json_model = structured_output(EntryFormat)
+
+    with router_stats.time_llm():
+        response = json_model.invoke([system_prompt], **cache_args(state)).entry_point
+    return entry_update(system_prompt, response)
+
+async def aentry_point(state: State):
+    fast_plan = fast_route(state["query"])
+    if fast_plan is not None:
+        return fast_update(fast_plan)
+
+    system_prompt = entry_prompt(prompt_query(state))
+    json_model = structured_output(EntryFormat)
+
+    with router_stats.time_llm():
+        response = (await json_model.ainvoke([system_prompt], **cache_args(state))).entry_point
+    return entry_update(system_prompt, response)
+
 
 def choose_edge(state: State):
     choice = state["messages"][-1].content
@@ -318,6 +592,8 @@ def choose_edge(state: State):
         return "RAG_search"
     elif "SQL_search" in choice:
         return "SQL_search"
+    elif "hybrid_search" in choice:
+        return "hybrid_search"
     else:
         return "Null intent"
 
@@ -330,10 +606,8 @@ class FilterFormat(BaseModel):
     min_salary: int | None = None
     location: str | None = None
 
-def python_filter(state: State):
-    print("python_filter was chosen ----------------------\n")
-    json_model = model.with_structured_output(FilterFormat)
-    system_prompt = SystemMessage(
+def filter_prompt(user_query: str) -> SystemMessage:
+    return SystemMessage(
         f"""
         Extract filters from the user query into the given schema.
 
@@ -345,69 +619,86 @@ def python_filter(state: State):
         - Use exact enum values for work_style and work_type.
 
         Query:
-        {state['query']}
+        {user_query}
         """
     )
 
-    py_filter = json_model.invoke([system_prompt])
-
-    print("py_filter ----------------------")
-    print(py_filter) #check
-    print("")
-    
-
-    jobs = state["best_jobs"]
-    passed_jobs = []
-
-    for job in jobs:
-        title = job["job_title"]
-        print(f"Processing Job: {title} ---------------")
-
-        # fields
-        work_style = job["work_style"].lower()
-        work_type  = job["work_type"].lower()
-        location   = job["location"].lower()
-
-        print(f"style = {work_style}, type = {work_type}, location {location}")
-
-        if py_filter.work_style is not None and work_style != py_filter.work_style.lower():
-            print("Failed on work_style check...\n")
-            continue
+def text_column_mask(jobs: list[dict], field: str, predicate) -> np.ndarray:
+    """
+    Dictionary-encodes one text field of best_jobs (pd.factorize) and evaluates `predicate` once per
+    distinct lowercased value instead of once per job; work_style / work_type / location have few distinct values.
+    """
+    codes, uniques = pd.factorize(np.array(list(map(itemgetter(field), jobs)), dtype=object))
+    passed = np.array([predicate(value.lower()) for value in uniques], dtype=bool)
+    # Missing values get code -1: index the trailing False so they never pass
+    return np.append(passed, False)[codes]
 
-        if py_filter.work_type is not None and work_type != py_filter.work_type.lower():
-            print("Failed on work_type check...\n")
-            continue
+def min_salary_column(jobs: list[dict]) -> np.ndarray:
+    "Integer minimum salaries (0 = undisclosed); see agents/salary.py."
+    try:
+        return np.fromiter(map(itemgetter("min_salary"), jobs), dtype=np.int64, count=len(jobs))
+    except (KeyError, TypeError):
+        # Older job dicts without the integer fields
+        return np.fromiter((salary_range(job)[0] for job in jobs), dtype=np.int64, count=len(jobs))
+
+def filter_mask(jobs: list[dict], py_filter: FilterFormat) -> np.ndarray:
+    "Every FilterFormat predicate as a boolean mask over best_jobs. Columns are only built for the fields used."
+    mask = np.ones(len(jobs), dtype=bool)
+    checks = []
+
+    if py_filter.work_style is not None:
+        work_style = py_filter.work_style.lower()
+        checks.append(("work_style", lambda: text_column_mask(jobs, "work_style", lambda value: value == work_style)))
+    if py_filter.work_type is not None:
+        work_type = py_filter.work_type.lower()
+        checks.append(("work_type", lambda: text_column_mask(jobs, "work_type", lambda value: value == work_type)))
+    if py_filter.location is not None:
+        location = py_filter.location.lower()
+        checks.append(("location", lambda: text_column_mask(jobs, "location", lambda value: location in value)))
+    if py_filter.min_salary is not None:
+        def salary_check():
+            # Undisclosed salaries (0) never pass a salary filter
+            min_salary = min_salary_column(jobs)
+            return (min_salary > 0) & (min_salary >= py_filter.min_salary)
+        checks.append(("salary", salary_check))
+
+    for name, check in checks:
+        passed = check()
+        logger.debug("python_filter: %s check removes %d jobs", name, int(np.count_nonzero(mask & ~passed)))
+        mask &= passed
+    return mask
+
+def filter_update(system_prompt: SystemMessage | None, py_filter: FilterFormat, jobs: list[dict]):
+    logger.debug("python_filter: %s over %d jobs", py_filter, len(jobs))
+
+    if any(value is not None for value in py_filter.model_dump().values()):
+        mask = filter_mask(jobs, py_filter)
+        passed_jobs = [jobs[i] for i in np.flatnonzero(mask)]
+    else:
+        passed_jobs = list(jobs)
 
-        if py_filter.location is not None and py_filter.location.lower() not in location:
-            print("Failed on location check...\n")
-            continue
+    logger.debug("python_filter: %d of %d jobs passed", len(passed_jobs), len(jobs))
+    return {"messages": prompt_messages(system_prompt) + [AIMessage(content=json.dumps(py_filter.model_dump()))],"best_jobs": passed_jobs}
 
-        job_min_salary = parse_min_salary(job["salary"])
-        print(f"min_salary = {job_min_salary}")
-        min_salary_filter = py_filter.min_salary
+def python_filter(state: State):
+    if state.get("plan"):
+        return filter_update(None, plan_to_filter(state["plan"]), state["best_jobs"])
 
-        # User did not specify a salary
-        if min_salary_filter is None:
-            print("Job passed! Appending to list")
-            passed_jobs.append(job)
-            print("\n")
-            continue
+    system_prompt = filter_prompt(prompt_query(state))
+    json_model = structured_output(FilterFormat)
 
-        # Skip undisclosed salaries
-        if job_min_salary is None:
-            print("Failed on salary check... (Salary not provided)\n")
-            continue
+    py_filter = json_model.invoke([system_prompt], **cache_args(state))
+    return filter_update(system_prompt, py_filter, state["best_jobs"])
 
-        if min_salary_filter is not None and job_min_salary < min_salary_filter:
-            print("Failed on salary check... (Salary below minimum requirement)\n")
-            continue
+async def apython_filter(state: State):
+    if state.get("plan"):
+        return filter_update(None, plan_to_filter(state["plan"]), state["best_jobs"])
 
-        print("Job passed! Appending to list")
-        passed_jobs.append(job)
-        print("\n")
+    system_prompt = filter_prompt(prompt_query(state))
+    json_model = structured_output(FilterFormat)
 
-    # print(passed_jobs)
-    return {"messages": [system_prompt, AIMessage(content=json.dumps(py_filter.model_dump()))],"best_jobs": passed_jobs}
+    py_filter = await json_model.ainvoke([system_prompt], **cache_args(state))
+    return filter_update(system_prompt, py_filter, state["best_jobs"])
 
 
 class RAGFormat(BaseModel):
@@ -417,10 +708,8 @@ class RAGFormat(BaseModel):
     ] | None = None
     location: str | None = None
 
-def rag_search(state: State):
-    print("RAG_search was chosen ----------------------\n")
-    json_model = model.with_structured_output(RAGFormat)
-    system_prompt = SystemMessage(
+def rag_prompt(user_query: str) -> SystemMessage:
+    return SystemMessage(
         f"""
         According to this user query, output an appropriate Json object that contains the query's specifications as a filter.
 
@@ -432,15 +721,39 @@ def rag_search(state: State):
         - Generalize locations. Prefer 'Jakarta' over 'Jakart Selatan' unless specified.
 
         Query:
-        {state['query']}
+        {user_query}
         """
     )
 
-    RAG_parameters = json_model.invoke([system_prompt]).model_dump()
-    print(f"RAG_Parameters: {RAG_parameters}")
+def rag_update(system_prompt: SystemMessage | None, RAG_parameters: dict, response: list[dict]):
+    logger.debug("vector search: %s -> %d jobs", RAG_parameters, len(response))
+    return {"messages": prompt_messages(system_prompt) + [AIMessage(content=json.dumps(RAG_parameters, ensure_ascii=False, indent=2))], "best_jobs": response}
+
+def rag_search(state: State):
+    if state.get("plan"):
+        RAG_parameters = plan_to_rag(state["plan"])
+        return rag_update(None, RAG_parameters, RAG_query(RAG_parameters, state["query"]))
+
+    system_prompt = rag_prompt(prompt_query(state))
+    json_model = structured_output(RAGFormat)
+
+    RAG_parameters = json_model.invoke([system_prompt], **cache_args(state)).model_dump()
     response = RAG_query(RAG_parameters, state["query"])
 
-    return {"messages": [system_prompt, AIMessage(content=json.dumps(RAG_parameters, ensure_ascii=False, indent=2))], "best_jobs": response}
+    return rag_update(system_prompt, RAG_parameters, response)
+
+async def arag_search(state: State):
+    if state.get("plan"):
+        RAG_parameters = plan_to_rag(state["plan"])
+        return rag_update(None, RAG_parameters, await aRAG_query(RAG_parameters, state["query"]))
+
+    system_prompt = rag_prompt(prompt_query(state))
+    json_model = structured_output(RAGFormat)
+
+    RAG_parameters = (await json_model.ainvoke([system_prompt], **cache_args(state))).model_dump()
+    response = await aRAG_query(RAG_parameters, state["query"])
+
+    return rag_update(system_prompt, RAG_parameters, response)
 
 
 class SQLFormat(BaseModel):
@@ -453,11 +766,8 @@ class SQLFormat(BaseModel):
     location: str | None = None
     salary: int | None = None
 
-def sql_search(state: State):
-    print("SQL_search was chosen ----------------------\n")
-    json_model = model.with_structured_output(SQLFormat)
-
-    system_prompt = SystemMessage(
+def sql_prompt(user_query: str) -> SystemMessage:
+    return SystemMessage(
         f"""
         According to this user query, output an appropriate Json object that contains the query's specifications as a filter made for
         SQL querying.
@@ -471,39 +781,419 @@ def sql_search(state: State):
         "data" will suffice as: "Data Analyst", "Data Analysis Specialist", and "Data Engineer" could all be valid jobs.
 
         Query:
-        {state['query']}
+        {user_query}
         """
     )
 
-    SQL_parameters = json_model.invoke([system_prompt]).model_dump()
-    print(SQL_parameters)
+def sql_update(system_prompt: SystemMessage | None, SQL_parameters: dict, response: list[dict]):
+    logger.debug("SQL_search: %s -> %d jobs", SQL_parameters, len(response))
+    # job_title, work_style, work_type, location, 
+    return {"messages": prompt_messages(system_prompt) + [AIMessage(content=json.dumps(SQL_parameters, ensure_ascii=False, indent=2))], "best_jobs": response}
+
+def sql_search(state: State):
+    if state.get("plan"):
+        SQL_parameters = plan_to_sql(state["plan"])
+        return sql_update(None, SQL_parameters, SQL_query(SQL_parameters))
+
+    system_prompt = sql_prompt(prompt_query(state))
+    json_model = structured_output(SQLFormat)
+
+    SQL_parameters = json_model.invoke([system_prompt], **cache_args(state)).model_dump()
     response = SQL_query(SQL_parameters)
 
-    # job_title, work_style, work_type, location, 
-    return {"messages": [system_prompt, AIMessage(content=json.dumps(SQL_parameters, ensure_ascii=False, indent=2))], "best_jobs": response}
+    return sql_update(system_prompt, SQL_parameters, response)
 
+async def asql_search(state: State):
+    if state.get("plan"):
+        SQL_parameters = plan_to_sql(state["plan"])
+        return sql_update(None, SQL_parameters, await asyncio.to_thread(SQL_query, SQL_parameters))
 
-def final_check(state: State):
-    if not state["best_jobs"] or state["messages"][-1].content == "Null intent":
-        # best jobs is an empty [] 
+    system_prompt = sql_prompt(prompt_query(state))
+    json_model = structured_output(SQLFormat)
 
-        system_prompt = SystemMessage(
-            """
-            No jobs were returned, meaning the user's query was too specific/resulted in no matches.
-            Judging from past messages, provide a 1-2 sentence comment on what possibly went wrong and what the user should change.
-            Example: "It seems no jobs with those specifications are available in Bandung. Maybe lower your minimum salary criteria!"
-            Example: "Thats not a valid query, please provide a valid query with appropriate intent."
+    SQL_parameters = (await json_model.ainvoke([system_prompt], **cache_args(state))).model_dump()
+    # SQLite is local; run it off the event loop
+    response = await asyncio.to_thread(SQL_query, SQL_parameters)
 
-            or it was a null
-            """
-        )
+    return sql_update(system_prompt, SQL_parameters, response)
 
-        response = model.invoke(state["messages"] + [system_prompt])
+
+FINAL_CHECK_PROMPT = SystemMessage(
+    """
+    No jobs were returned, meaning the user's query was too specific/resulted in no matches.
+    Judging from past messages, provide a 1-2 sentence comment on what possibly went wrong and what the user should change.
+    Example: "It seems no jobs with those specifications are available in Bandung. Maybe lower your minimum salary criteria!"
+    Example: "Thats not a valid query, please provide a valid query with appropriate intent."
+
+    or it was a null
+    """
+)
+
+def needs_final_comment(state: State) -> bool:
+    # best jobs is an empty [] or no intent was found
+    return not state["best_jobs"] or state["messages"][-1].content == "Null intent"
+
+def final_check(state: State):
+    if needs_final_comment(state):
+        response = model.invoke(state["messages"] + [FINAL_CHECK_PROMPT])
 
         return {"messages": response}
     
     return {}
 
+async def afinal_check(state: State):
+    if needs_final_comment(state):
+        response = await model.ainvoke(state["messages"] + [FINAL_CHECK_PROMPT])
+
+        return {"messages": response}
+
+    return {}
+
+# ============================================ Single-call Planner ============================================
+
+class PlanFormat(BaseModel):
+    # Route + the union of the FilterFormat / RAGFormat / SQLFormat fields
+    entry_point: Literal["python_filter", "RAG_search", "SQL_search", "Null intent"]
+    job_title: str | None = None
+    company_name: str | None = None
+    work_style: Literal["On-site", "Hybrid", "Remote"] | None = None
+    work_type: Literal[
+        "Full time", "Paruh waktu", "Kasual", "Kontrak/Temporer"
+    ] | None = None
+    location: str | None = None
+    salary: int | None = None
+
+def plan_prompt(user_query: str) -> SystemMessage:
+    return SystemMessage(
+        f"""
+        Select the appropriate route for the user query AND extract the route's filters into the given schema.
+
+        {ROUTE_GUIDE}
+
+        If the query has no matching intent, respond with "Null intent".
+
+        Filter rules:
+        - Only populate a field if explicitly stated; otherwise use None.
+        - Do not infer missing values.
+        - Use exact enum values for work_style and work_type.
+        - Locations are caps-sensitive. Correct = 'Jakarta Selatan' | Incorrect = 'jakarta selatan'
+        - Generalize locations. Prefer 'Jakarta' over 'Jakarta Selatan' unless specified.
+        - salary is the minimum monthly salary in Rupiah, as a plain integer (e.g. "20 juta" -> 20000000).
+        - job_title and company_name are only used by SQL_search. Use the common denominator for job titles,
+        so if the user wants a data analysis job, simply "data" will suffice.
+
+        User query:
+        {user_query}
+        """
+    )
+
+def plan_update(system_prompt: SystemMessage, response: PlanFormat):
+    logger.debug("plan: %s", response)
+    return {"messages": [system_prompt, AIMessage(response.entry_point)], "plan": response.model_dump()}
+
+def plan(state: State):
+    fast_plan = fast_route(state["query"])
+    if fast_plan is not None:
+        return fast_update(fast_plan)
+
+    system_prompt = plan_prompt(prompt_query(state))
+    json_model = structured_output(PlanFormat)
+
+    with router_stats.time_llm():
+        response = json_model.invoke([system_prompt], **cache_args(state))
+    return plan_update(system_prompt, response)
+
+async def aplan(state: State):
+    fast_plan = fast_route(state["query"])
+    if fast_plan is not None:
+        return fast_update(fast_plan)
+
+    system_prompt = plan_prompt(prompt_query(state))
+    json_model = structured_output(PlanFormat)
+
+    with router_stats.time_llm():
+        response = await json_model.ainvoke([system_prompt], **cache_args(state))
+    return plan_update(system_prompt, response)
+
+
+def plan_to_filter(plan: dict) -> FilterFormat:
+    return FilterFormat(
+        work_style=plan.get("work_style"),
+        work_type=plan.get("work_type"),
+        min_salary=plan.get("salary"),
+        location=plan.get("location"),
+    )
+
+def plan_to_rag(plan: dict) -> dict:
+    return RAGFormat(
+        work_style=plan.get("work_style"),
+        work_type=plan.get("work_type"),
+        location=plan.get("location"),
+    ).model_dump()
+
+def plan_to_sql(plan: dict) -> dict:
+    return SQLFormat(**{key: plan.get(key) for key in SQLFormat.model_fields}).model_dump()
+
+def prompt_messages(system_prompt: SystemMessage | None) -> list:
+    # The single-call planner already put its prompt in messages; search nodes then add only their result
+    return [system_prompt] if system_prompt is not None else []
+
+
+# ============================================ Hybrid Retrieval ============================================
+
+# One planner call decides "filter the current list" vs "search" and extracts the filters;
+# there is no RAG vs SQL decision left to get wrong (see agents/hybrid_search.py)
+
+HYBRID_ROUTE_GUIDE = """[Build upon your current list] -> python_filter
+
+        [Find new jobs, from the CV or by title/keywords] -> hybrid_search
+
+        Example queries (they don't have to match, just the overall intent)
+
+        python_filter: 
+        - "I like these jobs, but I only want the ones with a provided salary."
+        - "I only want the jobs that are provided in Jakarta."
+        - "I only want Hybrid-type jobs."
+
+        hybrid_search: 
+        - "Find new jobs that match my CV but are only in Jakarta."
+        - "Search for 10 new data analysis jobs in Bandung."
+        - "None of these jobs fit me. Find new jobs."
+
+        tip: Unless the user asks for "new jobs", its most likely python_filter."""
+
+class HybridPlanFormat(BaseModel):
+    entry_point: Literal["python_filter", "hybrid_search", "Null intent"]
+    job_title: str | None = None
+    company_name: str | None = None
+    work_style: Literal["On-site", "Hybrid", "Remote"] | None = None
+    work_type: Literal[
+        "Full time", "Paruh waktu", "Kasual", "Kontrak/Temporer"
+    ] | None = None
+    location: str | None = None
+    salary: int | None = None
+
+def hybrid_plan_prompt(user_query: str) -> SystemMessage:
+    return SystemMessage(
+        f"""
+        Select the appropriate route for the user query AND extract its filters into the given schema.
+
+        {HYBRID_ROUTE_GUIDE}
+
+        If the query has no matching intent, respond with "Null intent".
+
+        Filter rules:
+        - Only populate a field if explicitly stated; otherwise use None.
+        - Do not infer missing values.
+        - Use exact enum values for work_style and work_type.
+        - Generalize locations. Prefer 'Jakarta' over 'Jakarta Selatan' unless specified.
+        - salary is the minimum monthly salary in Rupiah, as a plain integer (e.g. "20 juta" -> 20000000).
+        - job_title holds the job keywords the user asked for (e.g. "data analyst"), used for keyword matching.
+
+        User query:
+        {user_query}
+        """
+    )
+
+def hybrid_fast_route(user_query: str) -> dict | None:
+    # The fast router speaks PlanFormat; its RAG_search route is a new search here
+    fast_plan = fast_route(user_query)
+    if fast_plan is not None and fast_plan["entry_point"] == "RAG_search":
+        fast_plan["entry_point"] = "hybrid_search"
+    return fast_plan
+
+def hybrid_plan(state: State):
+    fast_plan = hybrid_fast_route(state["query"])
+    if fast_plan is not None:
+        return fast_update(fast_plan)
+
+    system_prompt = hybrid_plan_prompt(prompt_query(state))
+    json_model = structured_output(HybridPlanFormat)
+
+    with router_stats.time_llm():
+        response = json_model.invoke([system_prompt], **cache_args(state))
+    return plan_update(system_prompt, response)
+
+async def ahybrid_plan(state: State):
+    fast_plan = hybrid_fast_route(state["query"])
+    if fast_plan is not None:
+        return fast_update(fast_plan)
+
+    system_prompt = hybrid_plan_prompt(prompt_query(state))
+    json_model = structured_output(HybridPlanFormat)
+
+    with router_stats.time_llm():
+        response = await json_model.ainvoke([system_prompt], **cache_args(state))
+    return plan_update(system_prompt, response)
+
+
+def hybrid_parameters(plan: dict) -> dict:
+    return {key: plan.get(key) for key in HybridPlanFormat.model_fields if key != "entry_point"}
+
+def hybrid_text(state: State, parameters: dict) -> str:
+    # BM25 text: the raw query plus the extracted title keywords
+    return " ".join(filter(None, [parameters.get("job_title"), state["query"]]))
+
+def hybrid_search(state: State):
+    parameters = hybrid_parameters(state["plan"])
+    vector = embedding_model.embed_query(state["query"])
+    response = hybrid_query(hybrid_text(state, parameters), vector, parameters, k=5)
+
+    return rag_update(None, parameters, response)
+
+async def ahybrid_search(state: State):
+    parameters = hybrid_parameters(state["plan"])
+    vector = await embedding_model.aembed_query(state["query"])
+    response = await ahybrid_query(hybrid_text(state, parameters), vector, parameters, k=5)
+
+    return rag_update(None, parameters, response)
+
+
+# ============================================ Fast-path Router ============================================
+
+# Deterministic pre-router: queries made only of known filter phrases ("I only want Hybrid jobs",
+# "find new jobs in Jakarta") are planned without calling the model. Anything it can't fully
+# account for falls back to the LLM route/plan call.
+FAST_ROUTER = os.getenv("FAST_ROUTER", "true").lower() == "true"
+FAST_ROUTER_MIN_CONFIDENCE = float(os.getenv("FAST_ROUTER_MIN_CONFIDENCE", "1.0"))
+
+
+class RouterStats:
+    "Hit-rate and latency counters for the fast-path router vs the fallback route call (query cache or LLM)."
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.fast_seconds = 0.0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+
+    def record(self, hit: bool, seconds: float):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self.fast_seconds += seconds
+
+    @contextmanager
+    def time_llm(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.llm_calls += 1
+                self.llm_seconds += time.perf_counter() - started
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": FAST_ROUTER,
+                "queries": total,
+                "fast_path_hits": self.hits,
+                "llm_fallbacks": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "model_calls_saved": self.hits,
+                "avg_fast_path_ms": round(self.fast_seconds / total * 1000, 4) if total else 0.0,
+                "avg_fallback_route_ms": round(self.llm_seconds / self.llm_calls * 1000, 2) if self.llm_calls else 0.0,
+            }
+
+
+router_stats = RouterStats()
+
+
+def parse_salary_phrase(match: re.Match) -> int | None:
+    if match.group(1):
+        value = float(match.group(1).replace(",", "."))
+        return int(value * 1_000_000)
+
+    digits = re.sub(r"\D", "", match.group(3) or match.group(4) or "")
+    if not digits:
+        return None
+    # Same assumption as the preprocessing step: monthly salaries are at least 500.000
+    value = int(digits)
+    return value if value > 500000 else None
+
+
+def fast_route(user_query: str) -> dict | None:
+    """
+    Builds a PlanFormat-shaped dict from keywords alone, or returns None when the query
+    contains words the rules don't understand (confidence below FAST_ROUTER_MIN_CONFIDENCE).
+    """
+    if not FAST_ROUTER:
+        return None
+
+    started = time.perf_counter()
+    plan = fast_plan(user_query)
+    router_stats.record(plan is not None, time.perf_counter() - started)
+
+    if plan is not None:
+        logger.debug("fast router: %s", plan)
+    return plan
+
+
+def fast_plan(user_query: str) -> dict | None:
+    text = f" {user_query.lower()} "
+    words_before = re.findall(r"[a-z0-9']+", text)
+    if not words_before:
+        return None
+
+    # Locations first: some contain other keywords ("Kebayoran Baru")
+    location = None
+    for known, pattern in KNOWN_LOCATIONS:
+        if pattern.search(text):
+            location = known
+            text = pattern.sub(" ", text)
+            break
+
+    work_style, text = extract_keyword(text, WORK_STYLE_KEYWORDS)
+    work_type, text = extract_keyword(text, WORK_TYPE_KEYWORDS)
+
+    salary = None
+    salary_match = SALARY_PATTERN.search(text)
+    if salary_match:
+        salary = parse_salary_phrase(salary_match)
+        if salary is None:
+            return None
+        text = text[:salary_match.start()] + " " + text[salary_match.end():]
+
+    words = re.findall(r"[a-z0-9']+", text)
+    wants_new = any(word in NEW_WORDS for word in words)
+
+    ignored = FILLER_WORDS | NEW_WORDS | (SALARY_WORDS if salary is not None else set())
+    leftover = [word for word in words if word not in ignored]
+    confidence = 1 - len(leftover) / len(words_before)
+    has_filters = any(value is not None for value in (location, work_style, work_type, salary))
+
+    if confidence < FAST_ROUTER_MIN_CONFIDENCE:
+        return None
+
+    if wants_new:
+        # New jobs from the CV. RAG has no salary filter, so leave salary queries to the model
+        if salary is not None:
+            return None
+        route = "RAG_search"
+    elif has_filters:
+        route = "python_filter"
+    else:
+        return None
+
+    return PlanFormat(
+        entry_point=route,
+        work_style=work_style,
+        work_type=work_type,
+        location=location,
+        salary=salary,
+    ).model_dump()
+
+
+def fast_update(fast_plan: dict):
+    return {"messages": [AIMessage(fast_plan["entry_point"])], "plan": fast_plan}
+
+
 # python filtering functions
 if __name__ == "__main__":
     # Fake Jobs
@@ -0,0 +1,116 @@
+import os
+import time
+import asyncio
+
+import aiosqlite
+from dotenv import load_dotenv
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+load_dotenv()
+
+# Durable memory for job-search conversations: the search graphs' LangGraph checkpointer, one thread per
+# session_id, in a SQLite file. A follow-up /job-search only sends the new query; the earlier turns come
+# back from the thread's checkpoint. The graph's remember node keeps the stored messages bounded
+# (see agents/search_agent.py), finish_turn keeps only the latest checkpoint of a thread and the cleanup
+# task deletes threads idle for longer than SEARCH_MEMORY_TTL.
+SEARCH_MEMORY_PATH = os.getenv("SEARCH_MEMORY_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'search_memory.db'))
+SEARCH_MEMORY_TTL = int(os.getenv("SEARCH_MEMORY_TTL", str(7 * 24 * 60 * 60)))
+SEARCH_MEMORY_CLEANUP_INTERVAL = int(os.getenv("SEARCH_MEMORY_CLEANUP_INTERVAL", str(60 * 60)))
+
+checkpointer: AsyncSqliteSaver | None = None
+cleanup_task: asyncio.Task | None = None
+
+
+def thread_id(session_id: str) -> str:
+    return f"search-{session_id}"
+
+
+def thread_config(session_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id(session_id)}}
+
+
+async def open_search_memory() -> AsyncSqliteSaver:
+    "Opens the checkpointer on the running event loop (API startup) and starts the TTL cleanup task."
+    global checkpointer, cleanup_task
+    conn = await aiosqlite.connect(SEARCH_MEMORY_PATH)
+    await conn.execute("PRAGMA journal_mode=WAL")
+    checkpointer = AsyncSqliteSaver(conn)
+    await checkpointer.setup()
+
+    # Last activity per thread; the checkpoints table has no timestamp column to expire on
+    await conn.execute("CREATE TABLE IF NOT EXISTS search_threads (thread_id TEXT PRIMARY KEY, updated REAL NOT NULL)")
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_search_threads_updated ON search_threads (updated)")
+    await conn.commit()
+
+    cleanup_task = asyncio.create_task(cleanup_loop())
+    return checkpointer
+
+
+async def close_search_memory():
+    global checkpointer, cleanup_task
+    if cleanup_task is not None:
+        cleanup_task.cancel()
+        cleanup_task = None
+    if checkpointer is not None:
+        await checkpointer.conn.close()
+        checkpointer = None
+
+
+async def finish_turn(session_id: str):
+    """
+    After a turn: records the thread's activity and deletes its older checkpoints, so a thread
+    stores one checkpoint no matter how many turns the conversation had.
+    """
+    if checkpointer is None:
+        return
+    latest = await checkpointer.aget_tuple(thread_config(session_id))
+    if latest is None:
+        return
+
+    thread = thread_id(session_id)
+    checkpoint_id = latest.config["configurable"]["checkpoint_id"]
+    async with checkpointer.lock:
+        conn = checkpointer.conn
+        await conn.execute("DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_id != ?", (thread, checkpoint_id))
+        await conn.execute("DELETE FROM writes WHERE thread_id = ? AND checkpoint_id != ?", (thread, checkpoint_id))
+        await conn.execute("INSERT OR REPLACE INTO search_threads VALUES (?, ?)", (thread, time.time()))
+        await conn.commit()
+
+
+async def forget(session_id: str):
+    "Drops the conversation, e.g. when a new CV starts the session over."
+    if checkpointer is None:
+        return
+    await checkpointer.adelete_thread(thread_id(session_id))
+    async with checkpointer.lock:
+        await checkpointer.conn.execute("DELETE FROM search_threads WHERE thread_id = ?", (thread_id(session_id),))
+        await checkpointer.conn.commit()
+
+
+async def cleanup_expired(ttl: int = SEARCH_MEMORY_TTL) -> int:
+    "Deletes the threads idle for longer than ttl seconds. Returns how many."
+    if checkpointer is None:
+        return 0
+    async with checkpointer.lock:
+        async with checkpointer.conn.execute(
+            "SELECT thread_id FROM search_threads WHERE updated < ?", (time.time() - ttl,)
+        ) as cursor:
+            expired = [row[0] for row in await cursor.fetchall()]
+
+    for thread in expired:
+        await checkpointer.adelete_thread(thread)
+    async with checkpointer.lock:
+        await checkpointer.conn.executemany("DELETE FROM search_threads WHERE thread_id = ?", [(thread,) for thread in expired])
+        await checkpointer.conn.commit()
+    return len(expired)
+
+
+async def cleanup_loop():
+    while True:
+        await asyncio.sleep(SEARCH_MEMORY_CLEANUP_INTERVAL)
+        try:
+            removed = await cleanup_expired()
+            if removed:
+                print(f"---- search memory: removed {removed} expired conversations")
+        except Exception as e:
+            print(f"---- search memory cleanup failed: {e!r}")
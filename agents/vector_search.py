@@ -0,0 +1,173 @@
+import os
+from qdrant_client import QdrantClient, AsyncQdrantClient, models
+from langchain_openai import OpenAIEmbeddings
+from dotenv import load_dotenv
+from agents.embedding_cache import CachedEmbeddings
+from agents.local_index import LocalJobIndex
+from agents.salary import parse_salary
+from agents.jobs_db import doc_id
+
+load_dotenv()
+qdrant_url = os.getenv("QDRANT_ENDPOINT")
+qdrant_key = os.getenv("QDRANT_API_KEY")
+
+# Shared clients; the async one is used by the async (ainvoke) versions of the graph nodes
+client = QdrantClient(url=qdrant_url, api_key=qdrant_key)
+async_client = AsyncQdrantClient(url=qdrant_url, api_key=qdrant_key)
+
+# Where Jobs_Documents searches go: "qdrant" (remote), "local" (in-process index from
+# agents/local_index.py) or "auto" (Qdrant, falling back to the local index when Qdrant fails)
+JOBS_VECTOR_BACKEND = os.getenv("JOBS_VECTOR_BACKEND", "auto")
+local_index = None
+local_index_loaded = False
+
+# One cached embedding model for every agent, so a text is only sent to OpenAI once
+cached_embedding_model = CachedEmbeddings(OpenAIEmbeddings(model="text-embedding-3-small"))
+
+
+# ============================================ Helper Functions ============================================
+
+def build_job(metadata: dict, page_content: str) -> dict:
+    "Converts a Jobs_Documents point (metadata + page_content) into the job dict used across the app."
+    if "Job Description:" in page_content:
+        job_desc = page_content.split("Job Description: ", 1)[1].strip()
+    else:
+        job_desc = page_content
+
+    if "min_salary" in metadata:
+        min_salary, max_salary = metadata["min_salary"], metadata["max_salary"]
+    else:
+        # Points ingested before the integer fields existed (re-run data/ingest_jobs.py to add them)
+        min_salary, max_salary = parse_salary(metadata["salary"])
+
+    return {
+        'doc_id': doc_id(metadata["job_title"], metadata["company_name"], metadata["location"]),
+        'job_title': metadata["job_title"],
+        'company_name': metadata["company_name"],
+        'work_type': metadata["work_type"],
+        'work_style': metadata["work_style"],
+        'location': metadata["location"],
+        'salary': metadata["salary"],
+        'min_salary': min_salary,
+        'max_salary': max_salary,
+        'job_description': job_desc,
+    }
+
+
+def payload_to_job(payload: dict) -> dict:
+    # langchain_qdrant stores documents as {"page_content": ..., "metadata": {...}}
+    return build_job(payload.get("metadata", {}), payload.get("page_content", ""))
+
+
+def metadata_filter(parameters: dict) -> models.Filter:
+    "Builds the metadata.* MatchText filter used by RAG searches. None values are ignored."
+    _must = [
+        models.FieldCondition(
+            key=f"metadata.{key}",
+            match=models.MatchText(text=value)
+        )
+        for key, value in parameters.items() if value is not None
+    ]
+
+    return models.Filter(must=_must)
+
+
+# ============================================ Backends ============================================
+
+def get_local_index() -> LocalJobIndex | None:
+    "Loads the memory-mapped local index once per process. None when the files are missing."
+    global local_index, local_index_loaded
+    if not local_index_loaded:
+        local_index_loaded = True
+        try:
+            local_index = LocalJobIndex.load()
+        except FileNotFoundError:
+            print("Local job index not found; run `python -m agents.local_index build`")
+            local_index = None
+    return local_index
+
+
+def search_local(vector: list[float], k: int, parameters: dict | None) -> list[tuple[dict, float]]:
+    return [(payload_to_job(payload), score) for payload, score in get_local_index().search(vector, k, parameters)]
+
+
+def use_local() -> bool:
+    return JOBS_VECTOR_BACKEND == "local" and get_local_index() is not None
+
+
+def can_fall_back() -> bool:
+    return JOBS_VECTOR_BACKEND == "auto" and get_local_index() is not None
+
+
+# ============================================ Queries ============================================
+
+def search_jobs_scored(vector: list[float], k: int, parameters: dict | None = None) -> list[tuple[dict, float]]:
+    "Vector search over Jobs_Documents as (job, cosine score) pairs. `parameters` are metadata MatchText filters."
+    if use_local():
+        return search_local(vector, k, parameters)
+
+    try:
+        response = client.query_points(
+            collection_name="Jobs_Documents",
+            query=vector,
+            query_filter=metadata_filter(parameters or {}),
+            limit=k,
+            with_payload=True,
+        )
+    except Exception as e:
+        if not can_fall_back():
+            raise
+        print(f"Qdrant search failed ({e}); using the local job index")
+        return search_local(vector, k, parameters)
+
+    return [(payload_to_job(point.payload), point.score) for point in response.points]
+
+
+async def asearch_jobs_scored(vector: list[float], k: int, parameters: dict | None = None) -> list[tuple[dict, float]]:
+    "Async version of search_jobs_scored, through the async Qdrant client."
+    if use_local():
+        return search_local(vector, k, parameters)
+
+    try:
+        response = await async_client.query_points(
+            collection_name="Jobs_Documents",
+            query=vector,
+            query_filter=metadata_filter(parameters or {}),
+            limit=k,
+            with_payload=True,
+        )
+    except Exception as e:
+        if not can_fall_back():
+            raise
+        print(f"Qdrant search failed ({e}); using the local job index")
+        return search_local(vector, k, parameters)
+
+    return [(payload_to_job(point.payload), point.score) for point in response.points]
+
+
+def search_jobs(vector: list[float], k: int, parameters: dict | None = None) -> list[dict]:
+    return [job for job, _ in search_jobs_scored(vector, k, parameters)]
+
+
+async def asearch_jobs(vector: list[float], k: int, parameters: dict | None = None) -> list[dict]:
+    return [job for job, _ in await asearch_jobs_scored(vector, k, parameters)]
+
+
+async def asearch_jobs_batch(vectors: list[list[float]], k: int, parameters: dict | None = None) -> list[list[dict]]:
+    "Several searches in one Qdrant round-trip (query_batch_points); one job list per vector."
+    if use_local():
+        return [[job for job, _ in search_local(vector, k, parameters)] for vector in vectors]
+
+    requests = [
+        models.QueryRequest(query=vector, filter=metadata_filter(parameters or {}), limit=k, with_payload=True)
+        for vector in vectors
+    ]
+    try:
+        responses = await async_client.query_batch_points(collection_name="Jobs_Documents", requests=requests)
+    except Exception as e:
+        if not can_fall_back():
+            raise
+        print(f"Qdrant batch search failed ({e}); using the local job index")
+        return [[job for job, _ in search_local(vector, k, parameters)] for vector in vectors]
+
+    return [[payload_to_job(point.payload) for point in response.points] for response in responses]
@@ -1,30 +1,106 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse, ORJSONResponse
+from pydantic import BaseModel, ValidationError
+from starlette.datastructures import UploadFile
 from typing import List, Dict, Any
 
 # Agents
-from agents.advisor_agent import invoke_advisor
-from agents.document_agent import analysis_compile
-from agents.search_agent import search_compile
+from agents.advisor_agent import invoke_advisor, ainvoke_advisor
+from agents.document_agent import analysis_compile, aanalysis_compile, astore_cv, drain_cv_stores
+from agents.search_agent import search_compile, asearch_compile, astream_search, search_result, router_stats, structured_cache
+from agents.graph_registry import compile_all, compile_report
+from agents import jobs_db, search_memory
+from agents.pdf_extract import shutdown_pool
+from agents.cv_cache import cv_cache, new_hasher, file_digest
+from agents.cv_batch import start_batch, get_batch, stream_results, CV_BATCH_MAX_FILES, CV_BATCH_MAX_BYTES
+from agents.job_sessions import job_sessions
+from agents.jobs_db import compact_job
+from agents.vector_search import cached_embedding_model, get_local_index, JOBS_VECTOR_BACKEND
 
 
 from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
 import traceback
 from livekit import api as livekit_api
 import os
+import orjson
+import base64
+import binascii
+import hashlib
+import tempfile
 from dotenv import load_dotenv
-import sqlite3
+from contextlib import asynccontextmanager
 
 load_dotenv()
 
-app = FastAPI()
+# Async mode awaits the graphs (ainvoke) on the event loop; sync mode runs invoke() in the threadpool
+ASYNC_AGENTS = os.getenv("ASYNC_AGENTS", "true").lower() == "true"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The conversation checkpointer first: the *_memory search graphs are compiled with it
+    await search_memory.open_search_memory()
+    # Compile every agent graph once so requests only invoke them
+    report = compile_all()
+    print(f"---- graphs ready in {report['startup_seconds'] * 1000:.2f} ms: {report['graphs']}")
+    if JOBS_VECTOR_BACKEND != "qdrant":
+        # Memory-maps the local job index up front instead of on the first search
+        get_local_index()
+    yield
+    await drain_cv_stores()
+    await search_memory.close_search_memory()
+    jobs_db.close_all()
+    shutdown_pool()
+
+
+# Every JSON body is serialized with orjson; the typed response models below keep the bodies small
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+# Compresses JSON bodies over 1 KB; Starlette leaves text/event-stream (SSE) uncompressed
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+
+
+# ==================================== RESPONSE MODELS ====================================
+class Job(BaseModel):
+    # List responses leave job_description out (None, dropped from the body); GET /jobs fills it in
+    doc_id: str | None = None
+    job_title: str | None = None
+    company_name: str | None = None
+    location: str | None = None
+    work_style: str | None = None
+    work_type: str | None = None
+    salary: str | None = None
+    min_salary: int | None = None
+    max_salary: int | None = None
+    job_description: str | None = None
+
+class CVAnalysisResponse(BaseModel):
+    session_id: str
+    user_name: str
+    summary: str
+    assessment: str
+    job_ids: list[str]
+    best_jobs: list[Job]
+    cv_cache: str
+    debug: dict | None = None   # ?verbose=true: extracted CV text + extraction stats
 
-current_dir = os.path.dirname(os.path.abspath(__file__))
-db_path = os.path.join(current_dir, '..', 'data', 'jobs_database.db')
+class JobSearchResponse(BaseModel):
+    session_id: str | None = None
+    route: str
+    filters: dict | None = None
+    notice: str | None = None
+    job_ids: list[str]
+    jobs: list[Job]
+    debug: dict | None = None   # ?verbose=true: the run's messages (prompts included) and plan
 
-conn = sqlite3.connect(db_path, check_same_thread=False)
-conn.row_factory = sqlite3.Row
-cursor = conn.cursor()
+def is_verbose(request: Request) -> bool:
+    return request.query_params.get("verbose", "").lower() in ("1", "true", "yes")
+
+def message_log(messages: list) -> list[dict]:
+    return [{"type": message.type, "content": message.content} for message in messages]
 
 
 # ==================================== CV ANALYZER AGENT ====================================
@@ -36,23 +112,327 @@ class CVRequest(BaseModel):
     session_id: str
     assessment: str
 
-@app.post("/analyze-cv")
-def cv_analyzer(request: CVRequest):
-    response = analysis_compile(request.model_dump())
-    return response
+CV_MAX_UPLOAD_BYTES = int(os.getenv("CV_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+def cv_initial_state(session_id: str) -> dict:
+    return {
+        "summary": "",
+        "user_name": "",
+        "cv_contents": "",
+        "best_jobs": [],
+        "file_bytes": "",
+        "session_id": session_id,
+        "assessment": "",
+    }
+
+def check_upload_size(request: Request):
+    # Reject early when the client announces a body that is too large
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > CV_MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"CV larger than {CV_MAX_UPLOAD_BYTES} bytes")
+
+def check_batch_size(request: Request):
+    """
+    The whole batch body must announce its size and stay under CV_BATCH_MAX_BYTES. The multipart form is
+    spooled before the files are read, so without a Content-Length there is nothing to reject it on early
+    (the server will not read past the announced length).
+    """
+    length = request.headers.get("content-length")
+    if not (length and length.isdigit()):
+        raise HTTPException(status_code=411, detail="Batch uploads need a Content-Length header")
+    if int(length) > CV_BATCH_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Batch larger than {CV_BATCH_MAX_BYTES} bytes")
+
+async def upload_chunks(upload: UploadFile):
+    while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+        yield chunk
+
+async def spool_to_temp_file(chunks) -> tuple[str, str]:
+    """
+    Writes the streamed body to a temp file chunk by chunk, enforcing CV_MAX_UPLOAD_BYTES.
+    Returns (path, content digest for the CV result cache), hashed while the chunks are written.
+    """
+    file = tempfile.NamedTemporaryFile(prefix="cv_", suffix=".pdf", delete=False)
+    hasher = new_hasher()
+    size = 0
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > CV_MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=413, detail=f"CV larger than {CV_MAX_UPLOAD_BYTES} bytes")
+            file.write(chunk)
+            hasher.update(chunk)
+    except BaseException:
+        file.close()
+        os.unlink(file.name)
+        raise
+
+    file.close()
+    if size == 0:
+        os.unlink(file.name)
+        raise HTTPException(status_code=400, detail="Empty CV upload")
+    return file.name, hasher.hexdigest()
+
+def base64_digest(file_bytes: str) -> str | None:
+    try:
+        return file_digest(base64.b64decode(file_bytes))
+    except (binascii.Error, ValueError):
+        return None   # left to the graph to fail on
+
+async def run_cv_analysis(state: dict, digest: str | None):
+    """
+    Serves an identical, previously analysed PDF from the CV result cache; runs the graph on a miss.
+    A hit still stores the CV point under this session_id (the advisor's review_user_cv filters on it).
+    The response's "cv_cache" is "hit", "miss" or "off".
+    """
+    if cv_cache is None or digest is None:
+        return {**await run_cv_graph(state), "cv_cache": "off"}
+
+    cached = await run_in_threadpool(cv_cache.get, digest)
+    if cached is not None:
+        print(f"---- CV cache hit {digest[:12]}")
+        response = {**state, **cached}
+        await astore_cv(response)
+        return {**response, "cv_cache": "hit"}
+
+    response = await run_cv_graph(state)
+    await run_in_threadpool(cv_cache.set, digest, response)
+    return {**response, "cv_cache": "miss"}
+
+def job_ids(jobs: list[dict]) -> list[str]:
+    # Cached analyses from before doc ids were added get theirs from the same fields
+    return [job.get("doc_id") or jobs_db.doc_id(job["job_title"], job["company_name"], job["location"]) for job in jobs]
+
+async def start_job_session(response: dict, verbose: bool = False) -> CVAnalysisResponse:
+    """
+    Starts the server-side job-search session (summary + job ids) for the analysed CV and answers with
+    compact jobs; descriptions come from GET /jobs. The CV text and file bytes are not echoed back.
+    A new CV also starts the search conversation over.
+    """
+    ids = job_ids(response.get("best_jobs", []))
+    if response.get("session_id"):
+        job_sessions.save(response["session_id"], response.get("summary", ""), ids)
+        await search_memory.forget(response["session_id"])
+    return CVAnalysisResponse(
+        session_id=response.get("session_id", ""),
+        user_name=response.get("user_name", ""),
+        summary=response.get("summary", ""),
+        assessment=response.get("assessment", ""),
+        job_ids=ids,
+        best_jobs=[{**compact_job(job), "doc_id": value} for job, value in zip(response.get("best_jobs", []), ids)],
+        cv_cache=response.get("cv_cache", "off"),
+        debug={"cv_contents": response.get("cv_contents"), "extraction": response.get("extraction")} if verbose else None,
+    )
+
+async def run_cv_graph(state: dict):
+    if ASYNC_AGENTS:
+        return await aanalysis_compile(state)
+    return await run_in_threadpool(analysis_compile, state)
+
+@app.post("/analyze-cv", response_model=CVAnalysisResponse, response_model_exclude_none=True)
+async def cv_analyzer(request: Request):
+    """
+    Accepts the CV as
+    - multipart/form-data: "file" (the PDF) + "session_id" field
+    - application/pdf: the raw PDF as the body, ?session_id=...
+    - application/json: the original CVRequest with base64 file_bytes (kept for old clients)
+    Uploads are streamed to a temp file that PyMuPDF opens directly.
+    Re-uploads of the same PDF bytes are answered from the CV result cache (agents/cv_cache.py).
+    ?verbose=true adds "debug" with the extracted CV text.
+    """
+    content_type = request.headers.get("content-type", "")
+
+    if content_type.startswith("application/json"):
+        try:
+            cv_request = CVRequest.model_validate(await request.json())
+        except ValidationError as e:
+            raise RequestValidationError(e.errors())
+        response = await run_cv_analysis(cv_request.model_dump(), base64_digest(cv_request.file_bytes))
+        return await start_job_session(response, is_verbose(request))
+
+    check_upload_size(request)
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form(max_files=1)
+        upload = form.get("file")
+        if not isinstance(upload, UploadFile):
+            raise HTTPException(status_code=422, detail="multipart upload needs a 'file' part")
+        session_id = str(form.get("session_id", ""))
+        path, digest = await spool_to_temp_file(upload_chunks(upload))
+        await upload.close()
+    elif content_type.startswith("application/pdf"):
+        session_id = request.query_params.get("session_id", "")
+        path, digest = await spool_to_temp_file(request.stream())
+    else:
+        raise HTTPException(status_code=415, detail="Send the CV as multipart/form-data, application/pdf or JSON")
+
+    try:
+        response = await run_cv_analysis({**cv_initial_state(session_id), "file_path": path}, digest)
+    finally:
+        os.unlink(path)
+
+    return await start_job_session(response, is_verbose(request))
+
+
+@app.post("/analyze-cv/batch", status_code=202)
+async def cv_analyzer_batch(request: Request):
+    """
+    Bulk screening: multipart/form-data with one "files" part per PDF.
+    Returns a job id right away; poll /analyze-cv/batch/{job_id} or stream /analyze-cv/batch/{job_id}/stream.
+    """
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        raise HTTPException(status_code=415, detail="Send the CVs as multipart/form-data 'files' parts")
+    check_batch_size(request)
+
+    form = await request.form(max_files=CV_BATCH_MAX_FILES)
+    uploads = [upload for upload in form.getlist("files") if isinstance(upload, UploadFile)]
+    if not uploads:
+        raise HTTPException(status_code=422, detail="multipart upload needs at least one 'files' part")
+
+    files = []
+    try:
+        for upload in uploads:
+            path, digest = await spool_to_temp_file(upload_chunks(upload))
+            files.append({"filename": upload.filename, "path": path, "digest": digest})
+    except BaseException:
+        for item in files:
+            os.unlink(item["path"])
+        raise
+    finally:
+        await form.close()
+
+    job = start_batch(files)
+    return {
+        "job_id": job.id,
+        "total": len(files),
+        "status_url": f"/analyze-cv/batch/{job.id}",
+        "stream_url": f"/analyze-cv/batch/{job.id}/stream",
+    }
+
+
+def batch_or_404(job_id: str):
+    job = get_batch(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown batch job {job_id}")
+    return job
+
+@app.get("/analyze-cv/batch/{job_id}")
+async def cv_batch_status(job_id: str, after: int = 0):
+    # Results come in completion order (each has its upload "index"); pass next_after back to get only new ones
+    job = batch_or_404(job_id)
+    return {**job.progress(), "results": job.results[after:], "next_after": len(job.results)}
+
+@app.get("/analyze-cv/batch/{job_id}/stream")
+async def cv_batch_stream(job_id: str):
+    # Server-Sent Events: one "result" event per CV as it finishes, then "done" with the throughput
+    job = batch_or_404(job_id)
+
+    async def events():
+        async for event, data in stream_results(job):
+            yield sse_event(event, data)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
 
 
 # ==================================== JOB SEARCHER AGENT ====================================
 class JobSearchRequest(BaseModel):
+    # With a session_id only the new query is sent; earlier turns live in the conversation checkpointer
     query: str
-    summary: str
-    best_jobs: list[dict]
-    messages: list
-
-@app.post("/job-search")
-def job_searcher(request: JobSearchRequest):
-    response = search_compile(request.model_dump())
-    return response
+    session_id: str | None = None
+    # Legacy clients send the whole state instead of a session_id
+    summary: str | None = None
+    best_jobs: list[dict] | None = None
+    messages: list = []
+
+def search_state(request: JobSearchRequest) -> dict:
+    """
+    Graph input: from the server-side session when there is a session_id, else from the legacy body.
+    Each turn starts with the query as a HumanMessage; plan is reset so a previous turn's plan is not reused.
+    """
+    if request.session_id is None:
+        if request.summary is None or request.best_jobs is None:
+            raise HTTPException(status_code=422, detail="Send a session_id, or summary + best_jobs")
+        state = request.model_dump(exclude={"session_id"})
+        return {**state, "messages": state["messages"] + [HumanMessage(request.query)], "plan": None}
+
+    session = job_sessions.get(request.session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired session; analyze the CV again")
+    return {
+        "query": request.query,
+        "session_id": request.session_id,
+        "summary": session["summary"],
+        "best_jobs": jobs_db.get_jobs(session["job_ids"]),
+        "messages": [HumanMessage(request.query)],
+        "plan": None,
+    }
+
+def update_job_session(session_id: str, jobs: list[dict]) -> list[str]:
+    # An empty result keeps the previous list (the notice explains); the user can refine the query
+    ids = job_ids(jobs)
+    if ids:
+        job_sessions.set_jobs(session_id, ids)
+    return ids
+
+@app.post("/job-search", response_model=JobSearchResponse, response_model_exclude_none=True)
+async def job_searcher(request: JobSearchRequest, verbose: bool = False):
+    """
+    Session mode: {"query", "session_id"} -> route, filters, notice, job_ids and compact jobs.
+    Legacy mode (summary + best_jobs in the body) gets full jobs back, to send again on the next turn.
+    ?verbose=true adds "debug" with the graph's messages (the stored conversation in session mode) and plan.
+    """
+    state = search_state(request)
+    if ASYNC_AGENTS:
+        response = await asearch_compile(state, request.session_id)
+    else:
+        response = await run_in_threadpool(search_compile, state, request.session_id)
+    if request.session_id is not None:
+        await search_memory.finish_turn(request.session_id)
+
+    result = search_result(response)
+    if request.session_id is None:
+        ids = job_ids(result["best_jobs"])
+        jobs = [{**job, "doc_id": value} for job, value in zip(result["best_jobs"], ids)]
+    else:
+        ids = update_job_session(request.session_id, result["best_jobs"])
+        jobs = [compact_job(job) for job in result["best_jobs"]]
+
+    return JobSearchResponse(
+        session_id=request.session_id,
+        route=result["route"],
+        filters=result["filters"],
+        notice=result["notice"],
+        job_ids=ids,
+        jobs=jobs,
+        debug={"messages": message_log(response["messages"]), "plan": response.get("plan")} if verbose else None,
+    )
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
+@app.post("/job-search/stream")
+async def job_searcher_stream(request: JobSearchRequest):
+    # Server-Sent Events: route, filters, then each job as soon as its node finishes.
+    # In session mode jobs are compact projections and "done" carries the new job_ids.
+    state = search_state(request)
+
+    async def events():
+        jobs = []
+        try:
+            async for event, data in astream_search(state, request.session_id):
+                if request.session_id is not None and event == "job":
+                    jobs.append(data)
+                    data = compact_job(data)
+                elif request.session_id is not None and event == "done":
+                    await search_memory.finish_turn(request.session_id)
+                    data = {**data, "job_ids": update_job_session(request.session_id, jobs)}
+                yield sse_event(event, data)
+        except Exception as e:
+            traceback.print_exc()
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(events(), media_type="text/event-stream")
 
 
 
@@ -62,13 +442,20 @@ class ChatRequest(BaseModel):
     session_id: str
 
 @app.post("/invoke-advisor")
-def ask_advisor(request: ChatRequest):
+async def ask_advisor(request: ChatRequest):
     try:
         # Parse Pydantic object
-        result = invoke_advisor(
-            messages=request.messages,
-            session_id=request.session_id
-        )
+        if ASYNC_AGENTS:
+            result = await ainvoke_advisor(
+                messages=request.messages,
+                session_id=request.session_id
+            )
+        else:
+            result = await run_in_threadpool(
+                invoke_advisor,
+                messages=request.messages,
+                session_id=request.session_id
+            )
 
         final_message = result["response"]
 
@@ -121,7 +508,9 @@ def ask_advisor(request: ChatRequest):
         print(steps_log if not [] else "No tool calls were used.")
         return {
             "response": final_message,
-            "steps": steps_log
+            "steps": steps_log,
+            # Per-turn token usage: local count of the bounded prompt + what the model calls reported
+            "usage": result["usage"],
         }
 
     except Exception as e:
@@ -165,24 +554,100 @@ async def get_livekit_token(req: TokenRequest):
 
 # ====================================================== GET JOBS FROM SQL DB ===============================================
 
+GET_JOBS_MAX_LIMIT = 500
+
+def jobs_etag(request: Request) -> str:
+    # Same DB version + same query string -> same page
+    key = f"{jobs_db.db_version()}|{sorted(request.query_params.multi_items())}"
+    return f'W/"{hashlib.sha1(key.encode("utf-8")).hexdigest()}"'
+
+
 @app.get("/get-all-jobs")
-async def get_all_jobs():
-    
-    cursor.execute("SELECT * FROM jobs")
-    rows = cursor.fetchall()
-    return [
+def get_all_jobs(
+    request: Request,
+    after: int = 0,
+    limit: int = 100,
+    fields: str | None = None,
+    work_style: str | None = None,
+    work_type: str | None = None,
+    location: str | None = None,
+    min_salary: int | None = None,
+):
+    """
+    Keyset-paginated job list. Pass the returned next_after as ?after= for the next page
+    (null on the last page). ?fields=job_title,company_name picks columns (all by default).
+    Responds 304 when If-None-Match matches the page's ETag.
+    """
+    # Plain def: runs in the threadpool, each worker thread on its own read-only connection
+    selected = [field.strip() for field in fields.split(",") if field.strip()] if fields else list(jobs_db.JOB_FIELDS)
+    unknown = [field for field in selected if field not in jobs_db.JOB_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {unknown}. Allowed: {list(jobs_db.JOB_FIELDS)}")
+    limit = max(1, min(limit, GET_JOBS_MAX_LIMIT))
+
+    etag = jobs_etag(request)
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    filters = {"work_style": work_style, "work_type": work_type, "location": location, "min_salary": min_salary}
+    # One extra row tells whether there is a next page
+    rows = jobs_db.list_jobs(after=after, limit=limit + 1, fields=selected, filters=filters)
+    page = rows[:limit]
+
+    return ORJSONResponse(
         {
-            "job_title": row['job_title'],
-            "company_name": row['company_name'],
-            "location": row['clean_location'],
-            "work_style": row['work_style'],
-            "work_type": row['work_type'],
-            "min_salary": row['min_salary'],
-            "max_salary": row['max_salary'],
-            "job_description": row['job_description']
-        }
-        for row in rows
-    ]
-    
-
-   
\ No newline at end of file
+            "jobs": [{field: row[field] for field in selected} for row in page],
+            "next_after": page[-1]["job_id"] if len(rows) > limit else None,
+        },
+        headers={"ETag": etag, "Cache-Control": "no-cache"},
+    )
+
+
+@app.get("/jobs")
+def get_jobs(ids: str):
+    "Full job records (description included) for ?ids=doc_id,doc_id,... in the given order."
+    doc_ids = [value.strip() for value in ids.split(",") if value.strip()]
+    if len(doc_ids) > GET_JOBS_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {GET_JOBS_MAX_LIMIT} ids per request")
+    return {"jobs": jobs_db.get_jobs(doc_ids)}
+
+
+@app.get("/jobs/{doc_id}")
+def get_job(doc_id: str):
+    jobs = jobs_db.get_jobs([doc_id])
+    if not jobs:
+        raise HTTPException(status_code=404, detail=f"Unknown job {doc_id}")
+    return jobs[0]
+
+
+@app.get("/job-search/session/{session_id}")
+def get_job_session(session_id: str):
+    "The session's current job list (ids + compact projections), e.g. after a page reload."
+    session = job_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired session")
+    return {
+        "session_id": session_id,
+        "job_ids": session["job_ids"],
+        "jobs": [compact_job(job) for job in jobs_db.get_jobs(session["job_ids"])],
+    }
+
+
+# ====================================================== GRAPH COMPILE REPORT ===============================================
+
+@app.get("/graph-report")
+async def graph_report():
+    # compiles should stay at 1 per graph no matter how many requests were served
+    return compile_report()
+
+
+@app.get("/search-stats")
+async def search_stats():
+    # fast-path router hit rate and the model calls it saved
+    return {
+        "fast_router": router_stats.snapshot(),
+        "llm_cache": structured_cache.stats.snapshot() if structured_cache else None,
+        "embedding_cache": cached_embedding_model.stats(),
+        "cv_cache": cv_cache.stats() if cv_cache else None,
+    }
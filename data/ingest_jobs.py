@@ -0,0 +1,319 @@
+"""
+Incremental ingestion of data/jobs.jsonl into Jobs_Documents (Qdrant) and the jobs table (SQLite).
+Replaces the embedding cells of text_embedding.ipynb.
+
+    python -m data.ingest_jobs                 # sync both stores
+    python -m data.ingest_jobs --dry-run       # only report what would change
+    python -m data.ingest_jobs --prune         # also delete postings that left the corpus (both stores)
+
+Postings get the notebook's document (page_content + metadata, work_style included) and its
+md5(job_title_company_location) id. The payload also carries content_hash / metadata_hash, so a stored
+point is compared by fetching only those two fields. Each posting is compared with the point already
+stored under that id:
+- same page_content and metadata: skipped
+- same page_content, new metadata: payload overwritten in place, no embedding
+- new or changed page_content: embedded (large batches, several in flight) and upserted
+The file is read in chunks of INGEST_CHUNK_SIZE postings; each chunk is compared, embedded and upserted
+before the next one is read, and each embedding batch is upserted as soon as it returns. Memory stays flat
+with the corpus size, and an interrupted run keeps what it already upserted (a re-run skips it).
+Re-running on an unchanged corpus makes no embedding calls. The jobs table is upserted from the same
+file by data/preprocess_data.py's streaming loader, keyed on the same doc_id.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+import argparse
+import sqlite3
+from itertools import islice
+
+from dotenv import load_dotenv
+from qdrant_client import AsyncQdrantClient, models
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data.preprocess_data import extract_work_style, load_jobs
+from agents.salary import parse_salary
+
+load_dotenv()
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+INPUT_FILE = os.path.join(DATA_DIR, "jobs.jsonl")
+DB_PATH = os.path.join(DATA_DIR, "jobs_database.db")
+
+COLLECTION = "Jobs_Documents"
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_SIZE = 1536
+INGEST_EMBED_BATCH = int(os.getenv("INGEST_EMBED_BATCH", "256"))        # texts per embeddings request
+INGEST_EMBED_CONCURRENCY = int(os.getenv("INGEST_EMBED_CONCURRENCY", "4"))
+INGEST_UPSERT_BATCH = int(os.getenv("INGEST_UPSERT_BATCH", "256"))        # payload-only updates per request
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "2000"))           # postings compared / embedded / upserted at a time
+SCROLL_PAGE = 1000
+
+# Full-text payload indexes for the metadata.* MatchText filters the agents send
+TEXT_INDEXED_FIELDS = ("job_title", "company_name", "location", "work_type", "work_style")
+
+
+# ============================================ Documents ============================================
+
+def read_postings(path: str = INPUT_FILE):
+    "Streams jobs.jsonl one posting at a time."
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_chunks(path: str = INPUT_FILE, size: int = INGEST_CHUNK_SIZE):
+    "Yields (postings read, {point id: payload}) per chunk; a repeated id keeps the last posting, like the notebook's upsert."
+    postings = read_postings(path)
+    while chunk := list(islice(postings, size)):
+        documents = {}
+        for posting in chunk:
+            point_id, payload = build_document(posting)
+            documents[point_id] = payload
+        yield len(chunk), documents
+
+
+def build_document(posting: dict) -> tuple[str, dict]:
+    "Same document and id as text_embedding.ipynb. Returns (point id, payload)."
+    job_title = str(posting.get('job_title', ''))
+    company_name = str(posting.get('company_name', ''))
+    job_location = str(posting.get('location', '')).replace('\n', ' ')
+    job_salary = str(posting.get('salary', '')) if posting.get('salary') != "None" else "Tidak Ditampilkan"
+    job_type = str(posting.get('work_type', ''))
+    work_style = extract_work_style(posting.get('location', '')).strip().lower()
+    min_salary, max_salary = parse_salary(posting.get('salary'))
+
+    clean_desc = " ".join(str(posting.get('job_description', '')).split())
+
+    unique_identifier = f"{job_title}_{company_name}_{job_location}".lower().encode('utf-8')
+    doc_id = hashlib.md5(unique_identifier).hexdigest()
+
+    page_content = f"""
+        Job: {job_title}
+        Company: {company_name}
+        Location: {job_location}
+        Salary: {job_salary}
+        Work Type: {job_type}
+        Work Style: {work_style}
+        Job Description: {clean_desc}
+    """.strip()
+
+    metadata = {
+        "job_title": job_title,
+        "company_name": company_name,
+        "location": job_location,
+        "salary": job_salary,
+        "work_type": job_type,
+        "work_style": work_style,
+        # Integers for filtering, same values as the jobs table
+        "min_salary": min_salary,
+        "max_salary": max_salary,
+    }
+
+    payload = {
+        "page_content": page_content,
+        "metadata": metadata,
+        "content_hash": content_hash(page_content),
+        "metadata_hash": metadata_hash(metadata),
+    }
+    # Qdrant stores the 32-hex md5 as a UUID and returns it dashed
+    return str(uuid.UUID(doc_id)), payload
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def metadata_hash(metadata: dict) -> str:
+    return content_hash(json.dumps(metadata, sort_keys=True, ensure_ascii=False))
+
+
+HASH_FIELDS = ["content_hash", "metadata_hash"]
+
+
+# ============================================ Qdrant ============================================
+
+async def ensure_collection(client: AsyncQdrantClient):
+    if not await client.collection_exists(COLLECTION):
+        print(f"Creating '{COLLECTION}' collection...")
+        await client.create_collection(
+            collection_name=COLLECTION,
+            vectors_config=models.VectorParams(size=EMBEDDING_SIZE, distance=models.Distance.COSINE),
+        )
+
+    # Created before the upserts so new points are indexed as they arrive; a no-op when they exist
+    for field in TEXT_INDEXED_FIELDS:
+        await client.create_payload_index(
+            collection_name=COLLECTION,
+            field_name=f"metadata.{field}",
+            field_schema=models.TextIndexParams(type=models.TextIndexType.TEXT, tokenizer=models.TokenizerType.WORD, lowercase=True),
+        )
+
+
+async def stored_hashes(client: AsyncQdrantClient, point_ids: list[str]) -> dict[str, tuple[str, str | None]]:
+    """
+    point id -> (page_content hash, metadata hash) for the given points that are stored, without vectors.
+    Only the two hash fields are fetched; points ingested before they existed are read in full and get
+    metadata hash None, so the sync writes their payload (with the hashes) without re-embedding them.
+    """
+    hashes = {}
+    legacy = []
+    for point in await client.retrieve(collection_name=COLLECTION, ids=point_ids, with_payload=HASH_FIELDS, with_vectors=False):
+        payload = point.payload or {}
+        if "content_hash" in payload and "metadata_hash" in payload:
+            hashes[str(point.id)] = (payload["content_hash"], payload["metadata_hash"])
+        else:
+            legacy.append(point.id)
+
+    if legacy:
+        for point in await client.retrieve(collection_name=COLLECTION, ids=legacy, with_payload=True, with_vectors=False):
+            hashes[str(point.id)] = (content_hash((point.payload or {}).get("page_content", "")), None)
+    return hashes
+
+
+async def stale_points(client: AsyncQdrantClient, seen: set[str]) -> list[str]:
+    "Stored point ids that are not in the corpus; scrolled as bare ids."
+    stale = []
+    offset = None
+    while True:
+        points, offset = await client.scroll(
+            collection_name=COLLECTION, limit=SCROLL_PAGE, offset=offset, with_payload=False, with_vectors=False,
+        )
+        stale.extend(str(point.id) for point in points if str(point.id) not in seen)
+        if offset is None:
+            return stale
+
+
+async def embed_and_upsert(client: AsyncQdrantClient, embeddings, documents: dict[str, dict], point_ids: list[str]) -> int:
+    """
+    INGEST_EMBED_BATCH texts per request, INGEST_EMBED_CONCURRENCY requests in flight; each batch is
+    upserted as soon as its vectors return. Returns the number of embedding requests.
+    """
+    limiter = asyncio.Semaphore(INGEST_EMBED_CONCURRENCY)
+
+    async def embed_batch(batch):
+        async with limiter:
+            vectors = await embeddings.aembed_documents([documents[point_id]["page_content"] for point_id in batch])
+            points = [
+                models.PointStruct(id=point_id, vector=vector, payload=documents[point_id])
+                for point_id, vector in zip(batch, vectors)
+            ]
+            await client.upsert(collection_name=COLLECTION, points=points)
+
+    batches = [point_ids[i:i + INGEST_EMBED_BATCH] for i in range(0, len(point_ids), INGEST_EMBED_BATCH)]
+    await asyncio.gather(*(embed_batch(batch) for batch in batches))
+    return len(batches)
+
+
+# ============================================ Sync ============================================
+
+def plan(documents: dict[str, dict], stored: dict[str, tuple[str, str | None]]) -> dict[str, list[str]]:
+    changes = {"embed": [], "payload": [], "unchanged": []}
+    for point_id, payload in documents.items():
+        old = stored.get(point_id)
+        if old is None or old[0] != payload["content_hash"]:
+            changes["embed"].append(point_id)
+        elif old[1] != payload["metadata_hash"]:
+            changes["payload"].append(point_id)
+        else:
+            changes["unchanged"].append(point_id)
+    return changes
+
+
+async def sync_chunk(client: AsyncQdrantClient, embeddings, documents: dict[str, dict], changes: dict[str, list[str]]) -> int:
+    "Writes one chunk's changes. Returns the number of embedding requests."
+    requests = 0
+    if changes["embed"]:
+        requests = await embed_and_upsert(client, embeddings, documents, changes["embed"])
+
+    if changes["payload"]:
+        # Metadata-only changes keep their vector; batched update requests
+        operations = [
+            models.OverwritePayloadOperation(overwrite_payload=models.SetPayload(payload=documents[point_id], points=[point_id]))
+            for point_id in changes["payload"]
+        ]
+        for i in range(0, len(operations), INGEST_UPSERT_BATCH):
+            await client.batch_update_points(collection_name=COLLECTION, update_operations=operations[i:i + INGEST_UPSERT_BATCH])
+    return requests
+
+
+async def sync_qdrant(input_file: str, dry_run: bool, prune: bool) -> dict:
+    client = AsyncQdrantClient(url=os.getenv("QDRANT_ENDPOINT"), api_key=os.getenv("QDRANT_API_KEY"))
+    report = {"postings": 0, "documents": 0, "embed": 0, "payload": 0, "unchanged": 0, "stale": 0, "embedding_requests": 0}
+    seen: set[str] = set()   # point ids only, for the stale check
+    embeddings = None
+    try:
+        if not dry_run:
+            await ensure_collection(client)
+        exists = await client.collection_exists(COLLECTION)
+
+        for postings, documents in read_chunks(input_file):
+            stored = await stored_hashes(client, list(documents)) if exists else {}
+            changes = plan(documents, stored)
+            seen.update(documents)
+            report["postings"] += postings
+            for name, ids in changes.items():
+                report[name] += len(ids)
+            if dry_run:
+                continue
+
+            if changes["embed"] and embeddings is None:
+                # Imported here so a dry run / no-op run works without the OpenAI key
+                from langchain_openai import OpenAIEmbeddings
+                embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL, chunk_size=INGEST_EMBED_BATCH)
+            report["embedding_requests"] += await sync_chunk(client, embeddings, documents, changes)
+            print(f"{report['postings']} postings synced ({report['embed']} embedded, {report['payload']} payload-only)")
+
+        report["documents"] = len(seen)
+        stale = await stale_points(client, seen) if exists else []
+        report["stale"] = len(stale)
+        # Stale points stay unless asked; a partial or filtered jobs.jsonl must not wipe the collection
+        if stale and prune and not dry_run:
+            for i in range(0, len(stale), SCROLL_PAGE):
+                await client.delete(collection_name=COLLECTION, points_selector=models.PointIdsList(points=stale[i:i + SCROLL_PAGE]))
+    finally:
+        await client.close()
+    return report
+
+
+def sync_sqlite(input_file: str, path: str = DB_PATH, prune: bool = False) -> int:
+    # Streamed, chunked upsert keyed on the same doc_id as the points (see data/preprocess_data.py).
+    # Rows missing from the file are only deleted with --prune, like the Qdrant points
+    conn = sqlite3.connect(path)
+    try:
+        return load_jobs(conn, input_file, keep_missing=not prune)
+    finally:
+        conn.close()
+
+
+def main(args):
+    started = time.perf_counter()
+    report = asyncio.run(sync_qdrant(args.input, args.dry_run, args.prune))
+    print(f"{report['postings']} postings, {report['documents']} unique documents")
+    print(
+        f"Qdrant: {report['embed']} embedded, {report['payload']} payload-only, {report['unchanged']} unchanged, "
+        f"{report['stale']} stale {'removed' if args.prune else 'kept (--prune deletes them)'}, "
+        f"{report['embedding_requests']} embedding requests"
+        + (" (dry run)" if args.dry_run else "")
+    )
+
+    if not args.dry_run:
+        rows = sync_sqlite(args.input, args.db, args.prune)
+        print(f"SQLite: {rows} postings upserted into {args.db}")
+        print("Rebuild the local vector index if it is used: python -m agents.local_index build")
+    print(f"Done in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental jobs.jsonl -> Qdrant + SQLite ingestion")
+    parser.add_argument("--input", default=INPUT_FILE)
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--dry-run", action="store_true", help="report the changes without writing")
+    parser.add_argument("--prune", action="store_true", help="delete postings that are no longer in the corpus from Qdrant and SQLite")
+
+    main(parser.parse_args())
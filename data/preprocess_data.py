@@ -1,58 +1,59 @@
 import pandas as pd
+import numpy as np
 import json
 import sqlite3
-import re
 import os
+import sys
+import time
+import argparse
 
-INPUT_FILE = 'jobs.jsonl' 
-DB_NAME = 'jobs_database.db'      
-
-def clean_salary_advanced(salary_text):
-
-    """
-    Fungsi:
-    Membersihkan format gaji yang kotor.
-    - Mengubah "Rp 10.000.000" jadi integer.
-    - Menangani "None", "World Class Benefits", dll jadi 0.
-    - Memisahkan range jadi min_salary dan max_salary.
-    """
-
-    if pd.isna(salary_text) or str(salary_text).lower() == "none":
-        return 0, 0
-    
-    # Lowercase & hapus karakter yang tidak diperlukan
-    text = str(salary_text).lower().replace('.', '').replace(',', '')
-    
-    # Cek kehadiran angka dalam teks
-    if not any(char.isdigit() for char in text):
-        return 0, 0
-    
-
-    multiplier = 1
-    if 'juta' in text or 'jt' in text:
-        multiplier = 1_000_000
-    
-    # Cari semua angka dalam teks
-    numbers = re.findall(r'\d+', text)
-    
-    # Filter angka 
-    # Hapus angka yang terlalu kecil (misal angka tahun 2025 atau tanggal)
-    # Asumsi: Gaji bulanan minimal 500.000
-    valid_numbers = []
-    for n in numbers:
-        val = int(n) * multiplier
-        if val > 500000: 
-            valid_numbers.append(val)
-    
-    if not valid_numbers:
-        return 0, 0
-    
-    if len(valid_numbers) == 1:
-        return valid_numbers[0], valid_numbers[0]
-    else:
-        return min(valid_numbers), max(valid_numbers)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+# Salary parsing is shared with the search agent and data/ingest_jobs.py
+from agents.salary import parse_salary_column
+from agents.jobs_db import doc_id
 
+INPUT_FILE = 'jobs.jsonl' 
+DB_NAME = 'jobs_database.db'      
+CHUNK_SIZE = 5_000   # postings per chunk / per transaction; bounds memory on multi-GB dumps
+
+# Text columns compare case-insensitively (NOCASE), so "hybrid" = "Hybrid" can use the indexes.
+# The agents read the cleaned location from the `location` column.
+# doc_id is the Jobs_Documents point id (md5 of title_company_location), the key postings are upserted on.
+JOBS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id INTEGER PRIMARY KEY,
+    doc_id TEXT,
+    job_title TEXT,
+    company_name TEXT,
+    location TEXT COLLATE NOCASE,
+    work_style TEXT COLLATE NOCASE,
+    work_type TEXT COLLATE NOCASE,
+    min_salary INTEGER,
+    max_salary INTEGER,
+    job_description TEXT
+)
+"""
+
+JOBS_DOC_ID_INDEX = "CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_doc_id ON jobs (doc_id)"
+
+# max_salary trails each filter column so "WHERE x = ? ORDER BY max_salary DESC LIMIT 5" walks the index
+# in order and stops after 5 rows instead of sorting every match
+JOBS_INDEXES = [
+    JOBS_DOC_ID_INDEX,
+    "CREATE INDEX IF NOT EXISTS idx_jobs_work_style ON jobs (work_style, max_salary)",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_work_type ON jobs (work_type, max_salary)",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_location ON jobs (location, max_salary)",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_max_salary ON jobs (max_salary)",
+]
+
+# Full-text index over the keyword-searchable columns; external content, so the text is stored once (in jobs)
+JOBS_FTS = """
+CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5(
+    job_title, company_name, location, job_description,
+    content='jobs', content_rowid='job_id', tokenize='unicode61 remove_diacritics 2'
+)
+"""
 
 def extract_work_style(location_text):
 
@@ -84,53 +85,170 @@ def clean_location_name(location_text):
     return text.strip()
 
 
-def main():
-    
-    if not os.path.exists(INPUT_FILE):
-        print(f"File {INPUT_FILE} tidak ditemukan!")
-        return
+# ===== Column-wise versions (streaming mode) =====
+# Same rules as the functions above, applied to a whole chunk at once with pandas string ops.
+# Salary: agents/salary.py
 
-    try:
-        df = pd.read_json(INPUT_FILE, lines=True)
-        print(f"Berhasil load {len(df)} baris data.")
-    except ValueError as e:
-        print(f"Format JSON invalid. Detail: {e}")
-        return
+def work_style_column(location):
 
+    """
+    Fungsi:
+    extract_work_style untuk satu kolom.
+    """
 
-    # Standarisasi kolom Salary
-    salary_cleaned = df['salary'].apply(clean_salary_advanced)
-    df['min_salary'] = [x[0] for x in salary_cleaned]
-    df['max_salary'] = [x[1] for x in salary_cleaned]
-    
-    # Ekstrak Work Style (Remote/Hybrid)
-    df['work_style'] = df['location'].apply(extract_work_style)
-    
-    # Standarisasi lokasi kerjaNe
-    df['clean_location'] = df['location'].apply(clean_location_name)
+    text = location.astype("string").str.lower().fillna("nan")
+    styles = np.select(
+        [text.str.contains("jarak jauh|remote", regex=True), text.str.contains("hibrid|hybrid", regex=True)],
+        ["Remote", "Hybrid"],
+        "On-site",
+    )
+    return pd.Series(styles, index=location.index)
 
-    # Handle Missing Values
-    df['company_name'] = df['company_name'].fillna('Unknown Company')
-    df['job_title'] = df['job_title'].fillna('Unknown Title')
-    df['work_type'] = df['work_type'].fillna('Full time')
 
+def location_column(location):
 
-    conn = sqlite3.connect(DB_NAME)
-    
-    sql_columns = [
-        'job_title', 
-        'company_name', 
-        'clean_location', 
-        'work_style',     
-        'work_type', 
-        'min_salary', 
-        'max_salary',
-        'job_description' 
-    ]
+    """
+    Fungsi:
+    clean_location_name untuk satu kolom.
+    """
+
+    return location.astype("string").fillna("nan").str.split("\n", n=1).str[0].str.strip()
+
+
+def clean_chunk(df):
+
+    """
+    Fungsi:
+    Membersihkan satu chunk postingan mentah menjadi kolom tabel jobs.
+    """
+
+    cleaned = pd.DataFrame(index=df.index)
+    cleaned['doc_id'] = [doc_id(*values) for values in zip(df['job_title'], df['company_name'], df['location'])]
+    cleaned['job_title'] = df['job_title'].fillna('Unknown Title')
+    cleaned['company_name'] = df['company_name'].fillna('Unknown Company')
+    cleaned['location'] = location_column(df['location'])
+    cleaned['work_style'] = work_style_column(df['location'])
+    cleaned['work_type'] = df['work_type'].fillna('Full time')
+    cleaned['min_salary'], cleaned['max_salary'] = parse_salary_column(df['salary'])
+    cleaned['job_description'] = df['job_description']
+    return cleaned
+
+
+def create_indexes(conn):
+
+    """
+    Fungsi:
+    Membuat B-tree index + tabel FTS5 untuk tabel jobs, lalu mengisi ulang FTS dan statistik planner.
+    """
+
+    # WAL: the API's read-only connections keep reading while ingestion writes
+    conn.execute("PRAGMA journal_mode=WAL")
+    for statement in JOBS_INDEXES:
+        conn.execute(statement)
+    conn.execute(JOBS_FTS)
+    conn.execute("INSERT INTO jobs_fts(jobs_fts) VALUES ('rebuild')")
+    conn.execute("ANALYZE")
+    conn.commit()
+
+
+def ensure_schema(conn):
+
+    """
+    Fungsi:
+    Membuat tabel jobs (kalau belum ada) dengan unique index doc_id untuk upsert.
+    Tabel lama tanpa kolom doc_id dibuat ulang.
+    """
+
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]
+    if columns and 'doc_id' not in columns:
+        print("Tabel jobs lama (tanpa doc_id) dibuat ulang.")
+        conn.execute("DROP TABLE IF EXISTS jobs_fts")
+        conn.execute("DROP TABLE jobs")
+    conn.execute(JOBS_SCHEMA)
+    conn.execute(JOBS_DOC_ID_INDEX)
+    conn.commit()
+
+
+SQL_COLUMNS = [
+    'doc_id',
+    'job_title', 
+    'company_name', 
+    'location', 
+    'work_style',     
+    'work_type', 
+    'min_salary', 
+    'max_salary',
+    'job_description' 
+]
+
+# job_id stays the same for postings that are already in the table
+UPSERT_QUERY = f"""
+INSERT INTO jobs ({", ".join(SQL_COLUMNS)}) VALUES ({", ".join("?" for _ in SQL_COLUMNS)})
+ON CONFLICT(doc_id) DO UPDATE SET {", ".join(f"{column} = excluded.{column}" for column in SQL_COLUMNS[1:])}
+"""
+
+
+def load_jobs(conn, input_file=INPUT_FILE, chunk_size=CHUNK_SIZE, keep_missing=False):
+
+    """
+    Fungsi:
+    Streaming jobs.jsonl per chunk ke tabel jobs: bersihkan kolom secara vektor, upsert per transaksi.
+    Postingan yang tidak ada lagi di file dihapus, kecuali keep_missing=True (mode append untuk dump baru).
+    Mengembalikan jumlah postingan yang dibaca.
+    """
+
+    ensure_schema(conn)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    # doc_ids seen in this run live in a temp table, not in Python memory
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen (doc_id TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM temp.seen")
+
+    started = time.perf_counter()
+    total = 0
+    reader = pd.read_json(input_file, lines=True, chunksize=chunk_size, dtype=False, convert_dates=False)
+    for chunk in reader:
+        rows = clean_chunk(chunk)[SQL_COLUMNS]
+        with conn:
+            conn.executemany(UPSERT_QUERY, rows.itertuples(index=False, name=None))
+            conn.executemany("INSERT OR IGNORE INTO temp.seen VALUES (?)", ((value,) for value in rows['doc_id']))
+        total += len(rows)
+        elapsed = time.perf_counter() - started
+        print(f"{total} baris ({total / elapsed:,.0f} baris/detik)")
+
+    if not keep_missing:
+        with conn:
+            removed = conn.execute("DELETE FROM jobs WHERE doc_id NOT IN (SELECT doc_id FROM temp.seen)").rowcount
+        print(f"{removed} baris yang tidak ada di file dihapus.")
+
+    conn.execute("DROP TABLE temp.seen")
+    create_indexes(conn)
+    elapsed = time.perf_counter() - started
+    print(f"Selesai: {total} baris dalam {elapsed:.2f} detik ({total / max(elapsed, 1e-9):,.0f} baris/detik)")
+    return total
+
+
+def main(args):
     
-    df[sql_columns].to_sql('jobs', conn, if_exists='replace', index=False)
-    conn.close()
+    if not os.path.exists(args.input):
+        print(f"File {args.input} tidak ditemukan!")
+        return
+
+    conn = sqlite3.connect(args.db)
+    try:
+        load_jobs(conn, args.input, args.chunk_size, args.keep_missing)
+    except ValueError as e:
+        print(f"Format JSON invalid. Detail: {e}")
+        return
+    finally:
+        conn.close()
     print("Database SQL berhasil dibuat!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="jobs.jsonl -> SQLite (streaming, chunked upserts)")
+    parser.add_argument("--input", default=INPUT_FILE)
+    parser.add_argument("--db", default=DB_NAME)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--keep-missing", action="store_true", help="append/update only; keep rows that are not in the file")
+
+    main(parser.parse_args())
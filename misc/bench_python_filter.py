@@ -0,0 +1,86 @@
+"""
+Micro-benchmark for python_filter's filter stage (agents/search_agent.filter_update).
+
+Compares the columnar masks with the previous per-job loop (without its debug prints, so the
+comparison is about the filtering itself) on the jobs table repeated to --jobs jobs, for a few
+FilterFormat shapes. Exits with status 1 if both versions ever keep different jobs.
+
+Usage:
+    python -m misc.bench_python_filter --jobs 10000
+"""
+import os
+import sys
+import time
+import argparse
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench-filter")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agents import jobs_db
+from agents.salary import salary_range
+from agents.hybrid_search import row_to_job
+from agents.search_agent import FilterFormat, filter_update
+
+FILTERS = [
+    FilterFormat(),
+    FilterFormat(work_style="Hybrid"),
+    FilterFormat(location="Jakarta", work_type="Full time"),
+    FilterFormat(min_salary=10_000_000),
+    FilterFormat(work_style="On-site", work_type="Full time", location="jakarta", min_salary=5_000_000),
+]
+
+
+def loop_filter(py_filter: FilterFormat, jobs: list[dict]) -> list[dict]:
+    "The per-job loop python_filter used before the column masks."
+    passed_jobs = []
+    for job in jobs:
+        if py_filter.work_style is not None and job["work_style"].lower() != py_filter.work_style.lower():
+            continue
+        if py_filter.work_type is not None and job["work_type"].lower() != py_filter.work_type.lower():
+            continue
+        if py_filter.location is not None and py_filter.location.lower() not in job["location"].lower():
+            continue
+        if py_filter.min_salary is not None:
+            job_min_salary, _ = salary_range(job)
+            if job_min_salary == 0 or job_min_salary < py_filter.min_salary:
+                continue
+        passed_jobs.append(job)
+    return passed_jobs
+
+
+def timed(function, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main(args):
+    corpus = [row_to_job(row) for row in jobs_db.fetch_all("SELECT * FROM jobs")]
+    jobs = (corpus * (args.jobs // len(corpus) + 1))[:args.jobs]
+    print(f"{len(jobs)} jobs")
+
+    mismatches = 0
+    for py_filter in FILTERS:
+        expected = loop_filter(py_filter, jobs)
+        kept = filter_update(None, py_filter, jobs)["best_jobs"]
+        if [id(job) for job in kept] != [id(job) for job in expected]:
+            mismatches += 1
+
+        loop_ms = timed(lambda: loop_filter(py_filter, jobs), args.repeat)
+        mask_ms = timed(lambda: filter_update(None, py_filter, jobs), args.repeat)
+        used = {key: value for key, value in py_filter.model_dump().items() if value is not None}
+        print(f"{str(used):<95} kept {len(kept):>6}  loop {loop_ms:8.2f} ms  masks {mask_ms:8.2f} ms  x{loop_ms / mask_ms:.1f}")
+
+    print(f"mismatches: {mismatches}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="python_filter micro-benchmark")
+    parser.add_argument("--jobs", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+
+    main(parser.parse_args())
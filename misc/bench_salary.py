@@ -0,0 +1,84 @@
+"""
+Benchmarks agents/salary.py over the full jobs.jsonl corpus.
+
+- ingestion: scalar parse_salary per row vs parse_salary_column over the column
+- request path: re-parsing each job's salary string (what python_filter used to do)
+  vs comparing the stored integers (salary_range)
+
+Usage:
+    python -m misc.bench_salary                 # the corpus as is
+    python -m misc.bench_salary --scale 200000  # corpus repeated to 200k salaries
+
+Exits with status 1 when the scalar and vectorized parsers disagree on any row.
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agents.salary import parse_salary, parse_salary_column, salary_range
+
+JOBS_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'jobs.jsonl')
+
+
+def old_parse_min_salary(salary_str: str) -> int | None:
+    # search_agent.parse_min_salary before agents/salary.py, kept here as the baseline
+    if not salary_str or "Tidak Ditampilkan" in salary_str:
+        return None
+    digits = re.sub(r"\D", "", re.split(r"[–—-]", salary_str)[0])
+    return int(digits) if digits else None
+
+
+def timed(function, repeat: int) -> float:
+    "Best of `repeat` runs, in ms."
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main(args):
+    salaries = pd.read_json(JOBS_FILE, lines=True, dtype=False, convert_dates=False)["salary"]
+    if args.scale:
+        salaries = pd.concat([salaries] * (args.scale // len(salaries) + 1), ignore_index=True)[:args.scale]
+    print(f"{len(salaries)} salaries, {salaries.nunique()} distinct")
+
+    # Correctness: both APIs agree row for row
+    scalar = [parse_salary(value) for value in salaries]
+    min_salary, max_salary = parse_salary_column(salaries)
+    mismatches = sum(pair != (low, high) for pair, low, high in zip(scalar, min_salary, max_salary))
+    print(f"scalar vs vectorized mismatches: {mismatches}")
+
+    scalar_ms = timed(lambda: [parse_salary(value) for value in salaries], args.repeat)
+    vector_ms = timed(lambda: parse_salary_column(salaries), args.repeat)
+    print(f"ingestion   scalar loop   {scalar_ms:9.2f} ms  ({len(salaries) / scalar_ms * 1000:,.0f} rows/s)")
+    print(f"ingestion   vectorized    {vector_ms:9.2f} ms  ({len(salaries) / vector_ms * 1000:,.0f} rows/s)  x{scalar_ms / vector_ms:.1f}")
+
+    # Request path: jobs as python_filter sees them, with and without the stored integers
+    display = [value if value != "None" else "Tidak Ditampilkan" for value in salaries]
+    jobs = [
+        {"salary": text, "min_salary": int(low), "max_salary": int(high)}
+        for text, low, high in zip(display, min_salary, max_salary)
+    ]
+    threshold = 10_000_000
+    reparse_ms = timed(lambda: [j for j in jobs if (old_parse_min_salary(j["salary"]) or 0) >= threshold], args.repeat)
+    integer_ms = timed(lambda: [j for j in jobs if salary_range(j)[0] >= threshold], args.repeat)
+    print(f"filter      re-parse      {reparse_ms:9.2f} ms")
+    print(f"filter      integers      {integer_ms:9.2f} ms  x{reparse_ms / integer_ms:.1f}")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Salary normalization benchmark")
+    parser.add_argument("--scale", type=int, default=0, help="repeat the corpus up to this many salaries")
+    parser.add_argument("--repeat", type=int, default=5)
+
+    main(parser.parse_args())
@@ -0,0 +1,124 @@
+"""
+Checks that every SQL_search query shape is served by an index (EXPLAIN QUERY PLAN has no full
+table scan of `jobs`), then times the same queries on a copy of the table grown to --scale rows.
+
+Usage:
+    python -m misc.check_query_plans                    # plans only, against data/jobs_database.db
+    python -m misc.check_query_plans --scale 300000     # plans + timings on a 300k-row copy
+
+Exits with status 1 when a query plan contains a full scan.
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import tempfile
+import itertools
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-query-plans")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agents.search_agent import build_sql_query
+from agents.jobs_db import JOBS_DB_PATH
+from data.preprocess_data import JOBS_SCHEMA, create_indexes
+
+
+# Every combination of the SQLFormat fields SQL_search can send
+SAMPLE_VALUES = {
+    "job_title": "data",
+    "company_name": "PT",
+    "location": "Jakarta",
+    "work_style": "Hybrid",
+    "work_type": "Full time",
+    "salary": 10_000_000,
+}
+
+
+def parameter_sets() -> list[dict]:
+    keys = list(SAMPLE_VALUES)
+    sets = []
+    for size in range(len(keys) + 1):
+        for combination in itertools.combinations(keys, size):
+            sets.append({key: SAMPLE_VALUES[key] if key in combination else None for key in keys})
+    return sets
+
+
+def full_scans(conn: sqlite3.Connection, query: str, params: dict) -> list[str]:
+    # "SCAN jobs" without an index is a full table scan; "SCAN jobs USING INDEX ..." walks an index in order
+    plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+    return [step for step in plan if (step == "SCAN jobs" or step.startswith("SCAN jobs ")) and "USING" not in step]
+
+
+def check_plans(conn: sqlite3.Connection) -> int:
+    failures = 0
+    for parameters in parameter_sets():
+        query, params = build_sql_query(parameters)
+        scans = full_scans(conn, query, params)
+        if scans:
+            failures += 1
+            used = {key: value for key, value in parameters.items() if value is not None}
+            print(f"FULL SCAN for {used}: {scans}")
+    print(f"{len(parameter_sets())} query shapes checked, {failures} with a full scan")
+    return failures
+
+
+def grown_copy(rows: int) -> str:
+    "Copies data/jobs_database.db into a temp file and duplicates the rows until the table has `rows` rows."
+    path = os.path.join(tempfile.mkdtemp(), "jobs_scaled.db")
+    source = sqlite3.connect(JOBS_DB_PATH)
+    conn = sqlite3.connect(path)
+    conn.execute(JOBS_SCHEMA)
+
+    columns = "job_title, company_name, location, work_style, work_type, min_salary, max_salary, job_description"
+    original = source.execute(f"SELECT {columns} FROM jobs").fetchall()
+    source.close()
+
+    inserted = 0
+    while inserted < rows:
+        batch = original[:rows - inserted]
+        conn.executemany(f"INSERT INTO jobs ({columns}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+        inserted += len(batch)
+    conn.commit()
+
+    create_indexes(conn)
+    conn.close()
+    return path
+
+
+def time_queries(conn: sqlite3.Connection, repeat: int = 5) -> tuple[float, float]:
+    timings = []
+    for parameters in parameter_sets():
+        query, params = build_sql_query(parameters)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(query, params).fetchall()
+        timings.append((time.perf_counter() - started) / repeat * 1000)
+    timings.sort()
+    return timings[len(timings) // 2], timings[-1]
+
+
+def main(args):
+    conn = sqlite3.connect(JOBS_DB_PATH)
+    rows = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+    failures = check_plans(conn)
+    median, worst = time_queries(conn)
+    print(f"{rows:>8} rows: median {median:.3f} ms, worst {worst:.3f} ms per query")
+    conn.close()
+
+    if args.scale:
+        path = grown_copy(args.scale)
+        conn = sqlite3.connect(path)
+        failures += check_plans(conn)
+        median, worst = time_queries(conn)
+        print(f"{args.scale:>8} rows: median {median:.3f} ms, worst {worst:.3f} ms per query")
+        conn.close()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN QUERY PLAN check for SQL_search queries")
+    parser.add_argument("--scale", type=int, default=0, help="also check and time a copy grown to this many rows")
+
+    main(parser.parse_args())
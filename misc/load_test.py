@@ -0,0 +1,184 @@
+"""
+Local load test for the job search graph with stubbed model / embedding / Qdrant latencies.
+
+Compares the two execution modes of the backend:
+- sync:  search_compile() in the threadpool (what a plain `def` endpoint does, 40 threads by default)
+- async: asearch_compile() awaited on the event loop (what the `async def` endpoints do)
+
+Usage:
+    python -m misc.load_test --requests 200 --llm-latency 0.5 --embed-latency 0.1 --qdrant-latency 0.05
+    python -m misc.load_test --planner two_step     # A/B: original route + extraction calls
+    python -m misc.load_test --planner hybrid       # fused BM25 + vector search, no RAG/SQL choice
+"""
+import os
+import io
+import sys
+import time
+import asyncio
+import argparse
+import contextlib
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-load-test")
+# Every request sends the same query; the fast-path router or a warm cache would hide the model latency being measured
+os.environ["LLM_CACHE_BACKEND"] = "off"
+os.environ["FAST_ROUTER"] = "false"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langchain_core.messages import AIMessage
+from langchain_core.documents import Document
+from fastapi.concurrency import run_in_threadpool
+
+from agents import search_agent, hybrid_search
+from agents.vector_search import build_job
+from agents.graph_registry import compile_all
+
+
+# ============================================ Stubs ============================================
+
+LATENCY = {"llm": 0.5, "embed": 0.1, "qdrant": 0.05}
+CALLS = {"llm": 0}
+
+FAKE_JOB_DOC = Document(
+    page_content="Job: Data Analyst\nJob Description: Analyze data.",
+    metadata={
+        "job_title": "Data Analyst",
+        "company_name": "PT Contoh",
+        "work_type": "Full time",
+        "work_style": "hybrid",
+        "location": "Jakarta Selatan, Jakarta Raya",
+        "salary": "Tidak Ditampilkan",
+    },
+)
+
+
+class StubStructuredModel:
+    def __init__(self, schema):
+        self.schema = schema
+
+    def _result(self):
+        CALLS["llm"] += 1
+        if self.schema in (search_agent.EntryFormat, search_agent.PlanFormat):
+            return self.schema(entry_point="RAG_search")
+        if self.schema is search_agent.HybridPlanFormat:
+            return self.schema(entry_point="hybrid_search")
+        return self.schema()
+
+    def invoke(self, messages):
+        time.sleep(LATENCY["llm"])
+        return self._result()
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(LATENCY["llm"])
+        return self._result()
+
+
+class StubModel:
+    def with_structured_output(self, schema):
+        return StubStructuredModel(schema)
+
+    def invoke(self, messages):
+        time.sleep(LATENCY["llm"])
+        CALLS["llm"] += 1
+        return AIMessage("stub comment")
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(LATENCY["llm"])
+        CALLS["llm"] += 1
+        return AIMessage("stub comment")
+
+
+class StubEmbeddings:
+    def embed_query(self, text):
+        time.sleep(LATENCY["embed"])
+        return [0.0] * 1536
+
+    async def aembed_query(self, text):
+        await asyncio.sleep(LATENCY["embed"])
+        return [0.0] * 1536
+
+
+def stub_search_jobs(vector, k, parameters=None):
+    time.sleep(LATENCY["qdrant"])
+    return [build_job(FAKE_JOB_DOC.metadata, FAKE_JOB_DOC.page_content)]
+
+
+async def stub_asearch_jobs(vector, k, parameters=None):
+    await asyncio.sleep(LATENCY["qdrant"])
+    return [build_job(FAKE_JOB_DOC.metadata, FAKE_JOB_DOC.page_content)]
+
+
+def stub_search_jobs_scored(vector, k, parameters=None):
+    return [(job, 0.5) for job in stub_search_jobs(vector, k, parameters)]
+
+
+async def stub_asearch_jobs_scored(vector, k, parameters=None):
+    return [(job, 0.5) for job in await stub_asearch_jobs(vector, k, parameters)]
+
+
+def install_stubs():
+    search_agent.model = StubModel()
+    search_agent.embedding_model = StubEmbeddings()
+    search_agent.search_jobs = stub_search_jobs
+    search_agent.asearch_jobs = stub_asearch_jobs
+    hybrid_search.search_jobs_scored = stub_search_jobs_scored
+    hybrid_search.asearch_jobs_scored = stub_asearch_jobs_scored
+
+
+# ============================================ Load Test ============================================
+
+def initial_state():
+    return {
+        "query": "Find new jobs that match my CV but are only in Jakarta.",
+        "summary": "Data analyst with 2 years of experience.",
+        "best_jobs": [],
+        "messages": [],
+    }
+
+
+async def run_sync_mode(n: int) -> float:
+    started = time.perf_counter()
+    await asyncio.gather(*(run_in_threadpool(search_agent.search_compile, initial_state()) for _ in range(n)))
+    return time.perf_counter() - started
+
+
+async def run_async_mode(n: int) -> float:
+    started = time.perf_counter()
+    await asyncio.gather(*(search_agent.asearch_compile(initial_state()) for _ in range(n)))
+    return time.perf_counter() - started
+
+
+def report(mode: str, n: int, elapsed: float, llm_calls: int):
+    print(f"{mode:>6}: {n} requests in {elapsed:7.2f} s  ->  {n / elapsed:8.1f} req/s, {llm_calls / n:.1f} LLM calls/request")
+
+
+async def main(args):
+    LATENCY.update(llm=args.llm_latency, embed=args.embed_latency, qdrant=args.qdrant_latency)
+    install_stubs()
+    search_agent.SEARCH_PLANNER = args.planner
+    compile_all()
+
+    llm_round_trips = 1 if args.planner == "single" else 2
+    per_request = llm_round_trips * LATENCY["llm"] + LATENCY["embed"] + LATENCY["qdrant"]
+    print(f"\nPlanner: {args.planner}. Stubbed latency per request (RAG route): {per_request:.2f} s, {args.requests} concurrent requests\n")
+
+    # Node prints would drown the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        sync_elapsed = await run_sync_mode(args.requests)
+        sync_calls, CALLS["llm"] = CALLS["llm"], 0
+        async_elapsed = await run_async_mode(args.requests)
+        async_calls = CALLS["llm"]
+
+    report("sync", args.requests, sync_elapsed, sync_calls)
+    report("async", args.requests, async_elapsed, async_calls)
+    print(f"\nspeedup: {sync_elapsed / async_elapsed:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stubbed load test for sync vs async job search")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--embed-latency", type=float, default=0.1)
+    parser.add_argument("--qdrant-latency", type=float, default=0.05)
+    parser.add_argument("--planner", choices=["single", "two_step", "hybrid"], default="single")
+
+    asyncio.run(main(parser.parse_args()))
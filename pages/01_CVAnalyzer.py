@@ -11,7 +11,6 @@ if str(PROJECT_ROOT) not in sys.path:
 
 import streamlit as st
 import requests
-import base64
 from streamlit.runtime.scriptrunner import get_script_run_ctx
 from data.database import save_user_data
 
@@ -82,6 +81,17 @@ def get_session_id():
     return ctx.session_id
 
 
+def fetch_job_details(doc_ids: list[str]) -> dict:
+    "Full job records (descriptions) by doc id; list responses only carry compact jobs. Cached per session."
+    details = st.session_state.setdefault("job_details", {})
+    missing = [doc_id for doc_id in doc_ids if doc_id not in details]
+    if missing:
+        response = requests.get(f"{BACKEND_URL}/jobs", params={"ids": ",".join(missing)})
+        for job in response.json()["jobs"]:
+            details[job["doc_id"]] = job
+    return details
+
+
 # ======================================================= Streamlit UI =======================================================
 
 # Page Config
@@ -253,19 +263,11 @@ if "file_cached" not in st.session_state:
 if "analysis_done" not in st.session_state:
     file_as_bytes = st.session_state["file_cached"]
 
-    initial_state = {
-        "summary": "",
-        "user_name": "",
-        "cv_contents": "",
-        "best_jobs": [],
-        "file_bytes": base64.b64encode(file_as_bytes).decode("utf-8"),
-        "session_id": get_session_id(),
-        "assessment": ""
-    }
-
+    # Multipart upload: the PDF goes over the wire as-is instead of base64 inside JSON
     request = requests.post(
         f"{BACKEND_URL}/analyze-cv",
-        json=initial_state
+        files={"file": ("cv.pdf", file_as_bytes, "application/pdf")},
+        data={"session_id": get_session_id()},
     )
 
     data = request.json()
@@ -293,6 +295,7 @@ if "analysis_done" not in st.session_state:
 MBTI = st.session_state["assessment"][0:7]
 ASSESSMENT = st.session_state["assessment"][7:]
 DUMMY_JOBS = st.session_state["best_jobs"]
+JOB_DETAILS = fetch_job_details([job["doc_id"] for job in DUMMY_JOBS])
 
 
 # Personality Insight Card
@@ -337,7 +340,7 @@ for job in DUMMY_JOBS:
             <details class="job-details">
                 <summary>Read more</summary>
                 <div class="job-details-content">
-                    {job["job_description"]}
+                    {JOB_DETAILS.get(job["doc_id"], {}).get("job_description", "")}
                 </div>
             </details>
         </div>
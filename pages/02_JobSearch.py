@@ -7,6 +7,7 @@ PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
+import json
 import streamlit as st
 import requests
 from streamlit.runtime.scriptrunner import get_script_run_ctx
@@ -25,6 +26,120 @@ def get_session_id():
     return ctx.session_id
 
 
+def stream_job_search(payload: dict):
+    "Posts to the streaming endpoint and yields (event, data) pairs parsed from the Server-Sent Events."
+    with requests.post(f"{BACKEND_URL}/job-search/stream", json=payload, stream=True) as response:
+        event = None
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                yield event, json.loads(line[len("data: "):])
+
+
+def fetch_job_details(doc_ids: list[str]) -> dict:
+    "Full job records (descriptions) by doc id; list responses only carry compact jobs. Cached per session."
+    details = st.session_state.setdefault("job_details", {})
+    missing = [doc_id for doc_id in doc_ids if doc_id not in details]
+    if missing:
+        response = requests.get(f"{BACKEND_URL}/jobs", params={"ids": ",".join(missing)})
+        for job in response.json()["jobs"]:
+            details[job["doc_id"]] = job
+    return details
+
+
+def job_description(job: dict) -> str:
+    "From the details fetched for the list; None while they are not fetched yet."
+    details = st.session_state.get("job_details", {}).get(job["doc_id"])
+    return details["job_description"] if details else None
+
+
+def card_body(i: int, job: dict) -> str:
+    description = job_description(job) or "Loading description..."
+    return f"""
+            <div class="job-title">{job["job_title"]}</div>
+            <div class="job-meta">
+                {job["company_name"]} &nbsp;|&nbsp;
+                {job["work_type"]} &nbsp;|&nbsp;
+                {job["work_style"]} &nbsp;|&nbsp;
+                {job["salary"]} &nbsp;|&nbsp;
+                {job["location"]}
+            </div>
+            <div class="job-actions" id="job-action-{i}"></div>
+            <details class="job-details">
+                <summary>Read more</summary>
+                <div class="job-details-content">
+                    {description}
+                </div>
+            </details>
+            """
+
+
+def render_job_card(i: int, job: dict):
+    """
+    Renders one card and returns the placeholder holding its text, so a card streamed in before the
+    descriptions were fetched can be filled in afterwards (fill_descriptions).
+    """
+    with stylable_container(
+        key=f"job_card_{i}",
+        css_styles=[
+            # job-card
+            """
+            {
+                background-color: #161d2f;
+                border: 1px solid rgba(255,255,255,0.06);
+                border-radius: 18px;
+                padding: 22px 24px;
+                margin-bottom: 20px;
+                transition: transform 0.15s ease;
+
+                    &:hover {
+                    transform: translateY(-2px);
+                    border-color: #6c8cff;
+                }
+            }
+            """,
+
+            # fix the Button Overlap
+            """
+            div[data-testid="stButton"] {
+                margin-top: 40px;
+                display: block;
+            }
+            """
+        ]
+    ):
+        body = st.empty()
+        body.markdown(card_body(i, job), unsafe_allow_html=True)
+
+        if st.button("Prepare for this job", key=f"job_btn_{i}"):
+            new_data = {
+                "user_name": st.session_state.get("user_name", "Candidate"),
+                "user_summary": st.session_state.get("user_summary", ""),
+                "prefered_jobs": {
+                    "job_title": job['job_title'],
+                    "company_name": job['company_name'],
+                    "job_description": fetch_job_details([job["doc_id"]])[job["doc_id"]]['job_description']
+                }
+            }
+
+            save_user_data(new_data)
+            
+            st.session_state['prefered_jobs'] = new_data['prefered_jobs']
+            st.success("Data successfully saved to MongoDB")
+            st.session_state['last_consulted_job_title'] = ""
+            st.switch_page("pages/04_AIConsultant.py")
+
+    return body
+
+
+def fill_descriptions(cards: list[tuple]):
+    "One GET /jobs?ids=... for the streamed cards, then re-renders their text with the descriptions."
+    fetch_job_details([job["doc_id"] for _, job in cards])
+    for i, (body, job) in enumerate(cards):
+        body.markdown(card_body(i, job), unsafe_allow_html=True)
+
+
 # ===================================== Streamlit UI =====================================
 st.title("Specify your Job")
 
@@ -230,36 +345,8 @@ except Exception:
     st.warning("⚠️ You need to analyze your CV first before having a list of jobs.")
     st.stop()
 
-# On user input
-if user_input is not None:
-    initial_state = {
-        'query': user_input,
-        'summary': st.session_state["user_summary"],
-        'best_jobs': st.session_state["best_jobs"],
-        'messages': []
-    }
-
-    request = requests.post(
-        f"{BACKEND_URL}/job-search",
-        json=initial_state
-    )
-
-    try:
-        data = request.json()
-    except Exception as e:
-        print(e)
-        print(request)
-
-    try:
-        temp_jobs = data["best_jobs"]
-    except Exception:
-        print("Error ocurred. This what data looks like")
-        print(data)
-
-    if not temp_jobs or data["messages"][-2]["content"] == "Null intent":
-        with st.chat_message("ai"):
-            st.write(data["messages"][-1]["content"])
-
+# Agent notices (empty results / invalid query) are shown above the list
+notice_slot = st.container()
 
 # Display Current Jobs List
 st.markdown(
@@ -271,76 +358,55 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
+# On user input: stream the search and render each card as soon as it arrives.
+# The current list and CV summary live in the server-side session; only the query goes up.
+if user_input is not None:
+    initial_state = {
+        'query': user_input,
+        'session_id': st.session_state["session_id"],
+    }
 
-for i, job in enumerate(temp_jobs):
-    with stylable_container(
-        key=f"job_card_{i}",
-        css_styles=[
-            # job-card
-            """
-            {
-                background-color: #161d2f;
-                border: 1px solid rgba(255,255,255,0.06);
-                border-radius: 18px;
-                padding: 22px 24px;
-                margin-bottom: 20px;
-                transition: transform 0.15s ease;
+    temp_jobs = []
+    cards = []
+    status = st.status("Searching...", expanded=False)
 
-                    &:hover {
-                    transform: translateY(-2px);
-                    border-color: #6c8cff;
-                }
-            }
-            """,
+    try:
+        for event, data in stream_job_search(initial_state):
+            if event == "route":
+                status.update(label=f"Route: {data['route']}")
+            elif event == "filters":
+                status.write(data)
+            elif event == "job":
+                cards.append((render_job_card(len(temp_jobs), data), data))
+                temp_jobs.append(data)
+            elif event == "notice":
+                with notice_slot:
+                    with st.chat_message("ai"):
+                        st.write(data["message"])
+            elif event == "error":
+                print("Error ocurred. This what data looks like")
+                print(data)
 
-            # fix the Button Overlap
-            """
-            div[data-testid="stButton"] {
-                margin-top: 40px;
-                display: block;
-            }
-            """
-        ]
-    ):
-        st.markdown(
-            f"""
-            <div class="job-title">{job["job_title"]}</div>
-            <div class="job-meta">
-                {job["company_name"]} &nbsp;|&nbsp;
-                {job["work_type"]} &nbsp;|&nbsp;
-                {job["work_style"]} &nbsp;|&nbsp;
-                {job["salary"]} &nbsp;|&nbsp;
-                {job["location"]}
-            </div>
-            <div class="job-actions" id="job-action-{i}"></div>
-            <details class="job-details">
-                <summary>Read more</summary>
-                <div class="job-details-content">
-                    {job["job_description"]}
-                </div>
-            </details>
-            """,
-            unsafe_allow_html=True
-        )
+    except Exception as e:
+        print(e)
 
-        if st.button("Prepare for this job", key=f"job_btn_{i}"):
-            new_data = {
-                "user_name": st.session_state.get("user_name", "Candidate"),
-                "user_summary": st.session_state.get("user_summary", ""),
-                "prefered_jobs": {
-                    "job_title": job['job_title'],
-                    "company_name": job['company_name'],
-                    "job_description": job['job_description']
-                }
-            }
+    status.update(label=f"Found {len(temp_jobs)} jobs", state="complete")
+    if cards:
+        fill_descriptions(cards)
 
-            save_user_data(new_data)
-            
-            st.session_state['prefered_jobs'] = new_data['prefered_jobs']
-            st.success("Data successfully saved to MongoDB")
-            st.session_state['last_consulted_job_title'] = ""
-            st.switch_page("pages/04_AIConsultant.py")
+    # Same rule as the server: an empty result (or a Null-intent turn) keeps the previous list
+    if temp_jobs:
+        st.session_state["best_jobs"] = temp_jobs
+    else:
+        temp_jobs = st.session_state["best_jobs"]
+        fetch_job_details([job["doc_id"] for job in temp_jobs])
+        for i, job in enumerate(temp_jobs):
+            render_job_card(i, job)
 
+else:
+    fetch_job_details([job["doc_id"] for job in temp_jobs])
+    for i, job in enumerate(temp_jobs):
+        render_job_card(i, job)
 
 
 if not temp_jobs:
@@ -348,4 +414,4 @@ if not temp_jobs:
 
     with cent_co:
         # Use st.info or st.warning for a "pre-packaged" cute look
-        st.info("No data found!", icon="🔍")
\ No newline at end of file
+        st.info("No data found!", icon="🔍")